@@ -0,0 +1,101 @@
+from datetime import datetime, timezone
+from typing import List, Optional
+
+# Bucket formats for $dateToString; weeks are ISO weeks (Monday first)
+PERIOD_FORMATS = {
+    "day": "%Y-%m-%d",
+    "week": "%G-W%V",
+    "month": "%Y-%m",
+    "year": "%Y",
+}
+
+
+def created_at_filter(start: Optional[datetime] = None, end: Optional[datetime] = None) -> dict:
+    """Query on the [start, end) created_at range, served by the (created_at, id) index"""
+    bounds = {}
+    if start:
+        bounds["$gte"] = start.astimezone(timezone.utc)
+    if end:
+        bounds["$lt"] = end.astimezone(timezone.utc)
+    return {"created_at": bounds} if bounds else {}
+
+
+def created_between(start: Optional[datetime] = None, end: Optional[datetime] = None) -> dict:
+    return {"$match": created_at_filter(start, end)}
+
+
+def revenue_pipeline(period: str, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[dict]:
+    """Revenue, discount and sale count per day, week or month"""
+    return [
+        created_between(start, end),
+        {"$group": {
+            "_id": {"$dateToString": {"format": PERIOD_FORMATS[period], "date": {"$toDate": "$created_at"}}},
+            "sales_count": {"$sum": 1},
+            "revenue": {"$sum": "$total"},
+            "discount": {"$sum": "$discount"},
+        }},
+        {"$sort": {"_id": 1}},
+        {"$project": {"_id": 0, "period": "$_id", "sales_count": 1, "revenue": 1, "discount": 1}},
+    ]
+
+
+def product_pipeline(start: Optional[datetime] = None, end: Optional[datetime] = None, limit: int = 50) -> List[dict]:
+    """Quantity and revenue per product, best sellers first"""
+    return [
+        created_between(start, end),
+        {"$unwind": "$items"},
+        {"$group": {
+            "_id": "$items.product_id",
+            "product_name": {"$last": "$items.product_name"},
+            "quantity": {"$sum": "$items.quantity"},
+            "revenue": {"$sum": "$items.total_price"},
+            "sales_count": {"$sum": 1},
+        }},
+        {"$sort": {"revenue": -1}},
+        {"$limit": limit},
+        {"$project": {"_id": 0, "product_id": "$_id", "product_name": 1, "quantity": 1, "revenue": 1, "sales_count": 1}},
+    ]
+
+
+def category_pipeline(start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[dict]:
+    """Quantity and revenue per category (poisson / viande)
+
+    Sale items recorded before the category was copied onto them get it from
+    the product; the lookup runs once per distinct product, not per item.
+    """
+    return [
+        created_between(start, end),
+        {"$unwind": "$items"},
+        {"$group": {
+            "_id": {"product_id": "$items.product_id", "category": "$items.category"},
+            "quantity": {"$sum": "$items.quantity"},
+            "revenue": {"$sum": "$items.total_price"},
+        }},
+        {"$lookup": {
+            "from": "products",
+            "localField": "_id.product_id",
+            "foreignField": "id",
+            "as": "product",
+        }},
+        {"$group": {
+            "_id": {"$ifNull": ["$_id.category", {"$ifNull": [{"$arrayElemAt": ["$product.category", 0]}, "inconnue"]}]},
+            "quantity": {"$sum": "$quantity"},
+            "revenue": {"$sum": "$revenue"},
+        }},
+        {"$sort": {"revenue": -1}},
+        {"$project": {"_id": 0, "category": "$_id", "quantity": 1, "revenue": 1}},
+    ]
+
+
+def payment_method_pipeline(start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[dict]:
+    """Sale count and revenue per payment method"""
+    return [
+        created_between(start, end),
+        {"$group": {
+            "_id": "$payment_method",
+            "sales_count": {"$sum": 1},
+            "revenue": {"$sum": "$total"},
+        }},
+        {"$sort": {"revenue": -1}},
+        {"$project": {"_id": 0, "payment_method": "$_id", "sales_count": 1, "revenue": 1}},
+    ]
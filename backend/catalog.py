@@ -0,0 +1,236 @@
+import asyncio
+import bisect
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import ASCENDING
+
+from migrations import parse_date
+from pagination import decode_cursor, encode_cursor, parse_sort
+
+logger = logging.getLogger(__name__)
+
+
+class ProductCatalog:
+    """In-memory copy of the products collection, keyed by product id
+
+    The whole catalog is loaded on first use and reloaded every max_age
+    seconds, by refresh() in the background when it runs (inline by the
+    next read otherwise). Writes made through this worker are applied
+    immediately (write-through); writes made by other workers show up at the
+    next reload, or immediately when watch() follows the collection's change
+    stream.
+
+    date_fields still stored as ISO strings (before migrate-dates) are
+    parsed on the way in, so the in-memory sorts compare datetimes only.
+    """
+
+    def __init__(self, collection, projection: dict, max_age: float = 60.0, date_fields: Iterable[str] = ()):
+        self.collection = collection
+        self.projection = projection
+        self.date_fields = list(date_fields)
+        self.max_age = max_age
+        self._products: Dict[str, dict] = {}
+        self._sorted: Dict[str, Tuple[List[dict], list]] = {}
+        self._loaded_at: Optional[float] = None
+        # Wall-clock time of the last reload: the contents reflect the
+        # database as of then, plus this worker's own writes
+        self.synced_at: Optional[datetime] = None
+        self._lock = asyncio.Lock()
+        self.refreshing = False
+        # Writes applied while a reload is reading the collection: its
+        # snapshot may predate them, so they are applied again over it
+        self._pending: Optional[Dict[str, Optional[dict]]] = None
+        self._listeners: List[Callable[[str, Optional[dict]], None]] = []
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.reloads = 0
+        # Changes on every write or reload: lets callers tell two states apart
+        self.generation = 0
+
+    def subscribe(self, listener: Callable[[str, Optional[dict]], None]):
+        """listener(product_id, doc) is called when a product is added, renamed or removed (doc None)
+
+        Other changes (stock, price) are not announced: listeners needing
+        the current document read it from the catalog.
+        """
+        self._listeners.append(listener)
+
+    def _notify(self, product_id: str, doc: Optional[dict]):
+        for listener in self._listeners:
+            listener(product_id, doc)
+
+    def _fresh(self) -> bool:
+        if self._loaded_at is None:
+            return False
+        # refresh() keeps reloading in the background: never make a request wait for it
+        return self.refreshing or time.monotonic() - self._loaded_at < self.max_age
+
+    async def ensure_loaded(self):
+        if self._fresh():
+            return
+        async with self._lock:
+            # Another request may have reloaded while we waited for the lock
+            if self._fresh():
+                return
+            await self.reload()
+
+    async def refresh(self):
+        """Reload every max_age seconds, off the request path"""
+        self.refreshing = True
+        try:
+            while True:
+                await asyncio.sleep(self.max_age)
+                try:
+                    async with self._lock:
+                        await self.reload()
+                except Exception as exc:
+                    logger.error("Catalog reload failed, serving the previous copy: %s", exc)
+        finally:
+            self.refreshing = False
+
+    def _normalize(self, doc: dict) -> dict:
+        for field in self.date_fields:
+            if isinstance(doc.get(field), str):
+                doc[field] = parse_date(doc[field])
+        return doc
+
+    async def reload(self):
+        synced_at = datetime.now(timezone.utc)
+        self._pending = {}
+        try:
+            docs = await self.collection.find({}, self.projection).to_list(None)
+        finally:
+            pending, self._pending = self._pending, None
+        fresh = {doc["id"]: self._normalize(doc) for doc in docs}
+        for product_id, doc in pending.items():
+            if doc is None:
+                fresh.pop(product_id, None)
+            else:
+                fresh[product_id] = doc
+        previous = self._products
+        removed = [product_id for product_id in previous if product_id not in fresh]
+        self.evictions += len(removed)
+        self._products = fresh
+        self._sorted.clear()
+        self._loaded_at = time.monotonic()
+        self.synced_at = synced_at
+        self.reloads += 1
+        self.generation += 1
+        for product_id in removed:
+            self._notify(product_id, None)
+        for product_id, doc in fresh.items():
+            if self._renamed(previous.get(product_id), doc):
+                self._notify(product_id, doc)
+
+    @staticmethod
+    def _renamed(previous: Optional[dict], doc: dict) -> bool:
+        return previous is None or previous.get("name") != doc.get("name")
+
+    # Write-through
+    def put(self, doc: dict):
+        doc = self._normalize({key: value for key, value in doc.items() if key != "_id"})
+        previous = self._products.get(doc["id"])
+        self._products[doc["id"]] = doc
+        if self._pending is not None:
+            self._pending[doc["id"]] = doc
+        self.generation += 1
+        for field, (ordered, keys) in list(self._sorted.items()):
+            if previous is not None and previous.get(field) == doc.get(field):
+                # Sort key unchanged (e.g. a stock update): swap in place
+                ordered[bisect.bisect_left(keys, (doc[field], doc["id"]))] = doc
+            else:
+                del self._sorted[field]
+        if self._renamed(previous, doc):
+            self._notify(doc["id"], doc)
+
+    def evict(self, product_id: str):
+        if self._pending is not None:
+            self._pending[product_id] = None
+        if self._products.pop(product_id, None) is not None:
+            self.evictions += 1
+            self.generation += 1
+            self._sorted.clear()
+            self._notify(product_id, None)
+
+    # Reads
+    async def get(self, product_id: str) -> Optional[dict]:
+        return (await self.get_many([product_id])).get(product_id)
+
+    async def get_many(self, product_ids: Iterable[str]) -> Dict[str, dict]:
+        await self.ensure_loaded()
+        found, missing = {}, []
+        for product_id in product_ids:
+            doc = self._products.get(product_id)
+            if doc is None:
+                missing.append(product_id)
+            else:
+                found[product_id] = doc
+        self.hits += len(found)
+        if missing:
+            # Possibly created by another worker since the last reload
+            self.misses += len(missing)
+            for doc in await self.collection.find({"id": {"$in": missing}}, self.projection).to_list(None):
+                self.put(doc)
+                found[doc["id"]] = doc
+        return found
+
+    async def values(self) -> List[dict]:
+        await self.ensure_loaded()
+        self.hits += 1
+        return list(self._products.values())
+
+    async def page(self, sort: str, allowed: List[str], limit: int,
+                   after: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """Same contract and cursors as pagination.paginate, served from memory"""
+        field, direction = parse_sort(sort, allowed)
+        await self.ensure_loaded()
+        self.hits += 1
+        view = self._sorted.get(field)
+        if view is None:
+            ordered = sorted(self._products.values(), key=lambda doc: (doc[field], doc["id"]))
+            view = self._sorted[field] = (ordered, [(doc[field], doc["id"]) for doc in ordered])
+        ordered, keys = view
+
+        if direction == ASCENDING:
+            start = bisect.bisect_right(keys, decode_cursor(after)) if after else 0
+            docs = ordered[start:start + limit]
+            has_more = start + limit < len(ordered)
+        else:
+            end = bisect.bisect_left(keys, decode_cursor(after)) if after else len(ordered)
+            docs = ordered[max(0, end - limit):end][::-1]
+            has_more = end - limit > 0
+
+        next_cursor = encode_cursor(docs[-1][field], docs[-1]["id"]) if has_more else None
+        return docs, next_cursor
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._products),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "reloads": self.reloads,
+            "age_seconds": None if self._loaded_at is None else round(time.monotonic() - self._loaded_at, 1),
+        }
+
+    async def watch(self):
+        """Apply changes made by other workers as they happen (needs a replica set)"""
+        while True:
+            try:
+                async with self.collection.watch(full_document="updateLookup") as stream:
+                    async for change in stream:
+                        operation = change["operationType"]
+                        if operation in ("insert", "update", "replace") and change.get("fullDocument"):
+                            self.put(change["fullDocument"])
+                        elif operation == "delete":
+                            # Only the _id is known for deletes: resync
+                            await self.reload()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.error("Catalog change stream interrupted, retrying: %s", exc)
+                await asyncio.sleep(5)
@@ -0,0 +1,108 @@
+import logging
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from pymongo import UpdateOne
+
+from analytics import created_at_filter
+from pagination import decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+# Lifetime totals kept on each client document by record_sale
+TOTALS = {"lifetime_spend": 0.0, "sales_count": 0, "last_visit_at": None}
+REBUILD_ID = "client_totals"
+
+
+async def record_sale(db, sale: dict):
+    """Add one new sale to its client's lifetime totals"""
+    await db.clients.update_one(
+        {"id": sale["client_id"]},
+        {
+            "$inc": {"lifetime_spend": sale["total"], "sales_count": 1},
+            "$max": {"last_visit_at": sale["created_at"]},
+            "$set": {"updated_at": datetime.now(timezone.utc)},
+        }
+    )
+
+
+async def rebuild_client_totals(db) -> dict:
+    """Recompute every client's lifetime totals from the sales collection
+
+    Sales recorded while it runs may be counted twice or not at all: run
+    it outside opening hours.
+    """
+    now = datetime.now(timezone.utc)
+    await db.clients.update_many({}, {"$set": {**TOTALS, "updated_at": now}})
+    operations = [
+        UpdateOne({"id": totals["_id"]}, {"$set": {
+            "lifetime_spend": totals["lifetime_spend"],
+            "sales_count": totals["sales_count"],
+            "last_visit_at": totals["last_visit_at"],
+        }})
+        async for totals in db.sales.aggregate([
+            {"$match": {"client_id": {"$type": "string"}}},
+            {"$group": {
+                "_id": "$client_id",
+                "lifetime_spend": {"$sum": "$total"},
+                "sales_count": {"$sum": 1},
+                "last_visit_at": {"$max": "$created_at"},
+            }},
+        ])
+    ]
+    if operations:
+        await db.clients.bulk_write(operations, ordered=False)
+    await db.migrations.update_one({"_id": REBUILD_ID}, {"$set": {"completed_at": now}}, upsert=True)
+    logger.info("Rebuilt lifetime totals of %d clients", len(operations))
+    return {"clients": len(operations)}
+
+
+async def ensure_client_totals(db):
+    """Compute the totals on first start against an existing database"""
+    if await db.migrations.find_one({"_id": REBUILD_ID}) is None:
+        await rebuild_client_totals(db)
+
+
+async def statement_page(db, client_id: str, start: Optional[datetime], end: Optional[datetime],
+                         limit: int, after: Optional[str] = None,
+                         projection: Optional[dict] = None) -> Tuple[List[dict], Optional[str]]:
+    """Sales of the client in [start, end), oldest first, each with the running total
+
+    Keyset pages over the (client_id, created_at, id) index. The cursor
+    carries the running total reached so far, so a page never re-reads the
+    sales before it.
+    """
+    query = {"client_id": client_id, **created_at_filter(start, end)}
+    running = 0.0
+    if after:
+        position, doc_id = decode_cursor(after)
+        try:
+            created_at, running = position
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+        query = {"$and": [query, {"$or": [
+            {"created_at": {"$gt": created_at}},
+            {"created_at": created_at, "id": {"$gt": doc_id}},
+        ]}]}
+
+    sales = await db.sales.find(query, projection).sort([("created_at", 1), ("id", 1)]).limit(limit + 1).to_list(limit + 1)
+    next_cursor = None
+    for sale in sales[:limit]:
+        running = round(running + sale["total"], 2)
+        sale["running_total"] = running
+    if len(sales) > limit:
+        sales = sales[:limit]
+        next_cursor = encode_cursor([sales[-1]["created_at"], running], sales[-1]["id"])
+    return sales, next_cursor
+
+
+async def period_totals(db, client_id: str, start: Optional[datetime], end: Optional[datetime]) -> dict:
+    """Spend and number of sales of the client in [start, end), over the same index range"""
+    totals = await db.sales.aggregate([
+        {"$match": {"client_id": client_id, **created_at_filter(start, end)}},
+        {"$group": {"_id": None, "spend": {"$sum": "$total"}, "sales_count": {"$sum": 1}}},
+    ]).to_list(1)
+    if not totals:
+        return {"spend": 0.0, "sales_count": 0}
+    return {"spend": round(totals[0]["spend"], 2), "sales_count": totals[0]["sales_count"]}
@@ -0,0 +1,46 @@
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Type, get_args
+
+from pydantic import BaseModel, TypeAdapter
+
+
+class ModelCodec:
+    """Precompiled encoder / decoder between a model and its Mongo document
+
+    Everything that depends only on the model (field list, datetime fields,
+    projection, list validator) is computed once here instead of walking the
+    keys of every document on every request.
+    """
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self.fields = tuple(model.model_fields)
+        self.datetime_fields = tuple(
+            name for name, field in model.model_fields.items()
+            if field.annotation is datetime or datetime in get_args(field.annotation)
+        )
+        # Inclusion projection: Mongo drops _id and any field the model does
+        # not know about, so decoding never has to strip them in Python.
+        self.projection: Dict[str, int] = {"_id": 0, **{name: 1 for name in self.fields}}
+        self._list_adapter = TypeAdapter(List[model])
+
+    def encode(self, obj: BaseModel) -> dict:
+        doc = obj.model_dump()
+        for name in self.datetime_fields:
+            value = doc.get(name)
+            if value is None:
+                continue
+            # BSON dates carry no timezone: naive values are taken as UTC
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=timezone.utc)
+            # ...and only milliseconds: the encoded document must equal the
+            # stored one, or a cached copy sorts apart from the cursors
+            doc[name] = value.replace(microsecond=value.microsecond // 1000 * 1000)
+        return doc
+
+    def decode(self, doc: dict) -> BaseModel:
+        return self.model.model_validate(doc)
+
+    def decode_many(self, docs: Iterable[dict]) -> List[BaseModel]:
+        """Validate a whole list in one call to the pydantic core"""
+        return self._list_adapter.validate_python(docs if isinstance(docs, list) else list(docs))
@@ -0,0 +1,90 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, List
+
+EXPORT_BATCH_SIZE = 1000
+
+SALE_COLUMNS = [
+    "id", "invoice_number", "created_at", "client_id", "client_name", "item_count",
+    "subtotal", "discount", "total", "payment_method", "status",
+]
+ITEM_COLUMNS = [
+    "sale_id", "invoice_number", "created_at", "client_id", "client_name", "product_id",
+    "product_name", "quantity", "unit_price", "total_price", "payment_method",
+]
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def sale_rows(sale: dict) -> List[dict]:
+    return [{
+        "id": sale["id"],
+        "invoice_number": sale.get("invoice_number"),
+        "created_at": sale.get("created_at"),
+        "client_id": sale.get("client_id"),
+        "client_name": sale.get("client_name"),
+        "item_count": len(sale.get("items", [])),
+        "subtotal": sale.get("subtotal"),
+        "discount": sale.get("discount"),
+        "total": sale.get("total"),
+        "payment_method": sale.get("payment_method"),
+        "status": sale.get("status"),
+    }]
+
+
+def item_rows(sale: dict) -> List[dict]:
+    return [{
+        "sale_id": sale["id"],
+        "invoice_number": sale.get("invoice_number"),
+        "created_at": sale.get("created_at"),
+        "client_id": sale.get("client_id"),
+        "client_name": sale.get("client_name"),
+        "product_id": item.get("product_id"),
+        "product_name": item.get("product_name"),
+        "quantity": item.get("quantity"),
+        "unit_price": item.get("unit_price"),
+        "total_price": item.get("total_price"),
+        "payment_method": sale.get("payment_method"),
+    } for item in sale.get("items", [])]
+
+
+def _format_ndjson(rows: Iterable[Dict]) -> str:
+    return "".join(json.dumps(row, ensure_ascii=False, default=_json_default) + "\n" for row in rows)
+
+
+def _format_csv(rows: Iterable[Dict], columns: List[str]) -> str:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    for row in rows:
+        writer.writerow({k: v.isoformat() if isinstance(v, datetime) else v for k, v in row.items()})
+    return buffer.getvalue()
+
+
+async def stream_sales(cursor, fmt: str = "ndjson", per_item: bool = False) -> AsyncIterator[str]:
+    """Serialize a sales cursor batch by batch
+
+    Only one batch of documents is held in memory at a time, whatever the
+    size of the export.
+    """
+    to_rows = item_rows if per_item else sale_rows
+    columns = ITEM_COLUMNS if per_item else SALE_COLUMNS
+
+    if fmt == "csv":
+        header = io.StringIO()
+        csv.writer(header).writerow(columns)
+        yield header.getvalue()
+
+    batch = []
+    async for sale in cursor:
+        batch.extend(to_rows(sale))
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            yield _format_csv(batch, columns) if fmt == "csv" else _format_ndjson(batch)
+            batch = []
+    if batch:
+        yield _format_csv(batch, columns) if fmt == "csv" else _format_ndjson(batch)
@@ -0,0 +1,204 @@
+import asyncio
+import functools
+import itertools
+import math
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from rollups import day_start
+
+HISTORY_DAYS = 365
+# Velocity window: a whole number of weeks, so weekday effects cancel out
+VELOCITY_DAYS = 28
+LEAD_TIME_DAYS = 2   # commande -> livraison
+COVER_DAYS = 7       # une commande couvre une semaine de ventes
+SERVICE_Z = 1.65     # ~95 % des jours sans rupture
+# Units a product needs to sell before its own weekday profile is trusted
+# over the store-wide one (fish: Fridays)
+PROFILE_PRIOR_UNITS = 50.0
+HORIZON_DAYS = 90
+DAY_MS = 24 * 3600 * 1000
+# Sales history a product needs before its reorder point replaces its
+# stored threshold
+MIN_HISTORY_DAYS = VELOCITY_DAYS
+
+
+@dataclass
+class DemandModel:
+    """Per-product demand, fitted on the daily product rollups
+
+    Rows of every array follow product_ids. factors[:, w] is the weekday w
+    multiplier (Monday = 0), averaging 1 over the week.
+    """
+    product_ids: pd.Index
+    velocity: np.ndarray   # deseasonalized units per day, last VELOCITY_DAYS
+    sigma: np.ndarray      # day-to-day deviation of the deseasonalized series
+    factors: np.ndarray
+    history: np.ndarray    # days since the first sale in the window
+    fitted_at: datetime
+
+
+def fit(rows: pd.DataFrame, today: datetime, history_days: int = HISTORY_DAYS,
+        velocity_days: int = VELOCITY_DAYS) -> DemandModel:
+    """Fit the model on rollup rows with columns day, product_id, quantity"""
+    start = day_start(today) - timedelta(days=history_days - 1)
+    product_codes, product_ids = pd.factorize(rows["product_id"])
+    days = pd.to_datetime(rows["day"], utc=True)
+    day_index = ((days - start) // pd.Timedelta(days=1)).to_numpy(dtype=int)
+    return fit_days(product_ids, product_codes, day_index, rows["quantity"].to_numpy(dtype=float),
+                    today, history_days, velocity_days)
+
+
+def fit_groups(groups: List[dict], today: datetime, history_days: int = HISTORY_DAYS,
+               velocity_days: int = VELOCITY_DAYS) -> DemandModel:
+    """Fit the model on one document per product: {_id: product_id, days, quantities}
+
+    days counts whole days from the start of the history window, as
+    computed by the InventoryForecaster aggregation.
+    """
+    counts = [len(group["days"]) for group in groups]
+    total = sum(counts)
+    return fit_days(
+        pd.Index([group["_id"] for group in groups]),
+        np.repeat(np.arange(len(groups)), counts),
+        np.fromiter(itertools.chain.from_iterable(group["days"] for group in groups), dtype=int, count=total),
+        np.fromiter(itertools.chain.from_iterable(group["quantities"] for group in groups), dtype=float, count=total),
+        today, history_days, velocity_days,
+    )
+
+
+def fit_days(product_ids: pd.Index, product_codes: np.ndarray, day_index: np.ndarray, quantity: np.ndarray,
+             today: datetime, history_days: int = HISTORY_DAYS, velocity_days: int = VELOCITY_DAYS) -> DemandModel:
+    """Fit the model on parallel arrays: product_codes index product_ids, day_index counts from the window start"""
+    start = day_start(today) - timedelta(days=history_days - 1)
+    keep = (day_index >= 0) & (day_index < history_days)
+
+    # products x days matrix of units sold
+    sold = np.zeros((len(product_ids), history_days))
+    np.add.at(sold, (product_codes[keep], day_index[keep]), quantity[keep])
+
+    weekday = (start.weekday() + np.arange(history_days)) % 7
+    by_weekday = np.eye(7)[weekday]                      # days x 7, one-hot
+    days_per_weekday = by_weekday.sum(axis=0)
+
+    # Weekday profiles: the product's own, shrunk towards the store's while
+    # it has sold little
+    def profile(totals):
+        mean_per_weekday = totals / days_per_weekday
+        overall = mean_per_weekday.mean(axis=-1, keepdims=True)
+        return np.divide(mean_per_weekday, overall, out=np.ones_like(mean_per_weekday), where=overall > 0)
+
+    product_totals = sold @ by_weekday                   # products x 7
+    store_profile = profile(product_totals.sum(axis=0))
+    units = product_totals.sum(axis=1, keepdims=True)
+    trust = units / (units + PROFILE_PRIOR_UNITS)
+    factors = trust * profile(product_totals) + (1 - trust) * store_profile
+    factors /= factors.mean(axis=1, keepdims=True)
+
+    recent = sold[:, -velocity_days:]
+    recent_factors = factors[:, weekday[-velocity_days:]]
+    deseasonalized = np.divide(recent, recent_factors, out=np.zeros_like(recent), where=recent_factors > 0)
+    selling = sold > 0
+    first_sale = np.where(selling.any(axis=1), selling.argmax(axis=1), history_days)
+    return DemandModel(
+        product_ids=product_ids,
+        velocity=recent.mean(axis=1),
+        sigma=deseasonalized.std(axis=1),
+        factors=factors,
+        history=history_days - first_sale,
+        fitted_at=today,
+    )
+
+
+def plan(model: DemandModel, products: List[dict], today: datetime,
+         lead_time_days: int = LEAD_TIME_DAYS, cover_days: int = COVER_DAYS) -> pd.DataFrame:
+    """Days of stock left and reorder suggestion for every product
+
+    Products without sales history have no velocity: they only need
+    reordering once out of stock.
+    """
+    catalog = pd.DataFrame.from_records(products, columns=["id", "name", "category", "stock", "unit"])
+    # -1 (no history) picks the extra row appended below
+    rows = model.product_ids.get_indexer(catalog["id"])
+    stock = catalog["stock"].to_numpy(dtype=float)
+
+    velocity = np.append(model.velocity, 0.0)[rows]
+    sigma = np.append(model.sigma, 0.0)[rows]
+    factors = np.vstack([model.factors, np.ones(7)])[rows]
+    history = np.append(model.history, 0)[rows]
+
+    # Expected cumulative demand for today and the following days
+    horizon = max(HORIZON_DAYS, lead_time_days + cover_days)
+    weekdays_ahead = (today.weekday() + np.arange(horizon)) % 7
+    demand = np.cumsum(velocity[:, None] * factors[:, weekdays_ahead], axis=1)
+
+    covered = (demand <= stock[:, None]).sum(axis=1)
+    safety = SERVICE_Z * sigma * math.sqrt(lead_time_days)
+    reorder_point = demand[:, lead_time_days - 1] + safety
+    target = demand[:, lead_time_days + cover_days - 1] + safety
+
+    catalog["daily_velocity"] = velocity.round(2)
+    catalog["history_days"] = history
+    catalog["days_of_stock"] = np.where((velocity > 0) & (covered < horizon), covered, np.nan)
+    catalog["reorder_point"] = reorder_point.round(2)
+    catalog["suggested_reorder"] = np.ceil(np.maximum(target - stock, 0))
+    catalog["needs_reorder"] = ((velocity > 0) & (stock <= reorder_point)) | (stock <= 0)
+    return catalog.rename(columns={"id": "product_id"}).sort_values(["days_of_stock", "stock"], na_position="last")
+
+
+def records(frame: pd.DataFrame) -> List[dict]:
+    """JSON-ready rows: NaN becomes None, numpy scalars become Python ones"""
+    frame = frame.astype(object).where(frame.notna(), None)
+    return frame.to_dict(orient="records")
+
+
+class InventoryForecaster:
+    """Demand model over the sales_daily product rows, refitted every max_age seconds
+
+    Fitting reads up to a year of rollups, grouped per product by MongoDB,
+    and runs in the default executor so the event loop keeps serving;
+    planning against the current stock is cheap and done on every call.
+    """
+
+    def __init__(self, collection, max_age: float = 900.0):
+        self.collection = collection
+        self.max_age = max_age
+        self._model: Optional[DemandModel] = None
+        self._fitted_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        # Changes on every refit: lets callers tell two models apart
+        self.generation = 0
+
+    async def model(self) -> DemandModel:
+        if self._fitted_at is not None and time.monotonic() - self._fitted_at < self.max_age:
+            return self._model
+        async with self._lock:
+            if self._fitted_at is not None and time.monotonic() - self._fitted_at < self.max_age:
+                return self._model
+            today = datetime.now(timezone.utc)
+            since = day_start(today) - timedelta(days=HISTORY_DAYS - 1)
+            # One document per product with two flat arrays, day offsets
+            # rather than dates, instead of a document per product and day
+            groups = await self.collection.aggregate([
+                {"$match": {"level": "product", "day": {"$gte": since}}},
+                {"$group": {
+                    "_id": "$product_id",
+                    "days": {"$push": {"$toInt": {"$divide": [{"$subtract": ["$day", since]}, DAY_MS]}}},
+                    "quantities": {"$push": "$quantity"},
+                }},
+            ], allowDiskUse=True).to_list(None)
+            loop = asyncio.get_running_loop()
+            self._model = await loop.run_in_executor(None, functools.partial(fit_groups, groups, today))
+            self._fitted_at = time.monotonic()
+            self.generation += 1
+            return self._model
+
+    async def plan(self, products: List[dict], lead_time_days: int = LEAD_TIME_DAYS,
+                   cover_days: int = COVER_DAYS) -> pd.DataFrame:
+        model = await self.model()
+        return plan(model, products, datetime.now(timezone.utc), lead_time_days, cover_days)
@@ -0,0 +1,111 @@
+import asyncio
+import hashlib
+import json
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Tuple
+
+from fastapi import HTTPException
+from pymongo.errors import DuplicateKeyError
+
+# How long a key is remembered (TTL index on created_at)
+IDEMPOTENCY_TTL = timedelta(hours=24)
+# A claim older than this belongs to a worker that died mid-request: the
+# next retry takes it over instead of waiting for the TTL
+CLAIM_TIMEOUT = timedelta(seconds=60)
+
+
+def fingerprint(payload: dict) -> str:
+    """Stable hash of a request body, to refuse a key reused for another request"""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """Results of POST requests by Idempotency-Key
+
+    A key is claimed in the collection before the operation runs, so a retry
+    reaching another worker cannot run it twice. Completed results are kept
+    in the collection and in a small in-memory front; a retry arriving while
+    the first request is still running on this worker waits for its result.
+    Failed operations release their claim: nothing was recorded, the retry
+    runs again.
+    """
+
+    def __init__(self, collection, scope: str, memory_size: int = 1024):
+        self.collection = collection
+        self.scope = scope
+        self.memory_size = memory_size
+        self._done: "OrderedDict[str, Tuple[str, dict]]" = OrderedDict()
+        self._in_flight: Dict[str, Tuple[str, asyncio.Future]] = {}
+
+    def _remember(self, key: str, request_hash: str, result: dict):
+        self._done[key] = (request_hash, result)
+        self._done.move_to_end(key)
+        if len(self._done) > self.memory_size:
+            self._done.popitem(last=False)
+
+    @staticmethod
+    def _check(key: str, stored_hash: str, request_hash: str):
+        if stored_hash != request_hash:
+            raise HTTPException(status_code=422, detail=f"La clé d'idempotence {key} a déjà servi pour une autre requête")
+
+    async def run(self, key: str, request_hash: str, operation: Callable[[], Awaitable[dict]]) -> dict:
+        """Result of operation() for this key, running it at most once"""
+        if key in self._done:
+            stored_hash, result = self._done[key]
+            self._check(key, stored_hash, request_hash)
+            return result
+        if key in self._in_flight:
+            stored_hash, future = self._in_flight[key]
+            self._check(key, stored_hash, request_hash)
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = (request_hash, future)
+        try:
+            result = await self._run_once(key, request_hash, operation)
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()  # retrieved: waiters are optional
+            raise
+        else:
+            future.set_result(result)
+            self._remember(key, request_hash, result)
+            return result
+        finally:
+            del self._in_flight[key]
+
+    async def _run_once(self, key: str, request_hash: str, operation) -> dict:
+        record_id = f"{self.scope}:{key}"
+        now = datetime.now(timezone.utc)
+        try:
+            await self.collection.insert_one({
+                "_id": record_id, "hash": request_hash, "status": "pending",
+                "created_at": now, "claimed_at": now,
+            })
+        except DuplicateKeyError:
+            record = await self.collection.find_one({"_id": record_id})
+            if record is None:
+                # Released by a failed attempt in the meantime
+                return await self._run_once(key, request_hash, operation)
+            self._check(key, record["hash"], request_hash)
+            if record["status"] == "done":
+                return record["result"]
+            # Still pending: running elsewhere, unless its worker died
+            claimed = await self.collection.find_one_and_update(
+                {"_id": record_id, "status": "pending", "claimed_at": {"$lt": now - CLAIM_TIMEOUT}},
+                {"$set": {"claimed_at": now}}
+            )
+            if claimed is None:
+                raise HTTPException(status_code=409, detail="Requête déjà en cours de traitement, réessayez dans un instant")
+
+        try:
+            result = await operation()
+        except BaseException:
+            await self.collection.delete_one({"_id": record_id, "status": "pending"})
+            raise
+        await self.collection.update_one(
+            {"_id": record_id},
+            {"$set": {"status": "done", "result": result}}
+        )
+        return result
@@ -0,0 +1,123 @@
+import csv
+import io
+import json
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple, Type
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+IMPORT_BATCH_SIZE = 1000
+IMPORT_MAX_ROWS = 50_000
+# Numeric columns may use a decimal comma in spreadsheets exported in French
+_NUMERIC_COLUMNS = ("price", "stock")
+
+
+def parse_rows(body: bytes, fmt: str) -> List[dict]:
+    """Rows of a CSV file (with a header line) or of a JSON array of objects
+
+    Raises ValueError when the payload cannot be read at all.
+    """
+    text = body.decode("utf-8-sig")
+    if fmt == "json":
+        rows = json.loads(text)
+        if not isinstance(rows, list):
+            raise ValueError("un tableau JSON est attendu")
+        return rows
+
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    rows = []
+    for row in csv.DictReader(io.StringIO(text), dialect=dialect):
+        # Empty cells count as missing, so model defaults apply
+        row = {key.strip(): value.strip() for key, value in row.items() if key and value and value.strip()}
+        for column in _NUMERIC_COLUMNS:
+            if column in row:
+                row[column] = row[column].replace(",", ".")
+        rows.append(row)
+    return rows
+
+
+def _describe(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in error['loc']) or 'ligne'}: {error['msg']}" for error in exc.errors())
+
+
+def _validate(rows: List[dict], model: Type[BaseModel], first_row: int, errors: List[dict]) -> List[Tuple[int, BaseModel]]:
+    """Validate a batch in one pass; only a batch with errors is redone row by row"""
+    try:
+        return list(enumerate(TypeAdapter(List[model]).validate_python(rows), start=first_row))
+    except ValidationError:
+        pass
+    valid = []
+    for number, row in enumerate(rows, start=first_row):
+        try:
+            valid.append((number, model(**row)))
+        except ValidationError as exc:
+            errors.append({"row": number, "error": _describe(exc)})
+        except TypeError:
+            errors.append({"row": number, "error": "objet attendu"})
+    return valid
+
+
+def _upsert(product: BaseModel, now: datetime) -> UpdateOne:
+    """Upsert keyed on the SKU when the row has one, on the name otherwise
+
+    Columns present in the row overwrite the stored values; model defaults
+    only apply to new products.
+    """
+    given = product.dict(exclude_unset=True, exclude_none=True)
+    if "reorder_threshold" in given:
+        # A threshold given by the supplier file is kept, not recomputed
+        given.setdefault("auto_reorder", False)
+    defaults = {k: v for k, v in product.dict(exclude_none=True).items() if k not in given}
+    key = {"sku": product.sku} if product.sku else {"name": product.name}
+    return UpdateOne(
+        key,
+        {
+            "$set": {**given, "updated_at": now},
+            "$setOnInsert": {**defaults, "id": str(uuid.uuid4()), "created_at": now},
+        },
+        upsert=True
+    )
+
+
+async def import_products(collection, rows: List[dict], model: Type[BaseModel]) -> dict:
+    """Validate and upsert product rows in batches of IMPORT_BATCH_SIZE
+
+    Returns counts and one error entry per rejected row (1-based row numbers,
+    header excluded). When several rows share a key, the last one wins.
+    """
+    errors: List[dict] = []
+    latest: Dict[tuple, Tuple[int, BaseModel]] = {}
+    for start in range(0, len(rows), IMPORT_BATCH_SIZE):
+        for number, product in _validate(rows[start:start + IMPORT_BATCH_SIZE], model, start + 1, errors):
+            latest[("sku", product.sku) if product.sku else ("name", product.name)] = (number, product)
+
+    now = datetime.now(timezone.utc)
+    pending = sorted(latest.values(), key=lambda entry: entry[0])
+    inserted = updated = 0
+    for start in range(0, len(pending), IMPORT_BATCH_SIZE):
+        batch = pending[start:start + IMPORT_BATCH_SIZE]
+        try:
+            result = await collection.bulk_write([_upsert(product, now) for _, product in batch], ordered=False)
+            inserted += result.upserted_count
+            updated += result.matched_count
+        except BulkWriteError as exc:
+            # Unordered: every other row of the batch was still written
+            inserted += exc.details.get("nUpserted", 0)
+            updated += exc.details.get("nMatched", 0)
+            for error in exc.details.get("writeErrors", []):
+                errors.append({"row": batch[error["index"]][0], "error": error.get("errmsg", "erreur d'écriture")})
+
+    errors.sort(key=lambda error: error["row"])
+    return {
+        "received": len(rows),
+        "inserted": inserted,
+        "updated": updated,
+        "duplicates": len(rows) - len(errors) - inserted - updated,
+        "errors": errors,
+    }
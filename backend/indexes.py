@@ -0,0 +1,130 @@
+import logging
+from typing import Dict, List
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from idempotency import IDEMPOTENCY_TTL
+from stock_alerts import EVENT_RETENTION
+from sync import TOMBSTONE_RETENTION
+
+logger = logging.getLogger(__name__)
+
+# Declared indexes, per collection. Every query issued by the API must be
+# served by one of these; anything else found in the database is reported.
+REQUIRED_INDEXES: Dict[str, List[IndexModel]] = {
+    "products": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # Dashboard low-stock list: only flagged products are indexed
+        IndexModel([("stock", ASCENDING)], name="low_stock",
+                   partialFilterExpression={"is_low_stock": True}),
+        IndexModel([("created_at", ASCENDING), ("id", ASCENDING)], name="created_at_id"),
+        IndexModel([("name", ASCENDING), ("id", ASCENDING)], name="name_id"),
+        IndexModel([("updated_at", ASCENDING), ("id", ASCENDING)], name="updated_at_id"),
+        # Import upserts are keyed on the SKU; products without one are not indexed
+        IndexModel([("sku", ASCENDING)], name="sku_unique", unique=True,
+                   partialFilterExpression={"sku": {"$type": "string"}}),
+    ],
+    "clients": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("created_at", ASCENDING), ("id", ASCENDING)], name="created_at_id"),
+        IndexModel([("name", ASCENDING), ("id", ASCENDING)], name="name_id"),
+        IndexModel([("updated_at", ASCENDING), ("id", ASCENDING)], name="updated_at_id"),
+        # One client per normalized name; clients not backfilled yet have no key
+        IndexModel([("name_key", ASCENDING)], name="name_key_unique", unique=True,
+                   partialFilterExpression={"name_key": {"$type": "string"}}),
+    ],
+    "sales": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id"),
+        IndexModel([("total", DESCENDING), ("id", DESCENDING)], name="total_id"),
+        # Purchase history and statements of one client, in date order
+        IndexModel([("client_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+                   name="client_id_created_at_id"),
+        IndexModel([("updated_at", ASCENDING), ("id", ASCENDING)], name="updated_at_id"),
+    ],
+    "client_ledger": [
+        IndexModel([("client_id", ASCENDING), ("seq", ASCENDING)], name="client_id_seq", unique=True),
+        IndexModel([("client_id", ASCENDING), ("created_at", ASCENDING)], name="client_id_created_at"),
+    ],
+    "tombstones": [
+        IndexModel([("collection", ASCENDING), ("deleted_at", ASCENDING)], name="collection_deleted_at"),
+        IndexModel([("deleted_at", ASCENDING)], name="deleted_at_ttl",
+                   expireAfterSeconds=int(TOMBSTONE_RETENTION.total_seconds())),
+    ],
+    "sales_daily": [
+        IndexModel([("level", ASCENDING), ("day", ASCENDING)], name="level_day"),
+    ],
+    "stock_events": [
+        IndexModel([("seq", ASCENDING)], name="seq_unique", unique=True),
+        IndexModel([("created_at", ASCENDING)], name="created_at_ttl",
+                   expireAfterSeconds=int(EVENT_RETENTION.total_seconds())),
+    ],
+    "idempotency": [
+        IndexModel([("created_at", ASCENDING)], name="created_at_ttl",
+                   expireAfterSeconds=int(IDEMPOTENCY_TTL.total_seconds())),
+    ],
+}
+
+# Options that change the behaviour of an index; anything else reported by
+# index_information() (version, namespace...) is ignored when comparing.
+_COMPARED_OPTIONS = ("unique", "sparse", "partialFilterExpression", "expireAfterSeconds", "collation")
+
+
+def _normalize(info: dict) -> dict:
+    key = info["key"].items() if hasattr(info["key"], "items") else info["key"]
+    spec = {"key": [(field, int(direction) if isinstance(direction, float) else direction) for field, direction in key]}
+    for option in _COMPARED_OPTIONS:
+        if info.get(option):
+            spec[option] = info[option]
+    return spec
+
+
+async def check_indexes(db) -> Dict[str, dict]:
+    """Compare the declared indexes with the ones present in the database"""
+    report = {}
+    for collection_name, models in REQUIRED_INDEXES.items():
+        existing = await db[collection_name].index_information()
+        existing.pop("_id_", None)
+
+        declared = {model.document["name"]: model.document for model in models}
+        missing, drifted = [], []
+        for name, document in declared.items():
+            if name not in existing:
+                missing.append(name)
+            elif _normalize(existing[name]) != _normalize(document):
+                drifted.append(name)
+        extra = [name for name in existing if name not in declared]
+
+        report[collection_name] = {"missing": missing, "drifted": drifted, "extra": extra}
+    return report
+
+
+async def create_index(db, collection_name: str, name: str):
+    """Build one declared index now, for a migration that relies on it
+
+    Unlike ensure_indexes, a failure is raised rather than logged.
+    """
+    model = next(model for model in REQUIRED_INDEXES[collection_name] if model.document["name"] == name)
+    await db[collection_name].create_indexes([model])
+
+
+async def ensure_indexes(db) -> Dict[str, dict]:
+    """Create missing indexes and log any drift from the declared set"""
+    report = await check_indexes(db)
+    for collection_name, status in report.items():
+        for name in status["drifted"]:
+            logger.warning("Index %s.%s differs from its declaration; drop it to let it be rebuilt", collection_name, name)
+        for name in status["extra"]:
+            logger.warning("Index %s.%s is not declared in REQUIRED_INDEXES", collection_name, name)
+
+        to_create = [model for model in REQUIRED_INDEXES[collection_name] if model.document["name"] in status["missing"]]
+        for model in to_create:
+            # One index at a time so a single failure (e.g. duplicate ids
+            # preventing a unique index) does not block the others.
+            try:
+                await db[collection_name].create_indexes([model])
+                logger.info("Created index %s.%s", collection_name, model.document["name"])
+            except OperationFailure as exc:
+                logger.error("Could not create index %s.%s: %s", collection_name, model.document["name"], exc)
+    return report
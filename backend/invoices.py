@@ -0,0 +1,52 @@
+import asyncio
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pymongo import ReturnDocument
+
+
+class InvoiceNumberAllocator:
+    """Invoice numbers from an atomic counter in the counters collection
+
+    Each worker reserves block_size numbers at a time with a single $inc and
+    hands them out from memory, so most sales cost no round-trip. Numbers are
+    unique across workers and restarts; the unused end of a block is lost
+    when a worker stops, so the sequence may have gaps.
+
+    Numbers read PREFIX[-STORE][-YYYYMMDD]-NNNNNN; with per_day the sequence
+    restarts every day (server local date, as printed on the receipt).
+    """
+
+    def __init__(self, collection, prefix: str = "INV", store_code: str = "",
+                 per_day: bool = True, block_size: int = 50):
+        self.collection = collection
+        self.prefix = "-".join(part for part in (prefix, store_code) if part)
+        self.per_day = per_day
+        self.block_size = block_size
+        # series -> [next number to hand out, last number reserved]
+        self._blocks: Dict[str, List[int]] = {}
+        self._lock = asyncio.Lock()
+
+    def _series(self, moment: datetime) -> str:
+        return f"{self.prefix}-{moment:%Y%m%d}" if self.per_day else self.prefix
+
+    async def _reserve(self, series: str) -> List[int]:
+        counter = await self.collection.find_one_and_update(
+            {"_id": series},
+            {"$inc": {"last": self.block_size}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return [counter["last"] - self.block_size + 1, counter["last"]]
+
+    async def next(self, moment: Optional[datetime] = None) -> str:
+        series = self._series(moment or datetime.now())
+        async with self._lock:
+            block = self._blocks.get(series)
+            if block is None or block[0] > block[1]:
+                block = await self._reserve(series)
+                # Only the current series is kept: yesterday's block is done
+                self._blocks = {series: block}
+            number = block[0]
+            block[0] += 1
+        return f"{series}-{number:06d}"
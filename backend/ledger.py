@@ -0,0 +1,132 @@
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+# Entry kinds: debt taken on a credit sale, payment received, undo of a
+# credit sale that could not be saved, balance carried over from before
+# the ledger existed
+SALE = "vente"
+PAYMENT = "paiement"
+REVERSAL = "annulation"
+OPENING = "report"
+
+# Fields of the client document returned by ledger writes
+_BALANCE = {"_id": 0, "id": 1, "current_debt": 1, "credit_limit": 1, "ledger_seq": 1}
+
+
+def _money(expression):
+    return {"$round": [expression, 2]}
+
+
+async def _move(db, filter: dict, client_id: str, amount: float, session=None) -> Optional[dict]:
+    """Apply amount to current_debt when filter matches, and number the move
+
+    A single find_one_and_update: the guard in filter, the new balance and
+    the entry number (ledger_seq) come from one atomic write.
+    """
+    return await db.clients.find_one_and_update(
+        {"id": client_id, **filter},
+        {
+            "$inc": {"current_debt": amount, "ledger_seq": 1},
+            "$set": {"updated_at": datetime.now(timezone.utc)},
+        },
+        projection=_BALANCE,
+        return_document=ReturnDocument.AFTER,
+        session=session
+    )
+
+
+async def _append(db, client: dict, kind: str, amount: float, session=None, **details) -> dict:
+    """Record one move; its balance is the one written by that very move"""
+    entry = {
+        "id": str(uuid.uuid4()),
+        "client_id": client["id"],
+        "seq": client["ledger_seq"],
+        "kind": kind,
+        "amount": amount,
+        "balance": round(client["current_debt"], 2),
+        "created_at": datetime.now(timezone.utc),
+        **details,
+    }
+    await db.client_ledger.insert_one(entry, session=session)
+    entry.pop("_id", None)
+    return entry
+
+
+async def charge(db, client_id: str, amount: float, sale_id: str, session=None) -> Optional[dict]:
+    """Add a credit sale to the client's debt, unless it would exceed credit_limit
+
+    Returns the ledger entry, or None when the client is missing or over
+    the limit (the guard is part of the update filter: concurrent sales
+    cannot both slip under it).
+    """
+    amount = round(amount, 2)
+    if amount < 0:
+        raise ValueError(f"Charge amount must not be negative: {amount}")
+    client = await _move(db, {"$expr": {"$lte": [
+        _money({"$add": [{"$ifNull": ["$current_debt", 0]}, amount]}),
+        {"$ifNull": ["$credit_limit", 0]},
+    ]}}, client_id, amount, session)
+    if client is None:
+        return None
+    return await _append(db, client, SALE, amount, session, sale_id=sale_id)
+
+
+async def reverse(db, entry: dict, session=None) -> dict:
+    """Cancel a charge whose sale could not be saved"""
+    client = await _move(db, {}, entry["client_id"], -entry["amount"], session)
+    return await _append(db, client, REVERSAL, -entry["amount"], session, sale_id=entry.get("sale_id"))
+
+
+async def pay(db, client_id: str, amount: float, payment_method: str,
+              note: Optional[str] = None, session=None) -> Optional[dict]:
+    """Record a payment, unless it is more than the client owes (None then)"""
+    amount = round(amount, 2)
+    client = await _move(db, {"$expr": {"$gte": [_money({"$ifNull": ["$current_debt", 0]}), amount]}},
+                         client_id, -amount, session)
+    if client is None:
+        return None
+    return await _append(db, client, PAYMENT, -amount, session, payment_method=payment_method, note=note)
+
+
+async def entries(db, client_id: str, limit: int, after: Optional[int] = None) -> List[dict]:
+    """Latest entries first, continuing below entry number after when given"""
+    query = {"client_id": client_id}
+    if after is not None:
+        query["seq"] = {"$lt": after}
+    return await db.client_ledger.find(query, {"_id": 0}).sort("seq", -1).limit(limit).to_list(limit)
+
+
+async def balance_at(db, client_id: str, moment: datetime) -> float:
+    """Client's debt as of moment
+
+    Every entry is a snapshot of the balance right after it: the last entry
+    before moment gives the answer without replaying any history.
+    """
+    last = await db.client_ledger.find(
+        {"client_id": client_id, "created_at": {"$lt": moment}}, {"_id": 0, "balance": 1}
+    ).sort([("created_at", -1), ("seq", -1)]).limit(1).to_list(1)
+    return last[0]["balance"] if last else 0.0
+
+
+async def open_ledgers(db) -> dict:
+    """Carry the debt of clients created before the ledger over as their first entry"""
+    opened = 0
+    async for legacy in db.clients.find({"ledger_seq": {"$exists": False}, "current_debt": {"$gt": 0}}, {"id": 1}):
+        client = await db.clients.find_one_and_update(
+            {"id": legacy["id"], "ledger_seq": {"$exists": False}},
+            {"$set": {"ledger_seq": 1}},
+            projection=_BALANCE,
+            return_document=ReturnDocument.AFTER
+        )
+        if client is not None:
+            await _append(db, client, OPENING, round(client["current_debt"], 2))
+            opened += 1
+    if opened:
+        logger.info("Opened the ledger of %d clients with an existing debt", opened)
+    return {"opened": opened}
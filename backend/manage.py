@@ -0,0 +1,93 @@
+"""Maintenance commands: python manage.py --help"""
+import asyncio
+import os
+from datetime import datetime
+from typing import Optional
+from pathlib import Path
+
+import typer
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+import client_history
+import ledger
+import rollups
+import stats
+from indexes import ensure_indexes
+from migrations import backfill_client_keys, backfill_low_stock, backfill_updated_at, migrate_dates
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+cli = typer.Typer(help="Commandes de maintenance Boutique Surgelés")
+
+
+def run(command):
+    """Run a coroutine function against the configured database"""
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    try:
+        return asyncio.run(command(client[os.environ['DB_NAME']]))
+    finally:
+        client.close()
+
+
+@cli.command("ensure-indexes")
+def ensure_indexes_command():
+    """Créer les index manquants et signaler les divergences"""
+    typer.echo(run(ensure_indexes))
+
+
+@cli.command("rebuild-stats")
+def rebuild_stats_command():
+    """Recalculer les compteurs du tableau de bord"""
+    typer.echo(run(stats.rebuild_stats))
+
+
+@cli.command("migrate-dates")
+def migrate_dates_command(batch_size: int = typer.Option(1000, help="Documents par lot")):
+    """Convertir les dates stockées en texte ISO en dates BSON (reprend là où il s'est arrêté)"""
+    typer.echo(run(lambda db: migrate_dates(db, batch_size)))
+
+
+@cli.command("backfill-updated-at")
+def backfill_updated_at_command():
+    """Renseigner updated_at (date de création) sur les clients et ventes qui n'en ont pas"""
+    typer.echo(run(backfill_updated_at))
+
+
+@cli.command("backfill-client-keys")
+def backfill_client_keys_command():
+    """Renseigner la clé de nom normalisée des clients et signaler les doublons"""
+    typer.echo(run(backfill_client_keys))
+
+
+@cli.command("backfill-low-stock")
+def backfill_low_stock_command():
+    """Renseigner le seuil de réapprovisionnement par défaut et l'indicateur de stock faible des produits"""
+    typer.echo(run(backfill_low_stock))
+
+
+@cli.command("open-ledgers")
+def open_ledgers_command():
+    """Reporter la dette des clients antérieurs au grand livre comme première écriture"""
+    typer.echo(run(ledger.open_ledgers))
+
+
+@cli.command("rebuild-client-totals")
+def rebuild_client_totals_command():
+    """Recalculer le total des achats, le nombre de ventes et la dernière visite de chaque client"""
+    typer.echo(run(client_history.rebuild_client_totals))
+
+
+@cli.command("rebuild-rollups")
+def rebuild_rollups_command(
+    start: Optional[datetime] = typer.Option(None, formats=["%Y-%m-%d"], help="Premier jour (défaut: première vente)"),
+    end: Optional[datetime] = typer.Option(None, formats=["%Y-%m-%d"], help="Jour de fin, exclu (défaut: demain)"),
+    batch_size: int = typer.Option(1000, help="Ventes lues par lot"),
+):
+    """Recalculer les agrégats journaliers des ventes (reprend là où il s'est arrêté)"""
+    typer.echo(run(lambda db: rollups.rebuild_rollups(db, start, end, batch_size)))
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,155 @@
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
+
+from indexes import create_index
+from search import normalize
+from stock_alerts import low_stock_stages
+
+logger = logging.getLogger(__name__)
+
+# Datetime fields written as ISO strings by earlier versions of the API
+DATE_FIELDS: Dict[str, List[str]] = {
+    "products": ["created_at", "updated_at"],
+    "clients": ["created_at", "updated_at"],
+    "sales": ["created_at", "updated_at"],
+}
+MIGRATION_ID = "bson_dates"
+
+
+def _legacy_filter(fields: List[str]) -> dict:
+    return {"$or": [{field: {"$type": "string"}} for field in fields]}
+
+
+def parse_date(value: str) -> datetime:
+    """Legacy ISO string -> aware datetime (naive ones were UTC), to the millisecond as BSON stores it"""
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    parsed = parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+    return parsed.replace(microsecond=parsed.microsecond // 1000 * 1000)
+
+
+async def has_legacy_dates(db) -> List[str]:
+    """Collections that still hold ISO-string dates"""
+    return [
+        name for name, fields in DATE_FIELDS.items()
+        if await db[name].find_one(_legacy_filter(fields), {"_id": 1}) is not None
+    ]
+
+
+async def migrate_dates(db, batch_size: int = 1000) -> dict:
+    """Convert ISO-string dates to native BSON dates, batch by batch
+
+    Progress is checkpointed by _id in the migrations collection after every
+    batch, so an interrupted run resumes where it stopped. Only documents that
+    still hold strings are rewritten; running it again is harmless.
+    """
+    checkpoint = await db.migrations.find_one({"_id": MIGRATION_ID}) or {}
+    if checkpoint.get("completed_at"):
+        # A finished run starts over: the string filter keeps it cheap
+        checkpoint = {}
+    report = {}
+    for name, fields in DATE_FIELDS.items():
+        query = _legacy_filter(fields)
+        last_id = checkpoint.get(name)
+        converted = failed = 0
+        while True:
+            batch_query = {"$and": [query, {"_id": {"$gt": last_id}}]} if last_id is not None else query
+            docs = await db[name].find(batch_query, {field: 1 for field in fields}).sort("_id", 1).limit(batch_size).to_list(batch_size)
+            if not docs:
+                break
+
+            operations = []
+            for doc in docs:
+                update = {}
+                for field in fields:
+                    if isinstance(doc.get(field), str):
+                        try:
+                            update[field] = parse_date(doc[field])
+                        except ValueError:
+                            failed += 1
+                            logger.warning("%s %s: unparseable %s %r left as is", name, doc["_id"], field, doc[field])
+                if update:
+                    operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": update}))
+            if operations:
+                result = await db[name].bulk_write(operations, ordered=False)
+                converted += result.modified_count
+
+            last_id = docs[-1]["_id"]
+            await db.migrations.update_one({"_id": MIGRATION_ID}, {"$set": {name: last_id}}, upsert=True)
+
+        report[name] = {"converted": converted, "failed": failed}
+        logger.info("Migrated %s: %d documents converted, %d values failed", name, converted, failed)
+
+    await db.migrations.update_one(
+        {"_id": MIGRATION_ID},
+        {"$set": {"completed_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+    return report
+
+
+async def backfill_updated_at(db) -> dict:
+    """Give documents written before updated_at existed their creation date
+
+    Such documents never match a delta sync (they have not changed since),
+    but without the field they would read back with a fresh timestamp.
+    """
+    report = {}
+    for name in ("clients", "sales"):
+        result = await db[name].update_many(
+            {"updated_at": {"$exists": False}},
+            [{"$set": {"updated_at": "$created_at"}}]
+        )
+        report[name] = result.modified_count
+        logger.info("Backfilled updated_at on %d %s", result.modified_count, name)
+    return report
+
+
+async def backfill_client_keys(db, batch_size: int = 1000) -> dict:
+    """Set name_key on clients stored before it existed
+
+    Clients whose normalized name is already taken keep no key and are
+    reported: they are duplicates to merge by hand. The unique index is
+    built first: keys written without it could collide and keep it from
+    ever being built.
+    """
+    try:
+        await create_index(db, "clients", "name_key_unique")
+    except OperationFailure as exc:
+        logger.critical("Index clients.name_key_unique cannot be built, client keys not backfilled: %s. "
+                        "Merge the clients sharing a name_key, then run `python manage.py backfill-client-keys`", exc)
+        raise
+    keyed = duplicates = 0
+    last_id = None
+    while True:
+        query = {"name_key": {"$exists": False}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        docs = await db.clients.find(query, {"name": 1}).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not docs:
+            break
+        operations = [UpdateOne({"_id": doc["_id"]}, {"$set": {"name_key": normalize(doc.get("name") or "")}}) for doc in docs]
+        try:
+            result = await db.clients.bulk_write(operations, ordered=False)
+            keyed += result.modified_count
+        except BulkWriteError as exc:
+            keyed += exc.details.get("nModified", 0)
+            for error in exc.details.get("writeErrors", []):
+                duplicates += 1
+                logger.warning("Client %r duplicates an existing name, left without name_key", docs[error["index"]].get("name"))
+        last_id = docs[-1]["_id"]
+
+    if keyed or duplicates:
+        logger.info("Backfilled name_key on %d clients, %d duplicates", keyed, duplicates)
+    return {"keyed": keyed, "duplicates": duplicates}
+
+
+async def backfill_low_stock(db) -> dict:
+    """Give products stored before per-product thresholds the default one and their is_low_stock flag"""
+    result = await db.products.update_many({"is_low_stock": {"$exists": False}}, low_stock_stages())
+    if result.modified_count:
+        logger.info("Backfilled is_low_stock on %d products", result.modified_count)
+    return {"flagged": result.modified_count}
@@ -0,0 +1,56 @@
+import base64
+from typing import List, Optional, Tuple
+
+from bson import json_util
+from bson.json_util import JSONOptions, JSONMode
+from fastapi import HTTPException
+from pymongo import ASCENDING, DESCENDING
+
+_JSON_OPTIONS = JSONOptions(json_mode=JSONMode.RELAXED, tz_aware=True)
+
+
+def encode_cursor(value, doc_id: str) -> str:
+    """Opaque cursor pointing just after the document (value, doc_id)"""
+    raw = json_util.dumps([value, doc_id], json_options=_JSON_OPTIONS)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[object, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, doc_id = json_util.loads(base64.urlsafe_b64decode(padded).decode(), json_options=_JSON_OPTIONS)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+    return value, doc_id
+
+
+def parse_sort(sort: str, allowed: List[str]) -> Tuple[str, int]:
+    """'name' -> ascending, '-name' -> descending; only indexed fields are allowed"""
+    field = sort.lstrip("-")
+    if field not in allowed:
+        raise HTTPException(status_code=400, detail=f"Tri non supporté: {sort}. Valeurs possibles: {', '.join(allowed)}")
+    return field, DESCENDING if sort.startswith("-") else ASCENDING
+
+
+async def paginate(collection, query: dict, sort: str, allowed: List[str], limit: int,
+                   after: Optional[str] = None, projection: Optional[dict] = None) -> Tuple[List[dict], Optional[str]]:
+    """Keyset pagination on (sort field, id)
+
+    Each page is an index range scan starting right after the cursor, so the
+    cost of a page does not depend on how deep it is.
+    """
+    field, direction = parse_sort(sort, allowed)
+    if after:
+        value, doc_id = decode_cursor(after)
+        op = "$gt" if direction == ASCENDING else "$lt"
+        query = {"$and": [query, {"$or": [
+            {field: {op: value}},
+            {field: value, "id": {op: doc_id}},
+        ]}]}
+
+    docs = await collection.find(query, projection).sort([(field, direction), ("id", direction)]).limit(limit + 1).to_list(limit + 1)
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1].get(field), docs[-1]["id"])
+    return docs, next_cursor
@@ -0,0 +1,182 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from pymongo import ReplaceOne, UpdateOne
+
+from analytics import PERIOD_FORMATS, created_at_filter
+
+logger = logging.getLogger(__name__)
+
+# sales_daily holds three levels of rows per UTC day:
+#   "<day>"                  level "day"       every sale of the day
+#   "<day>:c:<category>"     level "category"  lines of that category
+#   "<day>:p:<product_id>"   level "product"   lines of that product
+# with quantity, revenue (sum of line totals), discount (the sale discount
+# spread over its lines pro rata) and sales_count (sales touching the row).
+COUNTERS = ("quantity", "revenue", "discount", "sales_count")
+LEVELS = ("day", "category", "product")
+REBUILD_ID = "sales_daily"
+
+
+def day_start(moment: datetime) -> datetime:
+    """Midnight UTC of the moment's day; naive datetimes are taken as UTC"""
+    moment = moment.astimezone(timezone.utc) if moment.tzinfo else moment
+    return datetime(moment.year, moment.month, moment.day, tzinfo=timezone.utc)
+
+
+def _row(day: datetime, level: str, **labels) -> dict:
+    return {"day": day, "level": level, **labels, **dict.fromkeys(COUNTERS, 0)}
+
+
+def sale_rollups(sale: dict, categories: Optional[Dict[str, str]] = None) -> Dict[str, dict]:
+    """Rollup rows contributed by one sale document, by _id
+
+    Items recorded before the category was copied onto sale lines take it
+    from categories (product id -> category) when given.
+    """
+    day = day_start(sale["created_at"])
+    key = day.strftime("%Y-%m-%d")
+    subtotal = sale.get("subtotal") or 0
+    discount_share = (sale.get("discount") or 0) / subtotal if subtotal else 0
+
+    rows = {key: _row(day, "day")}
+    for item in sale.get("items", []):
+        category = item.get("category") or (categories or {}).get(item["product_id"]) or "inconnue"
+        product_row = rows.setdefault(f"{key}:p:{item['product_id']}", _row(
+            day, "product", product_id=item["product_id"], product_name=item.get("product_name"), category=category
+        ))
+        category_row = rows.setdefault(f"{key}:c:{category}", _row(day, "category", category=category))
+        for row in (rows[key], category_row, product_row):
+            row["quantity"] += item["quantity"]
+            row["revenue"] += item["total_price"]
+            row["discount"] += item["total_price"] * discount_share
+    for row in rows.values():
+        row["sales_count"] = 1
+    return rows
+
+
+async def record_sale(db, sale: dict):
+    """Add one new sale to its day's rollups, in a single bulk_write"""
+    operations = []
+    for row_id, row in sale_rollups(sale).items():
+        update = {
+            "$inc": {field: row[field] for field in COUNTERS},
+            "$setOnInsert": {"day": row["day"], "level": row["level"]},
+        }
+        # Latest product name and category win, as in the analytics pipelines
+        labels = {k: v for k, v in row.items() if k not in COUNTERS and k not in ("day", "level")}
+        if labels:
+            update["$set"] = labels
+        operations.append(UpdateOne({"_id": row_id}, update, upsert=True))
+    await db.sales_daily.bulk_write(operations, ordered=False)
+
+
+async def rebuild_rollups(db, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                          batch_size: int = 1000) -> dict:
+    """Recompute sales_daily from the sales collection, one day at a time
+
+    start defaults to the first sale, end (exclusive) to tomorrow. Each day is
+    rebuilt from its sales, read batch_size at a time through the created_at
+    index, then written over the day's rows; the last finished day is
+    checkpointed in the migrations collection, so an interrupted run of the
+    same range resumes there. Sales recorded today while their day is being
+    rewritten may be missed: rebuild the current day again, or run it
+    outside opening hours.
+    Sales still holding ISO-string dates are not seen: run migrate-dates first.
+    """
+    if start is None:
+        first = await db.sales.find({}, {"created_at": 1}).sort("created_at", 1).limit(1).to_list(1)
+        if not first:
+            return {"days": 0, "sales": 0}
+        start = first[0]["created_at"]
+    start = day_start(start)
+    end = day_start(end) if end else day_start(datetime.now(timezone.utc)) + timedelta(days=1)
+
+    checkpoint = await db.migrations.find_one({"_id": REBUILD_ID}) or {}
+    day = start
+    if checkpoint.get("start") == start and checkpoint.get("end") == end and not checkpoint.get("completed_at"):
+        day = checkpoint["next_day"]
+        logger.info("Resuming sales_daily rebuild at %s", day.date())
+    await db.migrations.update_one(
+        {"_id": REBUILD_ID},
+        {"$set": {"start": start, "end": end, "next_day": day}, "$unset": {"completed_at": ""}},
+        upsert=True
+    )
+
+    # Category of products for sale lines recorded without one
+    categories = {p["id"]: p.get("category") async for p in db.products.find({}, {"_id": 0, "id": 1, "category": 1})}
+    days = sales = 0
+    while day < end:
+        next_day = day + timedelta(days=1)
+        rows: Dict[str, dict] = {}
+        cursor = db.sales.find(
+            created_at_filter(day, next_day),
+            {"_id": 0, "created_at": 1, "items": 1, "subtotal": 1, "discount": 1}
+        ).batch_size(batch_size)
+        async for sale in cursor:
+            sales += 1
+            for row_id, row in sale_rollups(sale, categories).items():
+                merged = rows.setdefault(row_id, row)
+                if merged is not row:
+                    for field in COUNTERS:
+                        merged[field] += row[field]
+
+        # Replaced in place rather than deleted and inserted again: a live
+        # record_sale may upsert the same _id in between
+        operations = [ReplaceOne({"_id": row_id}, row, upsert=True) for row_id, row in rows.items()]
+        for offset in range(0, len(operations), batch_size):
+            await db.sales_daily.bulk_write(operations[offset:offset + batch_size], ordered=False)
+        await db.sales_daily.delete_many({"level": {"$in": LEVELS}, "day": day, "_id": {"$nin": list(rows)}})
+
+        days += 1
+        day = next_day
+        await db.migrations.update_one({"_id": REBUILD_ID}, {"$set": {"next_day": day}})
+
+    await db.migrations.update_one({"_id": REBUILD_ID}, {"$set": {"completed_at": datetime.now(timezone.utc)}})
+    logger.info("Rebuilt sales_daily for %d days from %d sales", days, sales)
+    return {"start": start, "end": end, "days": days, "sales": sales}
+
+
+async def ensure_rollups(db):
+    """Build the rollups on first start against an existing database, or finish an interrupted build"""
+    checkpoint = await db.migrations.find_one({"_id": REBUILD_ID})
+    if checkpoint is None:
+        await rebuild_rollups(db)
+    elif not checkpoint.get("completed_at"):
+        await rebuild_rollups(db, checkpoint["start"], checkpoint["end"])
+
+
+def report_pipeline(level: str, period: str, start: Optional[datetime] = None,
+                    end: Optional[datetime] = None) -> List[dict]:
+    """Totals per period (and per product or category) read from sales_daily"""
+    match: dict = {"level": level}
+    bounds = {}
+    if start:
+        bounds["$gte"] = day_start(start)
+    if end:
+        bounds["$lt"] = end
+    if bounds:
+        match["day"] = bounds
+
+    group_id = {"period": {"$dateToString": {"format": PERIOD_FORMATS[period], "date": "$day"}}}
+    labels = {}
+    if level == "product":
+        group_id["product_id"] = "$product_id"
+        labels = {"product_name": {"$last": "$product_name"}, "category": {"$last": "$category"}}
+    elif level == "category":
+        group_id["category"] = "$category"
+
+    return [
+        {"$match": match},
+        {"$sort": {"day": 1}},
+        {"$group": {"_id": group_id, **labels, **{field: {"$sum": f"${field}"} for field in COUNTERS}}},
+        {"$sort": {"_id.period": 1, "revenue": -1}},
+        {"$project": {
+            "_id": 0,
+            **{name: f"$_id.{name}" for name in group_id},
+            **{name: 1 for name in labels},
+            **{field: 1 for field in COUNTERS},
+            "net_revenue": {"$subtract": ["$revenue", "$discount"]},
+        }},
+    ]
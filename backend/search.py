@@ -0,0 +1,136 @@
+import heapq
+import re
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+
+_SEPARATORS = re.compile(r"[^0-9a-z]+")
+# Ligatures have no Unicode decomposition but are common in French names
+_LIGATURES = str.maketrans({"œ": "oe", "æ": "ae", "ß": "ss"})
+
+
+def normalize(text: str) -> str:
+    """Lowercase, accent-free, single-spaced form used for matching
+
+    "  Crevettes Décortiquées " -> "crevettes decortiquees"
+    """
+    decomposed = unicodedata.normalize("NFKD", text.casefold().translate(_LIGATURES))
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _SEPARATORS.sub(" ", stripped).strip()
+
+
+# Marks the start of a name in the indexed text
+_START = "\x02 "
+
+
+def _grams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class ProductSearchIndex:
+    """Trigram index over normalized product names
+
+    Matches are accent- and case-insensitive, anywhere in the name. Each name
+    is indexed behind a start marker: the trigrams spanning the marker or a
+    space only occur at the start of the name or of a word, so the same
+    postings answer the three match tiers (name prefix, word prefixes,
+    infix) and the best tiers are served without looking at the others.
+    """
+
+    def __init__(self):
+        self._texts: Dict[str, str] = {}
+        self._order: Dict[str, tuple] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        # Recent query -> ids; tills type the same prefixes all day long.
+        # Dropped whenever a name is indexed or removed.
+        self._results: "OrderedDict[tuple, List[str]]" = OrderedDict()
+        self.cache_size = 1024
+
+    def __len__(self):
+        return len(self._texts)
+
+    def update(self, product_id: str, doc: Optional[dict]):
+        """Catalog listener: index, re-index or drop a product"""
+        if doc is None:
+            self._unindex(product_id)
+            return
+        text = _START + normalize(doc["name"])
+        if self._texts.get(product_id) == text:
+            return  # same name: postings are still valid
+        self._unindex(product_id)
+        self._results.clear()
+        self._texts[product_id] = text
+        self._order[product_id] = (len(text), text)
+        for gram in _grams(text):
+            self._postings.setdefault(gram, set()).add(product_id)
+
+    def _unindex(self, product_id: str):
+        text = self._texts.pop(product_id, None)
+        if text is None:
+            return
+        del self._order[product_id]
+        self._results.clear()
+        for gram in _grams(text):
+            ids = self._postings.get(gram)
+            if ids is not None:
+                ids.discard(product_id)
+                if not ids:
+                    del self._postings[gram]
+
+    def _candidates(self, patterns: List[str]) -> Set[str]:
+        """Ids whose text holds every trigram of every pattern (a superset of the matches)"""
+        grams = set().union(*(_grams(p) for p in patterns))
+        if not grams:
+            # Infix matches need at least three characters; a two-letter
+            # query still matches name and word prefixes through the marker.
+            return set()
+        # Rarest trigrams first keeps the intersections small
+        postings = sorted((self._postings.get(gram, set()) for gram in grams), key=len)
+        candidates = set(postings[0])
+        for ids in postings[1:]:
+            if not candidates:
+                break
+            candidates &= ids
+        return candidates
+
+    def search(self, query: str, limit: int = 10) -> List[str]:
+        """Ids of the best matches first: name prefix, word prefixes, then infix
+
+        Within a tier, shorter names come first, so an exact match always
+        leads.
+        """
+        query = normalize(query)
+        tokens = query.split()
+        if not tokens:
+            return []
+
+        cached = self._results.get((query, limit))
+        if cached is not None:
+            self._results.move_to_end((query, limit))
+            return list(cached)
+
+        tiers = [
+            [_START + query],                  # name starts with the query
+            [" " + token for token in tokens],  # every token starts a word
+            tokens,                             # every token anywhere
+        ]
+        results: List[str] = []
+        seen: Set[str] = set()
+        texts = self._texts
+        for patterns in tiers:
+            candidates = self._candidates(patterns) - seen
+            if len(patterns) == 1:
+                pattern = patterns[0]
+                matches = [i for i in candidates if pattern in texts[i]]
+            else:
+                matches = [i for i in candidates if all(p in texts[i] for p in patterns)]
+            best = heapq.nsmallest(limit - len(results), matches, key=self._order.__getitem__)
+            results.extend(best)
+            seen.update(best)
+            if len(results) >= limit:
+                break
+
+        self._results[(query, limit)] = results
+        if len(self._results) > self.cache_size:
+            self._results.popitem(last=False)
+        return list(results)
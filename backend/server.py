@@ -1,22 +1,49 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, Header, HTTPException, Query, Request, Response
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import DuplicateKeyError
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import List, Optional, Union
 import uuid
+import hashlib
+import json
 from datetime import datetime, timezone
 from decimal import Decimal
+import asyncio
+
+from indexes import ensure_indexes, check_indexes
+from pagination import paginate
+from export import EXPORT_BATCH_SIZE, stream_sales
+from importer import IMPORT_MAX_ROWS, import_products, parse_rows
+from invoices import InvoiceNumberAllocator
+from idempotency import IdempotencyStore, fingerprint
+from writer import BatchWriter
+from migrations import DATE_FIELDS, backfill_client_keys, backfill_low_stock, has_legacy_dates
+from codec import ModelCodec
+from catalog import ProductCatalog
+from forecasting import COVER_DAYS, LEAD_TIME_DAYS, MIN_HISTORY_DAYS, InventoryForecaster, records
+from stock_alerts import DEFAULT_REORDER_THRESHOLD, StockAlerts, event_payload, literal, low_stock_stages
+from search import ProductSearchIndex, normalize
+import stats
+import analytics
+import client_history
+import ledger
+import rollups
+import sync
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+# tz_aware: BSON dates are read back as UTC-aware datetimes
+client = AsyncIOMotorClient(mongo_url, tz_aware=True)
 db = client[os.environ['DB_NAME']]
 
 # Create the main app without a prefix
@@ -25,6 +52,18 @@ app = FastAPI(title="Boutique Surgelés API", version="1.0.0")
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
+# Sort keys accepted by the list endpoints; each one is backed by a
+# (field, id) index declared in indexes.py
+PRODUCT_SORTS = ["created_at", "name"]
+CLIENT_SORTS = ["created_at", "name"]
+SALE_SORTS = ["created_at", "total"]
+CLIENT_SALE_SORTS = ["created_at"]
+PAGE_SIZE_MAX = 1000
+# Comment line sent on idle event streams so proxies keep them open
+EVENT_KEEPALIVE = 15.0
+# Run each checkout in a multi-document transaction (needs a replica set)
+SALE_TRANSACTIONS = os.environ.get('SALE_TRANSACTIONS', '').lower() in ('1', 'true', 'yes')
+
 # Models
 class Product(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -33,6 +72,10 @@ class Product(BaseModel):
     price: float
     stock: float  # Changed to float to support fractional quantities
     unit: str = "kg"  # unité de mesure
+    sku: Optional[str] = None  # référence fournisseur, unique si renseignée
+    reorder_threshold: float = DEFAULT_REORDER_THRESHOLD  # stock faible à ce niveau ou en dessous
+    auto_reorder: bool = True  # seuil recalculé d'après les ventes (voir /inventory/forecast)
+    is_low_stock: bool = False  # tenu à jour à chaque écriture du stock ou du seuil
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
@@ -42,6 +85,9 @@ class ProductCreate(BaseModel):
     price: float
     stock: float  # Changed to float to support fractional quantities
     unit: str = "kg"
+    sku: Optional[str] = None
+    reorder_threshold: Optional[float] = None  # un seuil fixé désactive le calcul automatique
+    auto_reorder: Optional[bool] = None
 
 class ProductUpdate(BaseModel):
     name: Optional[str] = None
@@ -49,6 +95,40 @@ class ProductUpdate(BaseModel):
     price: Optional[float] = None
     stock: Optional[float] = None  # Changed to float to support fractional quantities
     unit: Optional[str] = None
+    sku: Optional[str] = None
+    reorder_threshold: Optional[float] = None
+    auto_reorder: Optional[bool] = None
+
+class ProductAdjustment(BaseModel):
+    id: str
+    price: Optional[float] = None
+    stock_delta: Optional[float] = None  # livraison (+) ou correction (-), appliqué avec $inc
+    stock_set: Optional[float] = None  # inventaire: remplace le stock
+
+class CategoryRepricing(BaseModel):
+    category: str
+    percent: float  # +5 augmente les prix de 5 %, -10 les baisse de 10 %
+
+class ProductBatch(BaseModel):
+    products: List[ProductAdjustment] = []
+    categories: List[CategoryRepricing] = []
+
+class ProductBatchResult(BaseModel):
+    products: List[Product]
+    not_found: List[str]
+
+class ReorderSuggestion(BaseModel):
+    product_id: str
+    name: str
+    category: str
+    stock: float
+    unit: str
+    daily_velocity: float  # unités par jour, corrigées du jour de la semaine
+    history_days: int  # jours depuis la première vente sur l'année écoulée
+    days_of_stock: Optional[float] = None  # None: pas de ventes récentes (ou plus de 90 jours)
+    reorder_point: float
+    suggested_reorder: float
+    needs_reorder: bool
 
 class Client(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -58,7 +138,12 @@ class Client(BaseModel):
     email: Optional[str] = None
     credit_limit: float = 0.0
     current_debt: float = 0.0
+    # Totals of all the client's sales, kept current by every sale
+    lifetime_spend: float = 0.0
+    sales_count: int = 0
+    last_visit_at: Optional[datetime] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class ClientCreate(BaseModel):
     name: str
@@ -74,9 +159,27 @@ class ClientUpdate(BaseModel):
     email: Optional[str] = None
     credit_limit: Optional[float] = None
 
+class LedgerEntry(BaseModel):
+    id: str
+    client_id: str
+    seq: int  # numéro d'écriture du client, croissant
+    kind: str  # "vente", "paiement", "annulation" ou "report"
+    amount: float  # + dette contractée, - remboursement
+    balance: float  # dette du client après cette écriture
+    sale_id: Optional[str] = None
+    payment_method: Optional[str] = None
+    note: Optional[str] = None
+    created_at: datetime
+
+class PaymentCreate(BaseModel):
+    amount: float = Field(gt=0)
+    payment_method: str = "espèces"
+    note: Optional[str] = None
+
 class SaleItem(BaseModel):
     product_id: str
     product_name: str
+    category: Optional[str] = None
     quantity: float
     unit_price: float
     total_price: float
@@ -92,34 +195,264 @@ class Sale(BaseModel):
     payment_method: str = "espèces"  # espèces, carte, crédit
     status: str = "terminée"  # terminée, en_attente, annulée
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    invoice_number: str = Field(default_factory=lambda: f"INV-{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    invoice_number: str  # attribué par invoice_numbers à la création
+
+class SaleItemCreate(BaseModel):
+    product_id: str
+    quantity: float
 
 class SaleCreate(BaseModel):
     client_id: Optional[str] = None
     client_name: str = "Client Anonyme"
-    items: List[dict]  # [{"product_id": "", "quantity": 1}]
+    items: List[SaleItemCreate]
     discount: float = 0.0
     payment_method: str = "espèces"
 
+# Delta sync responses (?updated_since=): documents written since the
+# watermark, ids deleted since then, and the watermark to send next time.
+# Large deltas come in pages: next_cursor goes back as ?after= with the same
+# updated_since until it is null
+class ProductChanges(BaseModel):
+    items: List[Product]
+    deleted: List[str]
+    watermark: datetime
+    next_cursor: Optional[str] = None
+
+class ClientChanges(BaseModel):
+    items: List[Client]
+    deleted: List[str]
+    watermark: datetime
+    next_cursor: Optional[str] = None
+
+class SaleChanges(BaseModel):
+    items: List[Sale]
+    deleted: List[str]
+    watermark: datetime
+    next_cursor: Optional[str] = None
+
+# Client statement: the client's sales over a period with running totals,
+# and their debt at both ends of it
+class StatementSale(Sale):
+    running_total: float  # cumul des ventes de la période jusqu'à celle-ci
+
+class ClientStatement(BaseModel):
+    client: Client
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    period_spend: float
+    period_sales_count: int
+    opening_debt: float  # dette au début de la période
+    closing_debt: float  # dette à la fin de la période
+    sales: List[StatementSale]
+    next_cursor: Optional[str] = None
+
+# Document codecs
+product_codec = ModelCodec(Product)
+client_codec = ModelCodec(Client)
+sale_item_codec = ModelCodec(SaleItem)
+sale_codec = ModelCodec(Sale)
+# Product writes also return the low-stock flag as it was before the write
+product_write_projection = {**product_codec.projection, "was_low_stock": 1}
+
+# Product catalog cache, shared by the product endpoints and the sale path
+catalog = ProductCatalog(db.products, product_codec.projection, max_age=float(os.environ.get('CATALOG_MAX_AGE', '60')),
+                         date_fields=DATE_FIELDS["products"])
+# Autocomplete index over product names, told of every new, renamed or removed product
+search_index = ProductSearchIndex()
+catalog.subscribe(search_index.update)
+# Invoice numbers: unique across workers, reserved from the database in blocks
+invoice_numbers = InvoiceNumberAllocator(
+    db.counters,
+    prefix=os.environ.get('INVOICE_PREFIX', 'INV'),
+    store_code=os.environ.get('STORE_CODE', ''),
+    per_day=os.environ.get('INVOICE_PER_DAY', 'true').lower() in ('1', 'true', 'yes'),
+    block_size=int(os.environ.get('INVOICE_BLOCK_SIZE', '50'))
+)
+# Sales velocity per product, refitted from the daily rollups every FORECAST_MAX_AGE seconds
+forecaster = InventoryForecaster(db.sales_daily, max_age=float(os.environ.get('FORECAST_MAX_AGE', '900')))
+# Low-stock threshold crossings, pushed to the dashboard over /inventory/events
+stock_alerts = StockAlerts(db.stock_events, db.counters)
+# Sales already recorded per Idempotency-Key: a till retrying after a timeout gets the same sale back
+sale_requests = IdempotencyStore(db.idempotency, "sales")
+# Group commit of sale inserts at peak: one insert_many per window instead of
+# one insert_one per sale (not used inside transactions)
+sale_writer = BatchWriter(
+    db.sales,
+    window=float(os.environ.get('SALE_BATCH_WINDOW_MS', '2')) / 1000,
+    max_batch=int(os.environ.get('SALE_BATCH_SIZE', '100'))
+) if os.environ.get('SALE_WRITE_BATCHING', '').lower() in ('1', 'true', 'yes') else None
+
 # Helper functions
-def prepare_for_mongo(data):
-    """Prepare data for MongoDB storage"""
-    if isinstance(data, dict):
-        for key, value in data.items():
-            if isinstance(value, datetime):
-                data[key] = value.isoformat()
-    return data
-
-def parse_from_mongo(item):
-    """Parse data from MongoDB"""
-    if isinstance(item, dict):
-        for key, value in item.items():
-            if isinstance(value, str) and 'T' in value and (value.endswith('Z') or '+' in value[-6:]):
-                try:
-                    item[key] = datetime.fromisoformat(value.replace('Z', '+00:00'))
-                except:
-                    pass
-    return item
+def as_utc(moment: datetime) -> datetime:
+    """Naive datetimes from the query string are taken as UTC"""
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+def as_utc_range(start: Optional[datetime], end: Optional[datetime]):
+    return tuple(as_utc(d) if d else d for d in (start, end))
+
+def make_etag(request: Request, *versions) -> str:
+    """Weak ETag for a list: collection versions plus the query (limit, after, sort...)"""
+    digest = hashlib.sha1(repr((request.url.path, request.url.query, versions)).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """304 response when the caller's copy is current; otherwise tag the full response"""
+    # no-cache: browsers keep the body but revalidate it with If-None-Match every time
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in (tag.strip() for tag in request.headers.get("if-none-match", "").split(",")):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+def client_document(client_obj: Client) -> dict:
+    """Stored form of a client: the model plus the normalized name used to match it
+
+    "mme dupont " and "Mme Dupont" share the same name_key, which is unique.
+    """
+    return {**client_codec.encode(client_obj), "name_key": normalize(client_obj.name)}
+
+async def find_or_create_client(name: str, session=None):
+    """Client matching the name, created if needed, in one atomic upsert
+
+    Two tills entering the same new name concurrently end up with the same
+    client. Returns the client and whether it was just created.
+    """
+    new_client = Client(
+        name=name,
+        phone="",
+        address="",
+        email="",
+        credit_limit=0.0,
+        current_debt=0.0
+    )
+    new_data = client_document(new_client)
+    for attempt in range(2):
+        try:
+            client_doc = await db.clients.find_one_and_update(
+                {"name_key": new_data["name_key"]},
+                {"$setOnInsert": new_data},
+                projection={"_id": 0, "id": 1, "name": 1},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+                session=session
+            )
+            break
+        except DuplicateKeyError:
+            # Lost the race against a concurrent insert of the same name: it
+            # exists now. A transaction is aborted by the error: let it retry.
+            if attempt or session is not None:
+                raise
+    return client_doc, client_doc["id"] == new_client.id
+
+async def release_stock(quantities, notify=True):
+    """Give back stock taken by reserve_stock
+
+    notify=False when undoing a reservation whose crossing was never
+    published (the sale failed).
+    """
+    if not quantities:
+        return
+    now = datetime.now(timezone.utc)
+    
+    async def increment(product_id, quantity):
+        product = await db.products.find_one_and_update(
+            {"id": product_id},
+            low_stock_stages(stock={"$add": ["$stock", quantity]}, updated_at=now),
+            projection=product_write_projection,
+            return_document=ReturnDocument.AFTER
+        )
+        if product:
+            catalog.put(product)
+        return product
+    
+    released = await asyncio.gather(*(increment(product_id, quantity) for product_id, quantity in quantities.items()))
+    await stats.increment(db, "products")
+    if notify:
+        await stock_alerts.publish(product for product in released if product)
+
+async def reserve_stock(quantities, products, session=None):
+    """Atomically decrement stock for every line, all or nothing
+
+    Returns the updated products; the caller puts them in the catalog once
+    the sale is saved.
+    """
+    now = datetime.now(timezone.utc)
+    
+    async def decrement(product_id, quantity):
+        # Guarded decrement: the filter only matches while enough stock is
+        # left, so concurrent checkouts can never take the stock below zero.
+        # The same single-document update refreshes the low-stock flag.
+        return await db.products.find_one_and_update(
+            {"id": product_id, "stock": {"$gte": quantity}},
+            low_stock_stages(stock={"$subtract": ["$stock", quantity]}, updated_at=now),
+            projection=product_write_projection,
+            return_document=ReturnDocument.AFTER,
+            session=session
+        )
+    
+    if session is not None:
+        # In a transaction: a session runs one operation at a time, and a
+        # failed line needs no compensation since the abort undoes the others
+        reserved = []
+        for product_id, quantity in quantities.items():
+            product = await decrement(product_id, quantity)
+            if product is None:
+                raise HTTPException(status_code=400, detail=f"Stock insuffisant pour {products[product_id]['name']}")
+            reserved.append(product)
+        return reserved
+    
+    # Lines are independent documents: send the guarded updates concurrently
+    # (one round-trip of latency) and keep track of which ones went through.
+    lines = list(quantities.items())
+    applied = await asyncio.gather(
+        *(decrement(product_id, quantity) for product_id, quantity in lines),
+        return_exceptions=True
+    )
+    
+    failed = [product_id for (product_id, _), product in zip(lines, applied) if not isinstance(product, dict)]
+    if failed:
+        await release_stock(
+            {product_id: quantity for (product_id, quantity), product in zip(lines, applied) if isinstance(product, dict)},
+            notify=False
+        )
+        errors = [product for product in applied if isinstance(product, Exception)]
+        if errors:
+            raise errors[0]
+        raise HTTPException(status_code=400, detail=f"Stock insuffisant pour {products[failed[0]]['name']}")
+    return applied
+
+async def apply_reorder_thresholds() -> int:
+    """Store the forecast reorder points as thresholds of the auto_reorder products
+
+    Only changed thresholds are written; returns how many were. Products
+    not selling, or selling for less than MIN_HISTORY_DAYS, keep the
+    threshold they have (the default one for new products).
+    """
+    products = await catalog.values()
+    forecast = await forecaster.plan(products)
+    forecast = forecast[(forecast["daily_velocity"] > 0) & (forecast["history_days"] >= MIN_HISTORY_DAYS)]
+    current = {product["id"]: product for product in products}
+    changes = {
+        product_id: point
+        for product_id, point in zip(forecast["product_id"], forecast["reorder_point"].tolist())
+        if current[product_id].get("auto_reorder", True) and current[product_id].get("reorder_threshold") != point
+    }
+    if not changes:
+        return 0
+    now = datetime.now(timezone.utc)
+    await db.products.bulk_write([
+        # A threshold set by hand meanwhile wins
+        UpdateOne({"id": product_id, "auto_reorder": {"$ne": False}},
+                  low_stock_stages(reorder_threshold=point, updated_at=now))
+        for product_id, point in changes.items()
+    ], ordered=False)
+    updated = await db.products.find({"id": {"$in": list(changes)}}, product_write_projection).to_list(None)
+    for product in updated:
+        catalog.put(product)
+    await stats.increment(db, "products")
+    await stock_alerts.publish(updated)
+    return len(changes)
 
 # Routes
 @api_router.get("/")
@@ -129,37 +462,165 @@ async def root():
 # Products endpoints
 @api_router.post("/products", response_model=Product)
 async def create_product(product: ProductCreate):
-    product_dict = product.dict()
+    product_dict = product.dict(exclude_none=True)
+    if "reorder_threshold" in product_dict:
+        product_dict.setdefault("auto_reorder", False)
     product_obj = Product(**product_dict)
-    product_data = prepare_for_mongo(product_obj.dict())
-    await db.products.insert_one(product_data)
+    product_obj.is_low_stock = product_obj.stock <= product_obj.reorder_threshold
+    product_data = product_codec.encode(product_obj)
+    try:
+        await db.products.insert_one(product_data)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail=f"La référence {product.sku} est déjà utilisée")
+    catalog.put(product_data)
+    await stats.increment(db, "products", products=1)
     return product_obj
 
-@api_router.get("/products", response_model=List[Product])
-async def get_products():
-    products = await db.products.find().to_list(1000)
-    return [Product(**parse_from_mongo(product)) for product in products]
+@api_router.get("/products", response_model=Union[List[Product], ProductChanges])
+async def get_products(
+    request: Request,
+    response: Response,
+    limit: int = Query(PAGE_SIZE_MAX, ge=1, le=PAGE_SIZE_MAX),
+    after: Optional[str] = None,
+    sort: str = "created_at",
+    updated_since: Optional[datetime] = None
+):
+    if updated_since:
+        changes = await sync.changes(db, "products", as_utc(updated_since), product_codec.projection, limit, after)
+        return {**changes, "items": product_codec.decode_many(changes["items"])}
+    
+    # The list is served from the catalog cache: tag it with the cache state too
+    await catalog.ensure_loaded()
+    versions = await stats.read_versions(db)
+    etag = make_etag(request, versions.get("products", 0), catalog.generation)
+    if cached := not_modified(request, response, etag):
+        return cached
+    
+    products, next_cursor = await catalog.page(sort, PRODUCT_SORTS, limit, after)
+    # The cache may lag other workers' writes: start the next sync from its last reload
+    response.headers["X-Watermark"] = sync.watermark(catalog.synced_at).isoformat()
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return product_codec.decode_many(products)
+
+@api_router.post("/products/import")
+async def import_product_catalog(request: Request):
+    """Importer un catalogue fournisseur (CSV avec en-tête ou tableau JSON)
+
+    Les produits sont mis à jour par référence (sku) ou, à défaut, par nom ;
+    les autres sont créés. Les lignes invalides sont listées dans le rapport.
+    """
+    fmt = "csv" if "csv" in request.headers.get("content-type", "") else "json"
+    try:
+        rows = parse_rows(await request.body(), fmt)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise HTTPException(status_code=400, detail=f"Fichier illisible: {exc}")
+    if len(rows) > IMPORT_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"Import limité à {IMPORT_MAX_ROWS} lignes")
+    
+    started = datetime.now(timezone.utc)
+    report = await import_products(db.products, rows, ProductCreate)
+    if report["inserted"] or report["updated"]:
+        # Low-stock flags of the imported products, found through updated_at
+        imported = {"updated_at": {"$gte": started}}
+        await db.products.update_many(imported, low_stock_stages())
+        crossings = await db.products.find(
+            {**imported, "$expr": {"$ne": ["$was_low_stock", "$is_low_stock"]}}, product_write_projection
+        ).to_list(None)
+        # Many products changed at once: one reload beats thousands of puts
+        await catalog.reload()
+        await stats.increment(db, "products", products=report["inserted"])
+        await stock_alerts.publish(crossings)
+    return report
+
+@api_router.post("/products/batch", response_model=ProductBatchResult)
+async def adjust_products(batch: ProductBatch):
+    """Ajuster prix et stocks de nombreux produits en une seule écriture groupée"""
+    if not batch.products and not batch.categories:
+        raise HTTPException(status_code=400, detail="Aucune modification demandée")
+    for repricing in batch.categories:
+        if repricing.percent <= -100:
+            raise HTTPException(status_code=400, detail="Une baisse de prix doit être inférieure à 100 %")
+    for adjustment in batch.products:
+        if adjustment.stock_delta is not None and adjustment.stock_set is not None:
+            raise HTTPException(status_code=400, detail=f"Produit {adjustment.id}: stock_delta et stock_set sont exclusifs")
+        if adjustment.price is not None and adjustment.price < 0:
+            raise HTTPException(status_code=400, detail=f"Produit {adjustment.id}: le prix doit être positif")
+    
+    now = datetime.now(timezone.utc)
+    # Category repricing first, so an explicit price on a product wins
+    operations = [
+        UpdateMany(
+            {"category": repricing.category},
+            [{"$set": {
+                "price": {"$round": [{"$multiply": ["$price", 1 + repricing.percent / 100]}, 2]},
+                "updated_at": now
+            }}]
+        )
+        for repricing in batch.categories
+    ]
+    for adjustment in batch.products:
+        fields = {"updated_at": now}
+        if adjustment.price is not None:
+            fields["price"] = adjustment.price
+        if adjustment.stock_set is not None:
+            fields["stock"] = adjustment.stock_set
+        fields = literal(fields)
+        if adjustment.stock_delta is not None:
+            # Added server-side, never read-modify-write: sales running meanwhile keep their decrements
+            fields["stock"] = {"$add": ["$stock", adjustment.stock_delta]}
+        operations.append(UpdateOne({"id": adjustment.id}, low_stock_stages(**fields)))
+    
+    await db.products.bulk_write(operations, ordered=True)
+    
+    product_ids = list(dict.fromkeys(adjustment.id for adjustment in batch.products))
+    categories = [repricing.category for repricing in batch.categories]
+    products = await db.products.find(
+        {"$or": [{"id": {"$in": product_ids}}, {"category": {"$in": categories}}]},
+        product_write_projection
+    ).to_list(None)
+    for product in products:
+        catalog.put(product)
+    await stats.increment(db, "products")
+    # Only the adjusted products were written with a fresh was_low_stock
+    adjusted = set(product_ids)
+    await stock_alerts.publish(product for product in products if product["id"] in adjusted)
+    
+    found = {product["id"] for product in products}
+    return {
+        "products": product_codec.decode_many(products),
+        "not_found": [product_id for product_id in product_ids if product_id not in found]
+    }
 
 @api_router.get("/products/{product_id}", response_model=Product)
 async def get_product(product_id: str):
-    product = await db.products.find_one({"id": product_id})
+    product = await catalog.get(product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Produit non trouvé")
-    return Product(**parse_from_mongo(product))
+    return product_codec.decode(product)
 
 @api_router.put("/products/{product_id}", response_model=Product)
 async def update_product(product_id: str, product_update: ProductUpdate):
-    existing_product = await db.products.find_one({"id": product_id})
-    if not existing_product:
-        raise HTTPException(status_code=404, detail="Produit non trouvé")
-    
     update_data = {k: v for k, v in product_update.dict().items() if v is not None}
+    if "reorder_threshold" in update_data:
+        update_data.setdefault("auto_reorder", False)
     update_data["updated_at"] = datetime.now(timezone.utc)
     
-    await db.products.update_one({"id": product_id}, {"$set": prepare_for_mongo(update_data)})
-    
-    updated_product = await db.products.find_one({"id": product_id})
-    return Product(**parse_from_mongo(updated_product))
+    try:
+        updated_product = await db.products.find_one_and_update(
+            {"id": product_id},
+            low_stock_stages(**literal(update_data)),
+            projection=product_write_projection,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail=f"La référence {product_update.sku} est déjà utilisée")
+    if not updated_product:
+        raise HTTPException(status_code=404, detail="Produit non trouvé")
+    catalog.put(updated_product)
+    await stats.increment(db, "products")
+    await stock_alerts.publish([updated_product])
+    return product_codec.decode(updated_product)
 
 @api_router.get("/products/search/{query}")
 async def search_products(query: str):
@@ -167,9 +628,12 @@ async def search_products(query: str):
     if len(query.strip()) < 2:
         return []
     
-    # Recherche insensible à la casse avec regex
-    regex_pattern = {"$regex": query.strip(), "$options": "i"}
-    products = await db.products.find({"name": regex_pattern}).limit(10).to_list(10)
+    # Recherche insensible à la casse et aux accents, meilleurs résultats d'abord
+    await catalog.ensure_loaded()
+    # The index only knows names: stock and price come from the catalog
+    product_ids = search_index.search(query, limit=10)
+    found = await catalog.get_many(product_ids)
+    products = [found[product_id] for product_id in product_ids if product_id in found]
     return [{"id": p["id"], "name": p["name"], "price": p["price"], "stock": p["stock"], "unit": p["unit"]} for p in products]
 
 @api_router.delete("/products/{product_id}")
@@ -177,6 +641,9 @@ async def delete_product(product_id: str):
     result = await db.products.delete_one({"id": product_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Produit non trouvé")
+    catalog.evict(product_id)
+    await sync.record_deletion(db, "products", product_id)
+    await stats.increment(db, "products", products=-1)
     return {"message": "Produit supprimé avec succès"}
 
 # Clients endpoints
@@ -184,175 +651,547 @@ async def delete_product(product_id: str):
 async def create_client(client: ClientCreate):
     client_dict = client.dict()
     client_obj = Client(**client_dict)
-    client_data = prepare_for_mongo(client_obj.dict())
-    await db.clients.insert_one(client_data)
+    try:
+        await db.clients.insert_one(client_document(client_obj))
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail=f"Un client nommé {client_obj.name} existe déjà")
+    await stats.increment(db, "clients", clients=1)
     return client_obj
 
-@api_router.get("/clients", response_model=List[Client])
-async def get_clients():
-    clients = await db.clients.find().to_list(1000)
-    return [Client(**parse_from_mongo(client)) for client in clients]
+@api_router.get("/clients", response_model=Union[List[Client], ClientChanges])
+async def get_clients(
+    request: Request,
+    response: Response,
+    limit: int = Query(PAGE_SIZE_MAX, ge=1, le=PAGE_SIZE_MAX),
+    after: Optional[str] = None,
+    sort: str = "created_at",
+    updated_since: Optional[datetime] = None
+):
+    if updated_since:
+        changes = await sync.changes(db, "clients", as_utc(updated_since), client_codec.projection, limit, after)
+        return {**changes, "items": client_codec.decode_many(changes["items"])}
+    
+    versions = await stats.read_versions(db)
+    if cached := not_modified(request, response, make_etag(request, versions.get("clients", 0))):
+        return cached
+    
+    response.headers["X-Watermark"] = sync.watermark().isoformat()
+    clients, next_cursor = await paginate(db.clients, {}, sort, CLIENT_SORTS, limit, after, client_codec.projection)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return client_codec.decode_many(clients)
 
 @api_router.get("/clients/{client_id}", response_model=Client)
 async def get_client(client_id: str):
-    client = await db.clients.find_one({"id": client_id})
+    client = await db.clients.find_one({"id": client_id}, client_codec.projection)
     if not client:
         raise HTTPException(status_code=404, detail="Client non trouvé")
-    return Client(**parse_from_mongo(client))
+    return client_codec.decode(client)
 
 @api_router.put("/clients/{client_id}", response_model=Client)
 async def update_client(client_id: str, client_update: ClientUpdate):
-    existing_client = await db.clients.find_one({"id": client_id})
+    existing_client = await db.clients.find_one({"id": client_id}, {"_id": 1})
     if not existing_client:
         raise HTTPException(status_code=404, detail="Client non trouvé")
     
     update_data = {k: v for k, v in client_update.dict().items() if v is not None}
+    update_data["updated_at"] = datetime.now(timezone.utc)
+    if "name" in update_data:
+        update_data["name_key"] = normalize(update_data["name"])
+    
+    try:
+        await db.clients.update_one({"id": client_id}, {"$set": update_data})
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail=f"Un client nommé {update_data['name']} existe déjà")
+    await stats.increment(db, "clients")
     
-    await db.clients.update_one({"id": client_id}, {"$set": prepare_for_mongo(update_data)})
+    updated_client = await db.clients.find_one({"id": client_id}, client_codec.projection)
+    return client_codec.decode(updated_client)
+
+@api_router.get("/clients/{client_id}/sales", response_model=List[Sale])
+async def get_client_sales(
+    client_id: str,
+    response: Response,
+    limit: int = Query(100, ge=1, le=PAGE_SIZE_MAX),
+    after: Optional[str] = None,
+    sort: str = "-created_at",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+):
+    """Historique d'achats du client, servi par l'index (client_id, created_at, id)"""
+    if not await db.clients.find_one({"id": client_id}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Client non trouvé")
+    start, end = as_utc_range(start, end)
+    query = {"client_id": client_id, **analytics.created_at_filter(start, end)}
+    sales, next_cursor = await paginate(db.sales, query, sort, CLIENT_SALE_SORTS, limit, after, sale_codec.projection)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return sale_codec.decode_many(sales)
+
+@api_router.get("/clients/{client_id}/statement", response_model=ClientStatement)
+async def get_client_statement(
+    client_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=PAGE_SIZE_MAX),
+    after: Optional[str] = None
+):
+    """Relevé du client: ventes de la période avec cumul, totaux à vie,
+    dernière visite et dette en début et fin de période"""
+    client_doc = await db.clients.find_one({"id": client_id}, client_codec.projection)
+    if not client_doc:
+        raise HTTPException(status_code=404, detail="Client non trouvé")
+    start, end = as_utc_range(start, end)
+    if start and end and end <= start:
+        raise HTTPException(status_code=400, detail="La date de fin doit être postérieure à la date de début")
     
-    updated_client = await db.clients.find_one({"id": client_id})
-    return Client(**parse_from_mongo(updated_client))
+    (sales, next_cursor), totals = await asyncio.gather(
+        client_history.statement_page(db, client_id, start, end, limit, after, sale_codec.projection),
+        client_history.period_totals(db, client_id, start, end)
+    )
+    # Debt from the ledger: one indexed read per bound, no replay
+    opening_debt = await ledger.balance_at(db, client_id, start) if start else 0.0
+    closing_debt = await ledger.balance_at(db, client_id, end) if end else client_doc.get("current_debt", 0.0)
+    return {
+        "client": client_codec.decode(client_doc),
+        "start": start,
+        "end": end,
+        "period_spend": totals["spend"],
+        "period_sales_count": totals["sales_count"],
+        "opening_debt": opening_debt,
+        "closing_debt": closing_debt,
+        "sales": sales,
+        "next_cursor": next_cursor,
+    }
+
+@api_router.get("/clients/{client_id}/ledger", response_model=List[LedgerEntry])
+async def get_client_ledger(
+    client_id: str,
+    response: Response,
+    limit: int = Query(100, ge=1, le=PAGE_SIZE_MAX),
+    after: Optional[int] = Query(None, ge=1)
+):
+    """Écritures de dette et de paiement du client, les plus récentes d'abord"""
+    if not await db.clients.find_one({"id": client_id}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Client non trouvé")
+    entries = await ledger.entries(db, client_id, limit, after)
+    if len(entries) == limit and entries[-1]["seq"] > 1:
+        response.headers["X-Next-Cursor"] = str(entries[-1]["seq"])
+    return entries
+
+@api_router.post("/clients/{client_id}/payments", response_model=LedgerEntry)
+async def create_client_payment(client_id: str, payment: PaymentCreate):
+    """Enregistrer un remboursement de dette"""
+    entry = await ledger.pay(db, client_id, payment.amount, payment.payment_method, payment.note)
+    if entry is None:
+        client_doc = await db.clients.find_one({"id": client_id}, {"_id": 0, "current_debt": 1})
+        if not client_doc:
+            raise HTTPException(status_code=404, detail="Client non trouvé")
+        raise HTTPException(
+            status_code=400,
+            detail=f"Paiement supérieur à la dette du client ({client_doc.get('current_debt', 0):.2f}€)"
+        )
+    await stats.increment(db, "clients")
+    return entry
 
 @api_router.delete("/clients/{client_id}")
 async def delete_client(client_id: str):
     result = await db.clients.delete_one({"id": client_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Client non trouvé")
+    await sync.record_deletion(db, "clients", client_id)
+    await stats.increment(db, "clients", clients=-1)
     return {"message": "Client supprimé avec succès"}
 
 # Sales endpoints
 @api_router.post("/sales", response_model=Sale)
-async def create_sale(sale_data: SaleCreate):
-    # Handle automatic client creation if client_name provided but no client_id
-    client_id = sale_data.client_id
-    client_name = sale_data.client_name
-    is_new_client = False
+async def create_sale(
+    sale_data: SaleCreate,
+    idempotency_key: Optional[str] = Header(None, max_length=255)
+):
+    if not idempotency_key:
+        return await checkout(sale_data)
     
-    if not client_id and client_name and client_name.strip() != "Client Anonyme" and client_name.strip() != "":
-        # Check if client already exists by name
-        existing_client = await db.clients.find_one({"name": client_name.strip()})
-        
-        if existing_client:
-            # Use existing client
-            client_id = existing_client["id"]
-            client_name = existing_client["name"]
-        else:
-            # Check if trying to sell on credit to new client (not allowed)
-            if sale_data.payment_method == "crédit":
-                raise HTTPException(
-                    status_code=400, 
-                    detail="Impossible de vendre à crédit à un nouveau client. Veuillez d'abord enregistrer le client avec une limite de crédit."
-                )
-            
-            # Create new client automatically (only if not credit sale)
-            new_client = Client(
-                name=client_name.strip(),
-                phone="",
-                address="",
-                email="",
-                credit_limit=0.0,
-                current_debt=0.0
-            )
-            client_data = prepare_for_mongo(new_client.dict())
-            await db.clients.insert_one(client_data)
-            client_id = new_client.id
-            client_name = new_client.name
-            is_new_client = True
+    # The key is done as soon as the sale is saved: the bookkeeping that
+    # follows runs once, outside it, so its failures cannot free the key
+    # for a retry that would record the sale twice
+    saved = []
+    async def record():
+        saved.append(await save_sale(sale_data))
+        return sale_codec.encode(saved[-1][0])
     
-    # Validate quantities before processing
+    sale = await sale_requests.run(idempotency_key, fingerprint(sale_data.dict()), record)
+    for sale_record in saved:
+        await after_sale(*sale_record)
+    return sale_codec.decode(sale)
+
+async def checkout(sale_data: SaleCreate) -> Sale:
+    sale, reserved, client_created = await save_sale(sale_data)
+    await after_sale(sale, reserved, client_created)
+    return sale
+
+async def save_sale(sale_data: SaleCreate):
+    """Validate the basket and commit the sale: (sale, reserved products, client created)"""
+    # Validate the whole basket before touching the database
+    quantities = {}
     for item_data in sale_data.items:
-        if item_data["quantity"] <= 0:
+        if item_data.quantity <= 0:
             raise HTTPException(status_code=400, detail="La quantité doit être supérieure à 0")
+        # The same product may appear on several lines: check stock against the total
+        quantities[item_data.product_id] = quantities.get(item_data.product_id, 0) + item_data.quantity
+    
+    # Names and prices come from the catalog cache; stock is checked by the
+    # guarded reservation below, never against the cached value.
+    products = await catalog.get_many(quantities)
+    for product_id in quantities:
+        if product_id not in products:
+            raise HTTPException(status_code=404, detail=f"Produit {product_id} non trouvé")
     
     # Calculate sale totals
     items = []
     subtotal = 0.0
     
     for item_data in sale_data.items:
-        # Get product details
-        product = await db.products.find_one({"id": item_data["product_id"]})
-        if not product:
-            raise HTTPException(status_code=404, detail=f"Produit {item_data['product_id']} non trouvé")
-        
-        # Check stock
-        if product["stock"] < item_data["quantity"]:
-            raise HTTPException(status_code=400, detail=f"Stock insuffisant pour {product['name']}")
-        
-        # Create sale item
-        item_total = product["price"] * item_data["quantity"]
-        sale_item = SaleItem(
-            product_id=item_data["product_id"],
+        product = products[item_data.product_id]
+        item_total = product["price"] * item_data.quantity
+        items.append(SaleItem(
+            product_id=item_data.product_id,
             product_name=product["name"],
-            quantity=item_data["quantity"],
+            category=product.get("category"),
+            quantity=item_data.quantity,
             unit_price=product["price"],
             total_price=item_total
-        )
-        items.append(sale_item)
+        ))
         subtotal += item_total
+    
+    # A discount above the subtotal would make a negative sale (and a credit
+    # sale would pay the client's debt off)
+    if sale_data.discount < 0 or sale_data.discount > subtotal:
+        raise HTTPException(status_code=400, detail=f"La remise doit être comprise entre 0 et {subtotal:.2f}€")
+    
+    if SALE_TRANSACTIONS:
+        async with await client.start_session() as session:
+            # Client, stock and sale commit together; the whole callback is
+            # retried on transient errors (write conflicts, elections)
+            sale, reserved, client_created = await session.with_transaction(
+                lambda session: commit_sale(sale_data, items, subtotal, quantities, products, session)
+            )
+    else:
+        sale, reserved, client_created = await commit_sale(sale_data, items, subtotal, quantities, products)
+    return sale, reserved, client_created
+
+async def after_sale(sale: Sale, reserved: List[dict], client_created: bool):
+    """Cache, alerts and counters of a saved sale
+
+    Best effort: the sale stands whatever happens here. A missed counter is
+    fixed by manage.py (rebuild-stats, rebuild-rollups, rebuild-client-totals).
+    """
+    for product in reserved:
+        catalog.put(product)
+    sale_doc = sale_codec.encode(sale)
+    steps = [stock_alerts.publish(reserved), stats.record_sale(db, sale.total, sale.created_at), rollups.record_sale(db, sale_doc)]
+    if sale.client_id:
+        # Lifetime totals (and the debt of a credit sale) changed
+        steps += [client_history.record_sale(db, sale_doc), stats.increment(db, "clients", clients=int(client_created))]
+    for result in await asyncio.gather(*steps, return_exceptions=True):
+        if isinstance(result, Exception):
+            logger.error("Sale %s saved, but its bookkeeping failed: %r", sale.id, result)
+
+async def commit_sale(sale_data: SaleCreate, items, subtotal, quantities, products, session=None):
+    """Client step, stock reservation and sale insert
+
+    With a session every write belongs to its transaction. Without one, the
+    stock is released again if the sale cannot be saved.
+    """
+    # Handle automatic client creation if client_name provided but no client_id
+    client_id = sale_data.client_id
+    client_name = sale_data.client_name
+    client_created = False
+    
+    if not client_id and client_name and client_name.strip() != "Client Anonyme" and client_name.strip() != "":
+        # Clients are matched on their normalized name, never on the raw input
+        if sale_data.payment_method == "crédit":
+            # Selling on credit to a new client is not allowed: only look up
+            existing_client = await db.clients.find_one(
+                {"name_key": normalize(client_name)}, {"_id": 0, "id": 1, "name": 1}, session=session
+            )
+            if not existing_client:
+                raise HTTPException(
+                    status_code=400, 
+                    detail="Impossible de vendre à crédit à un nouveau client. Veuillez d'abord enregistrer le client avec une limite de crédit."
+                )
+        else:
+            existing_client, client_created = await find_or_create_client(client_name.strip(), session)
         
-        # Update product stock
-        new_stock = product["stock"] - item_data["quantity"]
-        await db.products.update_one(
-            {"id": item_data["product_id"]}, 
-            {"$set": {"stock": new_stock, "updated_at": datetime.now(timezone.utc).isoformat()}}
-        )
+        client_id = existing_client["id"]
+        client_name = existing_client["name"]
+    if sale_data.payment_method == "crédit" and not client_id:
+        raise HTTPException(status_code=400, detail="Une vente à crédit nécessite un client enregistré")
+    
+    # Reserve stock atomically; nothing below may fail without releasing it
+    reserved = await reserve_stock(quantities, products, session)
     
     # Calculate final total
     total = subtotal - sale_data.discount
+    sale_id = str(uuid.uuid4())
+    debt = None
     
-    # Create sale
-    sale = Sale(
-        client_id=client_id,
-        client_name=client_name or "Client Anonyme",
-        items=items,
-        subtotal=subtotal,
-        discount=sale_data.discount,
-        total=total,
-        payment_method=sale_data.payment_method
+    try:
+        if sale_data.payment_method == "crédit":
+            # Balance check and debt increase are one guarded update
+            debt = await ledger.charge(db, client_id, total, sale_id, session)
+            if debt is None:
+                raise HTTPException(status_code=400, detail=await credit_refusal(client_id, total, session))
+        # Numbered only once the stock is secured, to keep gaps rare. The
+        # counter stays outside any transaction: it is shared by every till.
+        sale = Sale(
+            id=sale_id,
+            client_id=client_id,
+            client_name=client_name or "Client Anonyme",
+            items=items,
+            subtotal=subtotal,
+            discount=sale_data.discount,
+            total=total,
+            payment_method=sale_data.payment_method,
+            invoice_number=await invoice_numbers.next()
+        )
+        
+        # Save to database
+        sale_data_prepared = sale_codec.encode(sale)
+        if sale_writer is not None and session is None:
+            await sale_writer.insert(sale_data_prepared)
+        else:
+            await db.sales.insert_one(sale_data_prepared, session=session)
+    except Exception:
+        if session is None:
+            try:
+                if debt is not None:
+                    await ledger.reverse(db, debt)
+            finally:
+                # The stock goes back even if the debt could not be reversed
+                await release_stock(quantities, notify=False)
+        raise
+    
+    return sale, reserved, client_created
+
+async def credit_refusal(client_id: str, total: float, session=None) -> str:
+    client_doc = await db.clients.find_one(
+        {"id": client_id}, {"_id": 0, "name": 1, "current_debt": 1, "credit_limit": 1}, session=session
     )
+    if not client_doc:
+        return "Client non trouvé pour la vente à crédit"
+    return (
+        f"Limite de crédit dépassée pour {client_doc['name']}: dette {client_doc.get('current_debt', 0):.2f}€ "
+        f"+ {total:.2f}€ > limite {client_doc.get('credit_limit', 0):.2f}€"
+    )
+
+@api_router.get("/sales", response_model=Union[List[Sale], SaleChanges])
+async def get_sales(
+    request: Request,
+    response: Response,
+    limit: int = Query(PAGE_SIZE_MAX, ge=1, le=PAGE_SIZE_MAX),
+    after: Optional[str] = None,
+    sort: str = "-created_at",
+    updated_since: Optional[datetime] = None
+):
+    if updated_since:
+        changes = await sync.changes(db, "sales", as_utc(updated_since), sale_codec.projection, limit, after)
+        return {**changes, "items": sale_codec.decode_many(changes["items"])}
     
-    # Save to database
-    sale_data_prepared = prepare_for_mongo(sale.dict())
-    await db.sales.insert_one(sale_data_prepared)
+    versions = await stats.read_versions(db)
+    if cached := not_modified(request, response, make_etag(request, versions.get("sales", 0))):
+        return cached
     
-    return sale
+    response.headers["X-Watermark"] = sync.watermark().isoformat()
+    sales, next_cursor = await paginate(db.sales, {}, sort, SALE_SORTS, limit, after, sale_codec.projection)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return sale_codec.decode_many(sales)
 
-@api_router.get("/sales", response_model=List[Sale])
-async def get_sales():
-    sales = await db.sales.find().sort("created_at", -1).to_list(1000)
-    return [Sale(**parse_from_mongo(sale)) for sale in sales]
+@api_router.get("/sales/export")
+async def export_sales(
+    start: datetime,
+    end: Optional[datetime] = None,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    rows: str = Query("sale", pattern="^(sale|item)$")
+):
+    """Exporter les ventes d'une période en NDJSON ou CSV (une ligne par vente ou par article)"""
+    start, end = as_utc_range(start, end or datetime.now(timezone.utc))
+    if end <= start:
+        raise HTTPException(status_code=400, detail="La date de fin doit être postérieure à la date de début")
+    
+    cursor = db.sales.find(
+        analytics.created_at_filter(start, end),
+        {"_id": 0}
+    ).sort([("created_at", 1), ("id", 1)]).batch_size(EXPORT_BATCH_SIZE)
+    
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"ventes-{start:%Y%m%d}-{end:%Y%m%d}.{'csv' if format == 'csv' else 'ndjson'}"
+    return StreamingResponse(
+        stream_sales(cursor, format, per_item=rows == "item"),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 @api_router.get("/sales/{sale_id}", response_model=Sale)
 async def get_sale(sale_id: str):
-    sale = await db.sales.find_one({"id": sale_id})
+    sale = await db.sales.find_one({"id": sale_id}, sale_codec.projection)
     if not sale:
         raise HTTPException(status_code=404, detail="Vente non trouvée")
-    return Sale(**parse_from_mongo(sale))
+    return sale_codec.decode(sale)
+
+# Analytics endpoints
+@api_router.get("/analytics/revenue")
+async def get_revenue_analytics(
+    period: str = Query("day", pattern="^(day|week|month)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+):
+    """Chiffre d'affaires et nombre de ventes par jour, semaine ou mois"""
+    start, end = as_utc_range(start, end)
+    return await db.sales.aggregate(analytics.revenue_pipeline(period, start, end)).to_list(None)
+
+@api_router.get("/analytics/products")
+async def get_product_analytics(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(50, ge=1, le=1000)
+):
+    """Quantités vendues et chiffre d'affaires par produit"""
+    start, end = as_utc_range(start, end)
+    return await db.sales.aggregate(analytics.product_pipeline(start, end, limit)).to_list(None)
+
+@api_router.get("/analytics/categories")
+async def get_category_analytics(start: Optional[datetime] = None, end: Optional[datetime] = None):
+    """Quantités vendues et chiffre d'affaires par catégorie (poisson / viande)"""
+    start, end = as_utc_range(start, end)
+    return await db.sales.aggregate(analytics.category_pipeline(start, end)).to_list(None)
+
+@api_router.get("/analytics/payment-methods")
+async def get_payment_method_analytics(start: Optional[datetime] = None, end: Optional[datetime] = None):
+    """Répartition des ventes par moyen de paiement"""
+    start, end = as_utc_range(start, end)
+    return await db.sales.aggregate(analytics.payment_method_pipeline(start, end)).to_list(None)
+
+# Reports endpoints
+@api_router.get("/reports/sales")
+async def get_sales_report(
+    period: str = Query("month", pattern="^(day|week|month|year)$"),
+    by: str = Query("day", pattern="^(day|category|product)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+):
+    """Quantités, chiffre d'affaires, remises et nombre de ventes par période,
+    au total, par catégorie ou par produit (lu dans les agrégats journaliers)"""
+    start, end = as_utc_range(start, end)
+    return await db.sales_daily.aggregate(rollups.report_pipeline(by, period, start, end)).to_list(None)
+
+# Inventory endpoints
+@api_router.get("/inventory/forecast", response_model=List[ReorderSuggestion])
+async def get_inventory_forecast(
+    lead_time_days: int = Query(LEAD_TIME_DAYS, ge=1, le=60),
+    cover_days: int = Query(COVER_DAYS, ge=1, le=60),
+    only_reorder: bool = False
+):
+    """Vitesse de vente, jours de stock restants et quantité à commander par produit,
+    les ruptures les plus proches en premier"""
+    forecast = await forecaster.plan(await catalog.values(), lead_time_days, cover_days)
+    if only_reorder:
+        forecast = forecast[forecast["needs_reorder"]]
+    return records(forecast)
+
+@api_router.get("/inventory/events")
+async def stream_stock_events(request: Request, last_event_id: Optional[str] = Header(None)):
+    """Flux SSE des produits passant en stock faible (low_stock) ou en sortant (restocked)
+
+    Un client qui se reconnecte avec Last-Event-ID reçoit les événements manqués.
+    """
+    queue = stock_alerts.subscribe()
+    
+    def message(event):
+        kind = "low_stock" if event["is_low_stock"] else "restocked"
+        payload = event_payload(event)
+        return f"id: {event['seq']}\nevent: {kind}\ndata: {json.dumps(payload)}\n\n"
+    
+    async def events():
+        try:
+            replayed = set()
+            try:
+                since = int(last_event_id) if last_event_id else None
+            except ValueError:
+                since = None
+            if since is not None:
+                # Subscribed first: events recorded meanwhile are queued, not lost
+                for event in await stock_alerts.since(since):
+                    replayed.add(event["id"])
+                    yield message(event)
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), EVENT_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event["id"] not in replayed:
+                    yield message(event)
+        finally:
+            stock_alerts.unsubscribe(queue)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Maintenance endpoints
+@api_router.get("/admin/indexes")
+async def get_index_status():
+    """Indexes manquants, divergents ou non déclarés par collection"""
+    return await check_indexes(db)
+
+@api_router.get("/admin/cache")
+async def get_cache_stats():
+    """Compteurs du cache catalogue (hits, misses, évictions)"""
+    return catalog.stats()
+
+@api_router.post("/admin/reorder-thresholds/refresh")
+async def refresh_reorder_thresholds():
+    """Recalculer tout de suite les seuils automatiques d'après les prévisions de vente"""
+    return {"updated": await apply_reorder_thresholds()}
+
+@api_router.post("/admin/stats/rebuild")
+async def rebuild_dashboard_stats():
+    """Recalculer les compteurs du tableau de bord à partir des collections"""
+    return await stats.rebuild_stats(db)
+
+@api_router.post("/admin/rollups/rebuild")
+async def rebuild_sales_rollups(start: Optional[datetime] = None, end: Optional[datetime] = None):
+    """Recalculer les agrégats journaliers des ventes sur [start, end), par défaut depuis la première vente"""
+    start, end = as_utc_range(start, end)
+    return await rollups.rebuild_rollups(db, start, end)
 
 # Dashboard endpoints
 @api_router.get("/dashboard/stats")
-async def get_dashboard_stats():
-    # Get basic counts
-    total_products = await db.products.count_documents({})
-    total_clients = await db.clients.count_documents({})
-    total_sales = await db.sales.count_documents({})
-    
-    # Get today's sales
-    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
-    today_sales = await db.sales.find({"created_at": {"$gte": today.isoformat()}}).to_list(1000)
-    today_revenue = sum(sale.get("total", 0) for sale in today_sales)
+async def get_dashboard_stats(request: Request, response: Response):
+    # Today's figures change at midnight even without writes
+    today = datetime.now(timezone.utc)
+    versions = await stats.read_versions(db)
+    etag = make_etag(request, sorted(versions.items()), stats.day_key(today))
+    if cached := not_modified(request, response, etag):
+        return cached
     
-    # Get low stock products (stock <= 5)
-    low_stock_products = await db.products.find({"stock": {"$lte": 5}}).to_list(100)
+    # Counters are maintained by the write paths: reading them is O(1)
+    dashboard, low_stock_count, low_stock_products = await asyncio.gather(
+        stats.read_stats(db, today),
+        # is_low_stock is kept current by every stock write: both reads
+        # only walk the partial low_stock index
+        db.products.count_documents({"is_low_stock": True}),
+        db.products.find({"is_low_stock": True}, product_codec.projection).sort("stock", 1).to_list(100)
+    )
     
     return {
-        "total_products": total_products,
-        "total_clients": total_clients,
-        "total_sales": total_sales,
-        "today_sales_count": len(today_sales),
-        "today_revenue": today_revenue,
-        "low_stock_count": len(low_stock_products),
-        "low_stock_products": [Product(**parse_from_mongo(p)) for p in low_stock_products]
+        **dashboard,
+        "low_stock_count": low_stock_count,
+        "low_stock_products": product_codec.decode_many(low_stock_products)
     }
 
 # Include the router in the main app
@@ -364,6 +1203,7 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "X-Watermark"],
 )
 
 # Configure logging
@@ -373,6 +1213,64 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def start_background_tasks():
+    # Index builds can take a while on large collections: run them in the
+    # background so the API starts serving immediately.
+    app.state.index_task = asyncio.create_task(ensure_indexes(db))
+    app.state.stats_task = asyncio.create_task(stats.ensure_stats(db))
+    app.state.rollups_task = asyncio.create_task(rollups.ensure_rollups(db))
+    app.state.client_totals_task = asyncio.create_task(client_history.ensure_client_totals(db))
+    # Clients stored before name_key existed could not be matched by the sale path
+    # (builds name_key_unique first, whatever ensure_indexes is doing)
+    app.state.client_keys_task = asyncio.create_task(backfill_client_keys(db))
+    # Products stored before is_low_stock existed would not show on the dashboard
+    app.state.low_stock_task = asyncio.create_task(backfill_low_stock(db))
+    # Debts recorded before the ledger become its first entries
+    app.state.ledger_task = asyncio.create_task(ledger.open_ledgers(db))
+    app.state.reorder_task = asyncio.create_task(maintain_reorder_thresholds(app.state.rollups_task))
+    app.state.migration_check_task = asyncio.create_task(warn_legacy_dates())
+    # Load the catalog (and build the search index) before the first till asks
+    app.state.catalog_task = asyncio.create_task(catalog.ensure_loaded())
+    app.state.catalog_refresh_task = asyncio.create_task(catalog.refresh())
+    if os.environ.get('CATALOG_CHANGE_STREAM', '').lower() in ('1', 'true', 'yes'):
+        # Multi-worker deployments on a replica set: see other workers' writes at once
+        app.state.catalog_watch_task = asyncio.create_task(catalog.watch())
+        app.state.stock_events_task = asyncio.create_task(stock_alerts.watch())
+
+async def maintain_reorder_thresholds(rollups_ready: asyncio.Task):
+    """Follow the sales forecast with the automatic thresholds, once per model refit
+
+    Waits for the first rollup build: a forecast fitted before it would
+    see no sales at all. A failed build is resumed until it completes.
+    """
+    try:
+        await rollups_ready
+    except Exception as exc:
+        logger.error("Daily rollups build failed, reorder thresholds on hold: %s", exc)
+        while True:
+            await asyncio.sleep(forecaster.max_age)
+            try:
+                await rollups.ensure_rollups(db)
+                break
+            except Exception as exc:
+                logger.error("Daily rollups build failed again: %s", exc)
+    while True:
+        try:
+            updated = await apply_reorder_thresholds()
+            if updated:
+                logger.info("Updated %d reorder thresholds from the sales forecast", updated)
+        except Exception as exc:
+            logger.error("Reorder thresholds not updated: %s", exc)
+        await asyncio.sleep(forecaster.max_age)
+
+async def warn_legacy_dates():
+    legacy = await has_legacy_dates(db)
+    if legacy:
+        logger.warning("Collections with ISO-string dates: %s. Run `python manage.py migrate-dates`", ", ".join(legacy))
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    if sale_writer is not None:
+        await sale_writer.close()
     client.close()
\ No newline at end of file
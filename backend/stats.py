@@ -0,0 +1,100 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+from pymongo import ReplaceOne
+
+from analytics import revenue_pipeline
+
+logger = logging.getLogger(__name__)
+
+# Single counters document kept current by every write path with $inc, so
+# reading the dashboard never scans a collection.
+STATS_ID = "dashboard"
+
+
+def day_key(moment: datetime) -> str:
+    """UTC day bucket used by stats_daily"""
+    return moment.astimezone(timezone.utc).strftime("%Y-%m-%d")
+
+
+async def increment(db, *touched: str, **deltas):
+    """Atomically add deltas to the dashboard counters
+
+    touched names the collections whose content changed: their version is
+    bumped in the same update, which invalidates the ETags of their lists.
+    """
+    deltas.update({f"versions.{name}": 1 for name in touched})
+    await db.stats.update_one({"_id": STATS_ID}, {"$inc": deltas}, upsert=True)
+
+
+async def record_sale(db, total: float, created_at: datetime):
+    await asyncio.gather(
+        # Stock changed too: the products list is touched as well
+        increment(db, "sales", "products", sales=1, revenue=total),
+        db.stats_daily.update_one(
+            {"_id": day_key(created_at)},
+            {"$inc": {"sales_count": 1, "revenue": total}},
+            upsert=True
+        ),
+    )
+
+
+async def read_versions(db) -> dict:
+    counters = await db.stats.find_one({"_id": STATS_ID}, {"versions": 1})
+    return (counters or {}).get("versions", {})
+
+
+async def read_stats(db, today: datetime) -> dict:
+    counters, daily = await asyncio.gather(
+        db.stats.find_one({"_id": STATS_ID}),
+        db.stats_daily.find_one({"_id": day_key(today)}),
+    )
+    counters = counters or {}
+    daily = daily or {}
+    return {
+        "total_products": counters.get("products", 0),
+        "total_clients": counters.get("clients", 0),
+        "total_sales": counters.get("sales", 0),
+        "today_sales_count": daily.get("sales_count", 0),
+        "today_revenue": daily.get("revenue", 0.0),
+    }
+
+
+async def rebuild_stats(db) -> dict:
+    """Recompute every counter and daily bucket from the raw collections"""
+    products, clients, sales = await asyncio.gather(
+        db.products.count_documents({}),
+        db.clients.count_documents({}),
+        db.sales.count_documents({}),
+    )
+    daily = [
+        {"_id": bucket["period"], "sales_count": bucket["sales_count"], "revenue": bucket["revenue"]}
+        async for bucket in db.sales.aggregate(revenue_pipeline("day"))
+    ]
+
+    revenue = sum(bucket["revenue"] for bucket in daily)
+    await db.stats.update_one(
+        {"_id": STATS_ID},
+        {
+            "$set": {
+                "products": products, "clients": clients, "sales": sales, "revenue": revenue,
+                "rebuilt_at": datetime.now(timezone.utc),
+            },
+            # Figures may have moved: make every cached list stale
+            "$inc": {"versions.products": 1, "versions.clients": 1, "versions.sales": 1},
+        },
+        upsert=True
+    )
+    await db.stats_daily.delete_many({"_id": {"$nin": [bucket["_id"] for bucket in daily]}})
+    if daily:
+        await db.stats_daily.bulk_write([ReplaceOne({"_id": b["_id"]}, b, upsert=True) for b in daily], ordered=False)
+
+    logger.info("Rebuilt dashboard stats: %d products, %d clients, %d sales over %d days", products, clients, sales, len(daily))
+    return {"products": products, "clients": clients, "sales": sales, "revenue": revenue, "days": len(daily)}
+
+
+async def ensure_stats(db):
+    """Build the counters on first start against an existing database"""
+    if await db.stats.find_one({"_id": STATS_ID, "rebuilt_at": {"$exists": True}}) is None:
+        await rebuild_stats(db)
@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Set
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+# Threshold of products that never had one: the former store-wide rule
+DEFAULT_REORDER_THRESHOLD = 5.0
+# How long crossing events stay available for replay (TTL index on created_at)
+EVENT_RETENTION = timedelta(days=7)
+
+
+def literal(fields: dict) -> dict:
+    """Values for a pipeline $set, taken as-is even when they start with $"""
+    return {name: {"$literal": value} for name, value in fields.items()}
+
+
+def low_stock_stages(**fields) -> List[dict]:
+    """Update pipeline applying fields (aggregation expressions) then recomputing is_low_stock
+
+    was_low_stock keeps the flag as it was before this update, so the
+    returned document tells whether this very write crossed the threshold.
+    """
+    stages = [{"$set": fields}] if fields else []
+    return stages + [
+        {"$set": {
+            "reorder_threshold": {"$ifNull": ["$reorder_threshold", DEFAULT_REORDER_THRESHOLD]},
+            "auto_reorder": {"$ifNull": ["$auto_reorder", True]},
+            "was_low_stock": {"$ifNull": ["$is_low_stock", False]},
+        }},
+        {"$set": {"is_low_stock": {"$lte": ["$stock", "$reorder_threshold"]}}},
+    ]
+
+
+def crossed(product: dict) -> bool:
+    return "was_low_stock" in product and product["was_low_stock"] != product.get("is_low_stock")
+
+
+def event_payload(event: dict) -> dict:
+    return {**{k: v for k, v in event.items() if k != "_id"}, "created_at": event["created_at"].isoformat()}
+
+
+class StockAlerts:
+    """Low-stock threshold crossings, stored in stock_events and pushed to subscribers
+
+    publish() records one event per product whose last write crossed its
+    reorder threshold, either way. Subscribers of this worker get them at
+    once; with watch() running (replica set), they also get the events
+    recorded by the other workers. Events are numbered (seq) from a counter
+    shared by all workers: the number is the stream id a client resumes from.
+    """
+
+    def __init__(self, collection, counters, queue_size: int = 100):
+        self.collection = collection
+        self.counters = counters
+        self.queue_size = queue_size
+        self._subscribers: Set[asyncio.Queue] = set()
+        self.watching = False
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def _deliver(self, event: dict):
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # A subscriber that stopped reading misses events rather
+                # than holding up the writes
+                logger.warning("Stock event subscriber lagging, event %s dropped", event["id"])
+
+    async def publish(self, products: Iterable[dict]):
+        now = datetime.now(timezone.utc)
+        events = [
+            {
+                "id": str(uuid.uuid4()),
+                "product_id": product["id"],
+                "product_name": product.get("name"),
+                "stock": product["stock"],
+                "unit": product.get("unit"),
+                "reorder_threshold": product["reorder_threshold"],
+                "is_low_stock": product["is_low_stock"],
+                "created_at": now,
+            }
+            for product in products if crossed(product)
+        ]
+        if not events:
+            return
+        # One block of numbers for the whole batch
+        counter = await self.counters.find_one_and_update(
+            {"_id": "stock_events"}, {"$inc": {"seq": len(events)}},
+            upsert=True, return_document=ReturnDocument.AFTER
+        )
+        first = counter["seq"] - len(events) + 1
+        for offset, event in enumerate(events):
+            event["seq"] = first + offset
+        await self.collection.insert_many(events)
+        if not self.watching:
+            for event in events:
+                self._deliver(event)
+
+    async def since(self, seq: int) -> List[dict]:
+        """Events numbered after seq, oldest first (to resume a stream)"""
+        return await self.collection.find(
+            {"seq": {"$gt": seq}}, {"_id": 0}
+        ).sort("seq", 1).to_list(None)
+
+    async def watch(self):
+        """Deliver the events of every worker as they are recorded (needs a replica set)"""
+        while True:
+            try:
+                async with self.collection.watch([{"$match": {"operationType": "insert"}}]) as stream:
+                    self.watching = True
+                    async for change in stream:
+                        self._deliver(change["fullDocument"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.error("Stock event stream interrupted, retrying: %s", exc)
+            finally:
+                self.watching = False
+            await asyncio.sleep(5)
@@ -0,0 +1,82 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import HTTPException
+
+from pagination import decode_cursor, encode_cursor
+
+# Deleted ids are kept this long; a till that has not synced for longer must
+# reload the full lists (the tombstones collection has a TTL index on it).
+TOMBSTONE_RETENTION = timedelta(days=30)
+# The watermark handed back lags the clock: a write whose updated_at was taken
+# just before the query but committed just after is sent again next time
+# instead of being missed.
+WATERMARK_GRACE = timedelta(seconds=5)
+
+
+def watermark(as_of: Optional[datetime] = None) -> datetime:
+    """Point the next sync can start from, for data read as of the given time (default: now)
+
+    Rounded down to the millisecond, as it comes back from a paging cursor.
+    """
+    mark = (as_of or datetime.now(timezone.utc)) - WATERMARK_GRACE
+    return mark.replace(microsecond=mark.microsecond // 1000 * 1000)
+
+
+async def record_deletion(db, collection_name: str, doc_id: str):
+    """Leave a tombstone so tills holding the document learn it is gone"""
+    await db.tombstones.insert_one({
+        "collection": collection_name,
+        "id": doc_id,
+        "deleted_at": datetime.now(timezone.utc),
+    })
+
+
+async def changes(db, collection_name: str, since: datetime, projection: Optional[dict] = None,
+                  limit: int = 1000, after: Optional[str] = None) -> dict:
+    """Documents written and ids deleted since a watermark, a page at a time
+
+    Documents are matched on updated_at, so every write path must set it.
+    Items may be sent twice across two syncs (see WATERMARK_GRACE): callers
+    apply them by id.
+
+    Pages are a keyset range on the updated_at_id index: next_cursor points
+    after the last item and carries the watermark of the first page, which
+    every page hands back. Deleted ids come with the first page only; a
+    document rewritten while the pages are read moves past the cursor and is
+    sent again on a later page.
+    """
+    if since < datetime.now(timezone.utc) - TOMBSTONE_RETENTION:
+        raise HTTPException(status_code=410, detail="Point de synchronisation trop ancien, rechargez la liste complète")
+
+    query = {"updated_at": {"$gte": since}}
+    if after:
+        value, last_id = decode_cursor(after)
+        try:
+            last_updated_at, mark = value
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+        query = {"$and": [query, {"$or": [
+            {"updated_at": {"$gt": last_updated_at}},
+            {"updated_at": last_updated_at, "id": {"$gt": last_id}},
+        ]}]}
+    else:
+        mark = watermark()
+
+    page = db[collection_name].find(query, projection).sort([("updated_at", 1), ("id", 1)]).limit(limit + 1).to_list(limit + 1)
+    if after:
+        items, tombstones = await page, []
+    else:
+        items, tombstones = await asyncio.gather(
+            page,
+            db.tombstones.find(
+                {"collection": collection_name, "deleted_at": {"$gte": since}},
+                {"_id": 0, "id": 1}
+            ).to_list(None),
+        )
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor([items[-1]["updated_at"], mark], items[-1]["id"])
+    return {"items": items, "deleted": [t["id"] for t in tombstones], "watermark": mark, "next_cursor": next_cursor}
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+from typing import List, Optional, Set, Tuple
+
+from pymongo.errors import BulkWriteError, DuplicateKeyError, WriteConcernError, WriteError
+
+logger = logging.getLogger(__name__)
+
+
+class BatchWriter:
+    """Group commit: inserts from concurrent requests share one insert_many
+
+    Documents are collected for up to `window` seconds, or until `max_batch`
+    are waiting, then written with a single unordered insert_many. insert()
+    returns only once the server has acknowledged that document (with the
+    collection's write concern), and raises the error of that document alone
+    if it was rejected.
+    """
+
+    def __init__(self, collection, window: float = 0.002, max_batch: int = 100):
+        self.collection = collection
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: List[Tuple[dict, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushing: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.documents = 0
+
+    async def insert(self, doc: dict):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((doc, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        # Shielded: a caller giving up does not take the write out of the batch
+        await asyncio.shield(future)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._write(batch))
+            # Keep a reference until done, or the task may be garbage collected
+            self._flushing.add(task)
+            task.add_done_callback(self._flushing.discard)
+
+    async def _write(self, batch: List[Tuple[dict, asyncio.Future]]):
+        self.batches += 1
+        self.documents += len(batch)
+        try:
+            await self.collection.insert_many([doc for doc, _ in batch], ordered=False)
+        except BulkWriteError as exc:
+            # Unordered: only the documents listed in writeErrors were rejected
+            errors = {error["index"]: error for error in exc.details.get("writeErrors", [])}
+            concern = exc.details.get("writeConcernErrors")
+            for index, (_, future) in enumerate(batch):
+                error = errors.get(index)
+                if error is not None:
+                    error_type = DuplicateKeyError if error.get("code") == 11000 else WriteError
+                    self._settle(future, error_type(error.get("errmsg"), error.get("code"), error))
+                elif concern:
+                    self._settle(future, WriteConcernError(concern[0].get("errmsg"), concern[0].get("code"), concern[0]))
+                else:
+                    self._settle(future)
+        except Exception as exc:
+            logger.error("Batch of %d documents failed: %s", len(batch), exc)
+            for _, future in batch:
+                self._settle(future, exc)
+        else:
+            for _, future in batch:
+                self._settle(future)
+
+    @staticmethod
+    def _settle(future: asyncio.Future, error: Optional[Exception] = None):
+        if future.done():
+            return
+        if error is None:
+            future.set_result(None)
+        else:
+            future.set_exception(error)
+            future.exception()  # retrieved: the caller may have given up
+
+    async def close(self):
+        """Write whatever is still waiting"""
+        self._flush()
+        if self._flushing:
+            await asyncio.gather(*self._flushing, return_exceptions=True)
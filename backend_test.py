@@ -12,6 +12,8 @@ from datetime import datetime
 # Configuration
 BASE_URL = "https://frostbite-sales.preview.emergentagent.com/api"
 HEADERS = {"Content-Type": "application/json"}
+# Client names are unique: suffix them so the suite can be re-run on the same database
+RUN_ID = datetime.now().strftime("%Y%m%d%H%M%S")
 
 class BoutiqueTestSuite:
     def __init__(self):
@@ -171,21 +173,21 @@ class BoutiqueTestSuite:
         # Test 1: Créer des clients
         test_clients = [
             {
-                "name": "Restaurant Le Poisson Bleu",
+                "name": f"Restaurant Le Poisson Bleu {RUN_ID}",
                 "phone": "01.45.67.89.12",
                 "email": "contact@poissonbleu.fr",
                 "address": "15 rue de la Mer, 75001 Paris",
                 "credit_limit": 1000.0
             },
             {
-                "name": "Boucherie Martin",
+                "name": f"Boucherie Martin {RUN_ID}",
                 "phone": "01.23.45.67.89",
                 "email": "martin@boucherie.fr", 
                 "address": "8 avenue des Bouchers, 75002 Paris",
                 "credit_limit": 500.0
             },
             {
-                "name": "Client Test Suppression",
+                "name": f"Client Test Suppression {RUN_ID}",
                 "phone": "01.99.88.77.66",
                 "email": "test@suppression.fr",
                 "address": "Test Address",
@@ -364,7 +366,7 @@ class BoutiqueTestSuite:
         # Test: Créer une vente avec client_name mais sans client_id
         auto_client_sale = {
             "client_id": None,  # Pas d'ID client
-            "client_name": "Nouveau Client Test Auto",  # Nom fourni
+            "client_name": f"Nouveau Client Test Auto {RUN_ID}",  # Nom fourni
             "items": [
                 {
                     "product_id": self.created_products[0]['id'],
@@ -391,7 +393,7 @@ class BoutiqueTestSuite:
                     # Chercher le client créé automatiquement
                     auto_created_client = None
                     for client in current_clients:
-                        if client['name'] == "Nouveau Client Test Auto":
+                        if client['name'] == f"Nouveau Client Test Auto {RUN_ID}":
                             auto_created_client = client
                             break
                     
@@ -411,7 +413,7 @@ class BoutiqueTestSuite:
                                     "Client non créé automatiquement - fonctionnalité manquante")
                         
                         # Si pas de création auto, vérifier que la vente fonctionne quand même
-                        if sale['client_name'] == "Nouveau Client Test Auto":
+                        if sale['client_name'] == f"Nouveau Client Test Auto {RUN_ID}":
                             self.log_test("Vente sans client_id", True, 
                                         "Vente créée avec client_name seulement")
                         else:
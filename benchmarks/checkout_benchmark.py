@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark du passage en caisse (POST /api/sales)
+Mesure la latence d'une vente en fonction du nombre de lignes du panier
+"""
+
+import requests
+import statistics
+import sys
+import time
+
+# Configuration
+BASE_URL = "https://frostbite-sales.preview.emergentagent.com/api"
+HEADERS = {"Content-Type": "application/json"}
+
+BASKET_SIZES = [1, 5, 10, 20, 40]
+RUNS_PER_SIZE = 20
+
+
+class CheckoutBenchmark:
+    def __init__(self, base_url=BASE_URL):
+        self.base_url = base_url
+        self.headers = HEADERS
+        self.product_ids = []
+
+    def setup_products(self, count):
+        """Créer assez de produits pour remplir le plus grand panier"""
+        for i in range(count):
+            response = requests.post(f"{self.base_url}/products", json={
+                "name": f"Bench Produit {i}",
+                "category": "poisson",
+                "price": 9.99,
+                "stock": 1_000_000,
+                "unit": "kg"
+            }, headers=self.headers, timeout=10)
+            response.raise_for_status()
+            self.product_ids.append(response.json()["id"])
+
+    def cleanup(self):
+        for product_id in self.product_ids:
+            requests.delete(f"{self.base_url}/products/{product_id}", headers=self.headers, timeout=10)
+
+    def time_sale(self, basket_size):
+        sale = {
+            "client_name": "Client Anonyme",
+            "items": [{"product_id": pid, "quantity": 0.5} for pid in self.product_ids[:basket_size]],
+            "discount": 0.0,
+            "payment_method": "espèces"
+        }
+        start = time.perf_counter()
+        response = requests.post(f"{self.base_url}/sales", json=sale, headers=self.headers, timeout=30)
+        elapsed = time.perf_counter() - start
+        response.raise_for_status()
+        return elapsed * 1000
+
+    def run(self):
+        print("🧊 BENCHMARK PASSAGE EN CAISSE 🧊")
+        print(f"URL de base: {self.base_url}")
+        print("=" * 60)
+
+        self.setup_products(max(BASKET_SIZES))
+        try:
+            # Warm up connections and caches
+            self.time_sale(1)
+            print(f"{'lignes':>8} {'médiane (ms)':>14} {'p95 (ms)':>10}")
+            for size in BASKET_SIZES:
+                timings = sorted(self.time_sale(size) for _ in range(RUNS_PER_SIZE))
+                p95 = timings[int(len(timings) * 0.95) - 1]
+                print(f"{size:>8} {statistics.median(timings):>14.1f} {p95:>10.1f}")
+        finally:
+            self.cleanup()
+
+
+if __name__ == "__main__":
+    base_url = sys.argv[1] if len(sys.argv) > 1 else BASE_URL
+    CheckoutBenchmark(base_url).run()
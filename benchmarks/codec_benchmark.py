@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark des codecs de documents
+Compare les anciens helpers prepare_for_mongo / parse_from_mongo au ModelCodec
+sur des listes de 10 000 documents (ventes et produits)
+"""
+
+import os
+import sys
+import timeit
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "benchmark")
+
+from server import Product, Sale, product_codec, sale_codec  # noqa: E402
+
+DOCUMENTS = 10_000
+REPEAT = 5
+
+
+# Helpers as they were before the codec layer, kept here for comparison
+def prepare_for_mongo(data):
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if isinstance(value, datetime):
+                data[key] = value.isoformat()
+    return data
+
+
+def parse_from_mongo(item):
+    if isinstance(item, dict):
+        for key, value in item.items():
+            if isinstance(value, str) and 'T' in value and (value.endswith('Z') or '+' in value[-6:]):
+                try:
+                    item[key] = datetime.fromisoformat(value.replace('Z', '+00:00'))
+                except:  # noqa: E722
+                    pass
+    return item
+
+
+def make_products(legacy):
+    now = datetime.now(timezone.utc)
+    docs = []
+    for i in range(DOCUMENTS):
+        doc = {
+            "id": str(uuid.uuid4()), "name": f"Produit {i}", "category": "poisson",
+            "price": 12.5, "stock": 40.0, "unit": "kg",
+            "created_at": now - timedelta(minutes=i), "updated_at": now,
+        }
+        docs.append(prepare_for_mongo(doc) if legacy else doc)
+    return docs
+
+
+def make_sales(legacy):
+    now = datetime.now(timezone.utc)
+    docs = []
+    for i in range(DOCUMENTS):
+        items = [{
+            "product_id": str(uuid.uuid4()), "product_name": f"Produit {j}", "category": "poisson",
+            "quantity": 1.5, "unit_price": 10.0, "total_price": 15.0,
+        } for j in range(3)]
+        doc = {
+            "id": str(uuid.uuid4()), "client_id": None, "client_name": "Client Anonyme",
+            "items": items, "subtotal": 45.0, "discount": 0.0, "total": 45.0,
+            "payment_method": "espèces", "status": "terminée",
+            "created_at": now - timedelta(minutes=i), "invoice_number": f"INV-{i}",
+        }
+        docs.append(prepare_for_mongo(doc) if legacy else doc)
+    return docs
+
+
+def bench(label, func):
+    best = min(timeit.repeat(func, number=1, repeat=REPEAT))
+    print(f"{label:<48} {best * 1000:>9.1f} ms")
+    return best
+
+
+def run():
+    print(f"🧊 BENCHMARK CODECS ({DOCUMENTS} documents, meilleur de {REPEAT}) 🧊")
+    print("=" * 60)
+    for name, model, codec, make in (("Produits", Product, product_codec, make_products),
+                                     ("Ventes", Sale, sale_codec, make_sales)):
+        legacy_docs = make(legacy=True)
+        native_docs = make(legacy=False)
+        objects = codec.decode_many(native_docs)
+
+        print(f"\n{name} - lecture")
+        # parse_from_mongo rewrites the dict in place: give it fresh copies
+        old = bench("  parse_from_mongo + Model(**doc)",
+                    lambda: [model(**parse_from_mongo(dict(d))) for d in legacy_docs])
+        new = bench("  ModelCodec.decode_many", lambda: codec.decode_many(native_docs))
+        print(f"  {'gain':<46} {old / new:>9.1f} x")
+
+        print(f"{name} - écriture")
+        old = bench("  prepare_for_mongo(Model.dict())", lambda: [prepare_for_mongo(o.dict()) for o in objects])
+        new = bench("  ModelCodec.encode", lambda: [codec.encode(o) for o in objects])
+        print(f"  {'gain':<46} {old / new:>9.1f} x")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark des prévisions de réapprovisionnement (backend/forecasting.py)
+Ajuste le modèle puis calcule les suggestions pour 10 000 produits sur un an
+d'agrégats journaliers synthétiques (ventes triplées le vendredi)
+
+Avec MONGO_URL, mesure aussi la lecture des agrégats par InventoryForecaster
+(regroupement par produit dans MongoDB compris), sur une base jetable:
+    python benchmarks/forecast_benchmark.py
+    MONGO_URL="mongodb://localhost:27017" python benchmarks/forecast_benchmark.py
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from forecasting import HISTORY_DAYS, InventoryForecaster, fit, fit_groups, plan, records  # noqa: E402
+from rollups import day_start  # noqa: E402
+
+PRODUCTS = 10_000
+SELLING_DAYS = 0.5  # part des jours où un produit donné se vend
+RUNS = 5
+DB_NAME = "benchmark_forecast"
+
+
+def make_rollups(today, rng):
+    start = day_start(today) - timedelta(days=HISTORY_DAYS - 1)
+    day_index = np.repeat(np.arange(HISTORY_DAYS), PRODUCTS)
+    product_index = np.tile(np.arange(PRODUCTS), HISTORY_DAYS)
+    sold = rng.random(day_index.size) < SELLING_DAYS
+    days = pd.Timestamp(start) + pd.to_timedelta(day_index[sold], unit="D")
+    quantity = rng.poisson(2, sold.sum()) * np.where(days.weekday == 4, 3, 1)
+    return pd.DataFrame({
+        "day": days,
+        "product_id": pd.Series(product_index[sold]).map("p{}".format),
+        "quantity": quantity.astype(float),
+    })
+
+
+def make_groups(rows, today):
+    """The documents the InventoryForecaster aggregation returns, built in memory"""
+    start = pd.Timestamp(day_start(today) - timedelta(days=HISTORY_DAYS - 1))
+    offsets = (rows["day"] - start) // pd.Timedelta(days=1)
+    return [
+        {"_id": product_id, "days": group.tolist(), "quantities": rows["quantity"][group.index].tolist()}
+        for product_id, group in offsets.groupby(rows["product_id"])
+    ]
+
+
+async def fetch_and_fit(rows):
+    """Median time of InventoryForecaster.model(): aggregation, transfer and fit"""
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(os.environ["MONGO_URL"], tz_aware=True)
+    try:
+        await client.drop_database(DB_NAME)
+        collection = client[DB_NAME].sales_daily
+        documents = [
+            {"level": "product", "day": day.to_pydatetime(), "product_id": product_id, "quantity": quantity}
+            for day, product_id, quantity in zip(rows["day"], rows["product_id"], rows["quantity"])
+        ]
+        for offset in range(0, len(documents), 10_000):
+            await collection.insert_many(documents[offset:offset + 10_000], ordered=False)
+        forecaster = InventoryForecaster(collection, max_age=0)
+        timings = []
+        for _ in range(RUNS):
+            start = time.perf_counter()
+            await forecaster.model()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
+    finally:
+        await client.drop_database(DB_NAME)
+        client.close()
+
+
+def timed(function, *args):
+    timings, result = [], None
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        result = function(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(timings)
+
+
+def run():
+    print("🐟 BENCHMARK PRÉVISIONS DE STOCK 🐟")
+    today = datetime.now(timezone.utc)
+    rng = np.random.default_rng(0)
+    rows = make_rollups(today, rng)
+    products = [
+        {"id": f"p{i}", "name": f"Produit {i}", "category": "poisson", "stock": float(stock), "unit": "kg"}
+        for i, stock in enumerate(rng.integers(0, 40, PRODUCTS))
+    ]
+    print(f"{PRODUCTS} produits, {HISTORY_DAYS} jours, {len(rows)} lignes d'agrégats, médiane sur {RUNS} essais")
+    print("=" * 60)
+
+    model, fit_ms = timed(fit, rows, today)
+    _, groups_ms = timed(fit_groups, make_groups(rows, today), today)
+    forecast, plan_ms = timed(plan, model, products, today)
+    _, records_ms = timed(records, forecast)
+    print(f"{'ajustement du modèle':>28} {fit_ms:>10.1f} ms")
+    print(f"{'ajustement (par produit)':>28} {groups_ms:>10.1f} ms")
+    if os.environ.get("MONGO_URL"):
+        print(f"{'lecture MongoDB + ajustement':>28} {asyncio.run(fetch_and_fit(rows)):>10.1f} ms")
+    print(f"{'suggestions (stock actuel)':>28} {plan_ms:>10.1f} ms")
+    print(f"{'sérialisation':>28} {records_ms:>10.1f} ms")
+    print(f"{'produits à commander':>28} {int(forecast['needs_reorder'].sum()):>10}")
+    print(f"{'facteur vendredi moyen':>28} {model.factors[:, 4].mean():>10.2f}")
+
+
+if __name__ == "__main__":
+    run()
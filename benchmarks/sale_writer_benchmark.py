@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark du regroupement des écritures de ventes (SALE_WRITE_BATCHING)
+Compare insert_one par vente et BatchWriter (insert_many groupé) pour
+plusieurs niveaux de concurrence, sur des documents de vente réalistes
+
+    MONGO_URL="mongodb://localhost:27017" python benchmarks/sale_writer_benchmark.py
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+
+from writer import BatchWriter  # noqa: E402
+
+MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+DB_NAME = os.environ.get("DB_NAME", "benchmark_sale_writer")
+CONCURRENCY = [1, 8, 32, 128, 512]
+DURATION = 5  # secondes par mesure
+WINDOWS_MS = [1, 2, 5]
+MAX_BATCH = 100
+
+
+def make_sale():
+    return {
+        "id": str(uuid.uuid4()), "client_id": None, "client_name": "Client Anonyme",
+        "items": [{
+            "product_id": str(uuid.uuid4()), "product_name": f"Produit {j}", "category": "poisson",
+            "quantity": 1.5, "unit_price": 10.0, "total_price": 15.0,
+        } for j in range(3)],
+        "subtotal": 45.0, "discount": 0.0, "total": 45.0,
+        "payment_method": "espèces", "status": "terminée",
+        "created_at": datetime.now(timezone.utc), "updated_at": datetime.now(timezone.utc),
+        "invoice_number": f"BENCH-{uuid.uuid4().hex[:12]}",
+    }
+
+
+async def worker(insert, deadline, timings):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        await insert(make_sale())
+        timings.append((time.perf_counter() - start) * 1000)
+
+
+async def measure(label, insert, concurrency):
+    timings = []
+    deadline = time.perf_counter() + DURATION
+    await asyncio.gather(*(worker(insert, deadline, timings) for _ in range(concurrency)))
+    timings.sort()
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    print(f"{label:>16} {concurrency:>6} {len(timings) / DURATION:>12.0f} "
+          f"{statistics.median(timings):>10.2f} {p99:>10.2f}")
+
+
+async def run():
+    print("🧊 BENCHMARK ÉCRITURES GROUPÉES DES VENTES 🧊")
+    print(f"MongoDB: {MONGO_URL}, {DURATION} s par mesure, lots de {MAX_BATCH} au plus")
+    print("=" * 60)
+
+    client = AsyncIOMotorClient(MONGO_URL, tz_aware=True)
+    db = client[DB_NAME]
+    await client.drop_database(DB_NAME)
+    await db.sales.create_index("id", unique=True)
+    try:
+        print(f"{'mode':>16} {'conc.':>6} {'ventes/s':>12} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+        for concurrency in CONCURRENCY:
+            await measure("insert_one", db.sales.insert_one, concurrency)
+            for window_ms in WINDOWS_MS:
+                writer = BatchWriter(db.sales, window=window_ms / 1000, max_batch=MAX_BATCH)
+                await measure(f"groupé {window_ms} ms", writer.insert, concurrency)
+                await writer.close()
+            print()
+    finally:
+        await client.drop_database(DB_NAME)
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark du mode transactionnel des ventes (SALE_TRANSACTIONS)
+Compare le débit de create_sale avec et sans transaction multi-documents,
+pour plusieurs caisses simultanées qui vendent les mêmes produits
+
+Nécessite un replica set ; un nœud unique suffit:
+    mongod --replSet rs0 --dbpath /tmp/rs0
+    mongosh --eval "rs.initiate()"
+    MONGO_URL="mongodb://localhost:27017/?replicaSet=rs0" python benchmarks/transaction_benchmark.py
+"""
+
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017/?replicaSet=rs0")
+os.environ.setdefault("DB_NAME", "benchmark_transactions")
+
+import server  # noqa: E402
+from fastapi import HTTPException  # noqa: E402
+from indexes import ensure_indexes  # noqa: E402
+from server import ProductCreate, SaleCreate, SaleItemCreate  # noqa: E402
+
+PRODUCTS = 50
+BASKET_SIZE = 5
+TILLS = [1, 4, 16]
+DURATION = 10  # secondes par mesure
+
+
+async def setup_products():
+    await server.client.drop_database(os.environ["DB_NAME"])
+    await ensure_indexes(server.db)
+    products = [
+        await server.create_product(ProductCreate(
+            name=f"Bench Produit {i}", category="poisson", price=9.99, stock=1_000_000, unit="kg"
+        ))
+        for i in range(PRODUCTS)
+    ]
+    return [product.id for product in products]
+
+
+async def till(product_ids, deadline, rng, timings, failures):
+    while time.perf_counter() < deadline:
+        sale = SaleCreate(items=[
+            SaleItemCreate(product_id=product_id, quantity=0.5)
+            for product_id in rng.sample(product_ids, BASKET_SIZE)
+        ])
+        start = time.perf_counter()
+        try:
+            await server.checkout(sale)
+        except HTTPException:
+            failures.append(1)
+            continue
+        timings.append((time.perf_counter() - start) * 1000)
+
+
+async def measure(product_ids, transactions, tills):
+    server.SALE_TRANSACTIONS = transactions
+    timings, failures = [], []
+    deadline = time.perf_counter() + DURATION
+    await asyncio.gather(*(
+        till(product_ids, deadline, random.Random(i), timings, failures) for i in range(tills)
+    ))
+    timings.sort()
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    mode = "transaction" if transactions else "sans"
+    return (f"{mode:>12} {tills:>8} {len(timings) / DURATION:>10.1f} "
+            f"{statistics.median(timings):>10.1f} {p99:>10.1f} {len(failures):>8}")
+
+
+async def run():
+    print("🧊 BENCHMARK VENTES TRANSACTIONNELLES 🧊")
+    print(f"MongoDB: {os.environ['MONGO_URL']}")
+    print(f"{PRODUCTS} produits, {BASKET_SIZE} lignes par panier, {DURATION} s par mesure")
+    print("=" * 60)
+
+    product_ids = await setup_products()
+    try:
+        # Warm up connections, catalog and invoice counter
+        await measure(product_ids, False, 1)
+        print(f"\n{'mode':>12} {'caisses':>8} {'ventes/s':>10} {'p50 (ms)':>10} {'p99 (ms)':>10} {'échecs':>8}")
+        for tills in TILLS:
+            for transactions in (False, True):
+                print(await measure(product_ids, transactions, tills))
+    finally:
+        await server.client.drop_database(os.environ["DB_NAME"])
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Test du relevé client (GET /clients/{id}/statement)
+Le cumul des ventes doit suivre d'une page à l'autre, et la dette en début et fin de période venir du grand livre
+"""
+
+import requests
+import sys
+from datetime import datetime
+
+# Configuration
+BASE_URL = "https://frostbite-sales.preview.emergentagent.com/api"
+HEADERS = {"Content-Type": "application/json"}
+# Client names are unique: suffix them so the suite can be re-run on the same database
+RUN_ID = datetime.now().strftime("%Y%m%d%H%M%S")
+
+class ClientStatementTestSuite:
+    def __init__(self):
+        self.base_url = BASE_URL
+        self.headers = HEADERS
+        self.test_results = []
+        self.created_products = []
+        self.created_clients = []
+        self.client = None
+
+    def log_test(self, test_name, success, message, details=None):
+        """Log test results"""
+        result = {
+            "test": test_name,
+            "success": success,
+            "message": message,
+            "details": details,
+            "timestamp": datetime.now().isoformat()
+        }
+        self.test_results.append(result)
+        status = "✅ PASS" if success else "❌ FAIL"
+        print(f"{status} - {test_name}: {message}")
+        if details and not success:
+            print(f"   Details: {details}")
+
+    def create_product(self, name, price, stock):
+        response = requests.post(f"{self.base_url}/products", json={
+            "name": name,
+            "category": "viande",
+            "price": price,
+            "stock": stock,
+            "unit": "kg"
+        }, headers=self.headers, timeout=10)
+        response.raise_for_status()
+        product = response.json()
+        self.created_products.append(product)
+        return product
+
+    def create_client(self, name, credit_limit):
+        response = requests.post(f"{self.base_url}/clients", json={
+            "name": f"{name} {RUN_ID}",
+            "credit_limit": credit_limit
+        }, headers=self.headers, timeout=10)
+        response.raise_for_status()
+        client = response.json()
+        self.created_clients.append(client)
+        return client
+
+    def sell(self, client, product_id, quantity, payment_method):
+        response = requests.post(f"{self.base_url}/sales", json={
+            "client_id": client["id"],
+            "client_name": client["name"],
+            "items": [{"product_id": product_id, "quantity": quantity}],
+            "discount": 0.0,
+            "payment_method": payment_method
+        }, headers=self.headers, timeout=30)
+        response.raise_for_status()
+        return response.json()
+
+    def statement(self, **params):
+        return requests.get(f"{self.base_url}/clients/{self.client['id']}/statement", params=params,
+                            headers=self.headers, timeout=30)
+
+    def all_pages(self, **params):
+        """Pages du relevé, en suivant next_cursor"""
+        pages = []
+        after = None
+        while True:
+            page = self.statement(**params, after=after).json()
+            pages.append(page)
+            after = page.get("next_cursor")
+            if not after or len(pages) > 20:
+                return pages
+
+    def setup_sales(self):
+        """5 ventes de 10, 20, 30, 40 et 50€: les deux premières à crédit"""
+        product = self.create_product("Côte de Boeuf Relevé", 10.0, 100)
+        self.client = self.create_client("Boucherie Relevé", 500.0)
+        for quantity in range(1, 6):
+            self.sell(self.client, product["id"], quantity, "crédit" if quantity <= 2 else "espèces")
+
+    def test_running_totals_across_pages(self):
+        """Test 1: relevé complet par pages de 2: cumul continu, ni trou ni doublon"""
+        print("\n=== TEST CUMUL SUR PLUSIEURS PAGES ===")
+        pages = self.all_pages(limit=2)
+        sales = [sale for page in pages for sale in page["sales"]]
+
+        totals = [sale["total"] for sale in sales]
+        running = [sale["running_total"] for sale in sales]
+        if len(pages) == 3 and totals == [10.0, 20.0, 30.0, 40.0, 50.0] and running == [10.0, 30.0, 60.0, 100.0, 150.0]:
+            self.log_test("Cumul entre les pages", True, "3 pages, cumul 10 → 150€ sans rupture")
+        else:
+            self.log_test("Cumul entre les pages", False, f"Pages: {len(pages)}, montants: {totals}, cumuls: {running}")
+
+        first = pages[0]
+        if first["period_spend"] == 150.0 and first["period_sales_count"] == 5 and first["closing_debt"] == 30.0:
+            self.log_test("Totaux du relevé", True, "150€ sur 5 ventes, dette 30€")
+        else:
+            self.log_test("Totaux du relevé", False,
+                        f"Dépense: {first['period_spend']}, ventes: {first['period_sales_count']}, dette: {first['closing_debt']}")
+
+        if pages[-1]["next_cursor"] is None:
+            self.log_test("Dernière page", True, "Pas de curseur après la dernière vente")
+        else:
+            self.log_test("Dernière page", False, f"Curseur: {pages[-1]['next_cursor']}")
+
+    def test_period_bounds(self):
+        """Test 2: relevé à partir de la 3e vente: cumul de la période, dette d'ouverture du grand livre"""
+        print("\n=== TEST PÉRIODE ===")
+        sales = [sale for page in self.all_pages(limit=5) for sale in page["sales"]]
+        if len(sales) != 5:
+            self.log_test("Ventes du client", False, f"{len(sales)} ventes au lieu de 5")
+            return
+        start = sales[2]["created_at"]
+
+        pages = self.all_pages(start=start, limit=2)
+        running = [sale["running_total"] for page in pages for sale in page["sales"]]
+        first = pages[0]
+        if running == [30.0, 70.0, 120.0] and first["period_spend"] == 120.0:
+            self.log_test("Cumul de la période", True, "Cumul repart de la 3e vente: 30, 70, 120€")
+        else:
+            self.log_test("Cumul de la période", False, f"Cumuls: {running}, dépense: {first['period_spend']}")
+
+        if first["opening_debt"] == 30.0 and first["closing_debt"] == 30.0:
+            self.log_test("Dette d'ouverture", True, "30€ dus avant la période, rien de plus à crédit ensuite")
+        else:
+            self.log_test("Dette d'ouverture", False,
+                        f"Ouverture: {first['opening_debt']}, clôture: {first['closing_debt']}")
+
+    def test_invalid_requests(self):
+        """Test 3: curseur illisible et période vide refusés"""
+        print("\n=== TEST REQUÊTES INVALIDES ===")
+        bad_cursor = self.statement(after="pas-un-curseur")
+        empty_period = self.statement(start="2025-06-01T00:00:00", end="2025-05-01T00:00:00")
+        if bad_cursor.status_code == 400 and empty_period.status_code == 400:
+            self.log_test("Requêtes invalides", True, "400 pour un curseur illisible et une fin avant le début")
+        else:
+            self.log_test("Requêtes invalides", False,
+                        f"Statuts: {bad_cursor.status_code}/{empty_period.status_code}")
+
+    def cleanup(self):
+        for product in self.created_products:
+            requests.delete(f"{self.base_url}/products/{product['id']}", headers=self.headers, timeout=10)
+        for client in self.created_clients:
+            requests.delete(f"{self.base_url}/clients/{client['id']}", headers=self.headers, timeout=10)
+
+    def run_all_tests(self):
+        """Exécuter tous les tests"""
+        print("🧊 TESTS RELEVÉ CLIENT - BOUTIQUE SURGELÉS 🧊")
+        print(f"URL de base: {self.base_url}")
+        print("=" * 60)
+
+        try:
+            self.setup_sales()
+            self.test_running_totals_across_pages()
+            self.test_period_bounds()
+            self.test_invalid_requests()
+        finally:
+            self.cleanup()
+
+        total_tests = len(self.test_results)
+        passed_tests = sum(1 for result in self.test_results if result['success'])
+
+        print("\n" + "=" * 60)
+        print(f"Total: {total_tests} tests, ✅ Réussis: {passed_tests}, ❌ Échoués: {total_tests - passed_tests}")
+        return passed_tests == total_tests
+
+if __name__ == "__main__":
+    test_suite = ClientStatementTestSuite()
+    success = test_suite.run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test des requêtes conditionnelles (ETag / If-None-Match)
+Les listes et le tableau de bord doivent répondre 304 tant que rien n'a changé
+"""
+
+import requests
+import sys
+from datetime import datetime
+
+# Configuration
+BASE_URL = "https://frostbite-sales.preview.emergentagent.com/api"
+HEADERS = {"Content-Type": "application/json"}
+
+class ConditionalGetTestSuite:
+    def __init__(self):
+        self.base_url = BASE_URL
+        self.headers = HEADERS
+        self.test_results = []
+        self.created_products = []
+
+    def log_test(self, test_name, success, message, details=None):
+        """Log test results"""
+        result = {
+            "test": test_name,
+            "success": success,
+            "message": message,
+            "details": details,
+            "timestamp": datetime.now().isoformat()
+        }
+        self.test_results.append(result)
+        status = "✅ PASS" if success else "❌ FAIL"
+        print(f"{status} - {test_name}: {message}")
+        if details and not success:
+            print(f"   Details: {details}")
+
+    def etag(self, path):
+        response = requests.get(f"{self.base_url}/{path}", headers=self.headers, timeout=10)
+        return response.headers.get("ETag")
+
+    def conditional_status(self, path, etag):
+        headers = {**self.headers, "If-None-Match": etag}
+        return requests.get(f"{self.base_url}/{path}", headers=headers, timeout=10).status_code
+
+    def test_not_modified(self):
+        """Test 1: 304 quand la copie du client est à jour"""
+        print("\n=== TEST 304 NOT MODIFIED ===")
+        for path in ("products", "clients", "sales", "dashboard/stats"):
+            try:
+                etag = self.etag(path)
+                if not etag:
+                    self.log_test(f"ETag {path}", False, "En-tête ETag absent")
+                    continue
+                status = self.conditional_status(path, etag)
+                if status == 304:
+                    self.log_test(f"ETag {path}", True, "304 renvoyé pour une copie à jour")
+                else:
+                    self.log_test(f"ETag {path}", False, f"Devrait retourner 304 mais status: {status}")
+            except Exception as e:
+                self.log_test(f"ETag {path}", False, str(e))
+
+    def test_write_invalidates(self):
+        """Test 2: une écriture rend les ETags concernés obsolètes"""
+        print("\n=== TEST INVALIDATION APRÈS ÉCRITURE ===")
+        try:
+            products_etag = self.etag("products")
+            stats_etag = self.etag("dashboard/stats")
+
+            response = requests.post(f"{self.base_url}/products", json={
+                "name": "Colin ETag",
+                "category": "poisson",
+                "price": 11.0,
+                "stock": 4,
+                "unit": "kg"
+            }, headers=self.headers, timeout=10)
+            self.created_products.append(response.json())
+
+            products_status = self.conditional_status("products", products_etag)
+            stats_status = self.conditional_status("dashboard/stats", stats_etag)
+            if products_status == 200 and stats_status == 200:
+                self.log_test("Invalidation après création produit", True, "Liste produits et tableau de bord renvoyés en entier")
+            else:
+                self.log_test("Invalidation après création produit", False,
+                            f"Produits: {products_status}, tableau de bord: {stats_status}")
+        except Exception as e:
+            self.log_test("Invalidation après création produit", False, str(e))
+
+    def cleanup(self):
+        for product in self.created_products:
+            requests.delete(f"{self.base_url}/products/{product['id']}", headers=self.headers, timeout=10)
+
+    def run_all_tests(self):
+        """Exécuter tous les tests"""
+        print("🧊 TESTS REQUÊTES CONDITIONNELLES - BOUTIQUE SURGELÉS 🧊")
+        print(f"URL de base: {self.base_url}")
+        print("=" * 60)
+
+        try:
+            self.test_not_modified()
+            self.test_write_invalidates()
+        finally:
+            self.cleanup()
+
+        total_tests = len(self.test_results)
+        passed_tests = sum(1 for result in self.test_results if result['success'])
+
+        print("\n" + "=" * 60)
+        print(f"Total: {total_tests} tests, ✅ Réussis: {passed_tests}, ❌ Échoués: {total_tests - passed_tests}")
+        return passed_tests == total_tests
+
+if __name__ == "__main__":
+    test_suite = ConditionalGetTestSuite()
+    success = test_suite.run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Test du grand livre des dettes clients (ventes à crédit et remboursements)
+La limite de crédit doit tenir même quand plusieurs caisses vendent à crédit au même client en même temps
+"""
+
+import requests
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Configuration
+BASE_URL = "https://frostbite-sales.preview.emergentagent.com/api"
+HEADERS = {"Content-Type": "application/json"}
+# Client names are unique: suffix them so the suite can be re-run on the same database
+RUN_ID = datetime.now().strftime("%Y%m%d%H%M%S")
+
+class CreditLedgerTestSuite:
+    def __init__(self):
+        self.base_url = BASE_URL
+        self.headers = HEADERS
+        self.test_results = []
+        self.created_products = []
+        self.created_clients = []
+
+    def log_test(self, test_name, success, message, details=None):
+        """Log test results"""
+        result = {
+            "test": test_name,
+            "success": success,
+            "message": message,
+            "details": details,
+            "timestamp": datetime.now().isoformat()
+        }
+        self.test_results.append(result)
+        status = "✅ PASS" if success else "❌ FAIL"
+        print(f"{status} - {test_name}: {message}")
+        if details and not success:
+            print(f"   Details: {details}")
+
+    def create_product(self, name, price, stock):
+        response = requests.post(f"{self.base_url}/products", json={
+            "name": name,
+            "category": "poisson",
+            "price": price,
+            "stock": stock,
+            "unit": "kg"
+        }, headers=self.headers, timeout=10)
+        response.raise_for_status()
+        product = response.json()
+        self.created_products.append(product)
+        return product
+
+    def create_client(self, name, credit_limit):
+        response = requests.post(f"{self.base_url}/clients", json={
+            "name": f"{name} {RUN_ID}",
+            "credit_limit": credit_limit
+        }, headers=self.headers, timeout=10)
+        response.raise_for_status()
+        client = response.json()
+        self.created_clients.append(client)
+        return client
+
+    def get_client(self, client_id):
+        return requests.get(f"{self.base_url}/clients/{client_id}", headers=self.headers, timeout=10).json()
+
+    def get_ledger(self, client_id):
+        return requests.get(f"{self.base_url}/clients/{client_id}/ledger", headers=self.headers, timeout=10).json()
+
+    def get_stock(self, product_id):
+        return requests.get(f"{self.base_url}/products/{product_id}", headers=self.headers, timeout=10).json()["stock"]
+
+    def sell_on_credit(self, client, product_id, quantity, discount=0.0):
+        return requests.post(f"{self.base_url}/sales", json={
+            "client_id": client["id"],
+            "client_name": client["name"],
+            "items": [{"product_id": product_id, "quantity": quantity}],
+            "discount": discount,
+            "payment_method": "crédit"
+        }, headers=self.headers, timeout=30)
+
+    def pay(self, client_id, amount):
+        return requests.post(f"{self.base_url}/clients/{client_id}/payments", json={
+            "amount": amount,
+            "payment_method": "espèces"
+        }, headers=self.headers, timeout=10)
+
+    def test_credit_limit_refusal(self):
+        """Test 1: une vente à crédit au-delà de la limite est refusée et ne touche ni la dette ni le stock"""
+        print("\n=== TEST LIMITE DE CRÉDIT ===")
+        product = self.create_product("Bar Crédit", 10.0, 100)
+        client = self.create_client("Restaurant Limite Crédit", 50.0)
+
+        accepted = self.sell_on_credit(client, product["id"], 4)
+        refused = self.sell_on_credit(client, product["id"], 2)
+        debt = self.get_client(client["id"])["current_debt"]
+        stock = self.get_stock(product["id"])
+
+        if accepted.status_code == 200 and refused.status_code == 400 and debt == 40.0 and stock == 96:
+            self.log_test("Limite de crédit", True, "40€ acceptés, 20€ de plus refusés (limite 50€)")
+        else:
+            self.log_test("Limite de crédit", False,
+                        f"Statuts: {accepted.status_code}/{refused.status_code}, dette: {debt}, stock: {stock}",
+                        refused.text)
+
+    def test_concurrent_charges(self):
+        """Test 2: 20 ventes à crédit simultanées de 10€ pour une limite de 100€"""
+        print("\n=== TEST VENTES À CRÉDIT SIMULTANÉES ===")
+        product = self.create_product("Sole Crédit", 10.0, 100)
+        client = self.create_client("Cantine Crédit Simultané", 100.0)
+
+        with ThreadPoolExecutor(max_workers=20) as pool:
+            responses = list(pool.map(lambda _: self.sell_on_credit(client, product["id"], 1), range(20)))
+
+        accepted = sum(1 for r in responses if r.status_code == 200)
+        refused = sum(1 for r in responses if r.status_code == 400)
+        debt = self.get_client(client["id"])["current_debt"]
+        stock = self.get_stock(product["id"])
+        entries = self.get_ledger(client["id"])
+        balances = [entry["balance"] for entry in sorted(entries, key=lambda entry: entry["seq"])]
+
+        if accepted == 10 and refused == 10 and debt == 100.0 and stock == 90:
+            self.log_test("Pas de dépassement de limite", True, "10 ventes acceptées, 10 refusées, dette finale 100€")
+        else:
+            self.log_test("Pas de dépassement de limite", False,
+                        f"Acceptées: {accepted}, refusées: {refused}, dette: {debt}, stock: {stock}")
+
+        # Each entry holds the balance written by its own move: one step of 10€ at a time
+        expected = [10.0 * (i + 1) for i in range(accepted)]
+        if balances == expected:
+            self.log_test("Soldes du grand livre", True, f"{len(balances)} écritures, soldes croissants de 10€")
+        else:
+            self.log_test("Soldes du grand livre", False, f"Soldes: {balances}")
+
+    def test_payment_over_debt(self):
+        """Test 3: un remboursement supérieur à la dette est refusé, un remboursement partiel accepté"""
+        print("\n=== TEST REMBOURSEMENTS ===")
+        product = self.create_product("Turbot Crédit", 15.0, 100)
+        client = self.create_client("Brasserie Remboursement", 200.0)
+        self.sell_on_credit(client, product["id"], 2)
+
+        too_much = self.pay(client["id"], 30.01)
+        partial = self.pay(client["id"], 20.0)
+        debt = self.get_client(client["id"])["current_debt"]
+
+        if too_much.status_code == 400 and partial.status_code == 200 and debt == 10.0:
+            self.log_test("Remboursement plafonné à la dette", True,
+                        "30,01€ refusés pour 30€ dus, 20€ acceptés, reste 10€")
+        else:
+            self.log_test("Remboursement plafonné à la dette", False,
+                        f"Statuts: {too_much.status_code}/{partial.status_code}, dette: {debt}", too_much.text)
+
+        entry = partial.json() if partial.status_code == 200 else {}
+        if entry.get("kind") == "paiement" and entry.get("amount") == -20.0 and entry.get("balance") == 10.0:
+            self.log_test("Écriture de paiement", True, "Montant -20€, solde 10€")
+        else:
+            self.log_test("Écriture de paiement", False, f"Écriture: {entry}")
+
+    def test_discount_over_subtotal(self):
+        """Test 4: une remise supérieure au montant est refusée et ne rembourse pas la dette"""
+        print("\n=== TEST REMISE SUPÉRIEURE AU MONTANT ===")
+        product = self.create_product("Dorade Crédit", 10.0, 100)
+        client = self.create_client("Traiteur Remise", 100.0)
+        self.sell_on_credit(client, product["id"], 2)
+
+        response = self.sell_on_credit(client, product["id"], 1, discount=100.0)
+        after = self.get_client(client["id"])
+        stock = self.get_stock(product["id"])
+
+        if response.status_code == 400 and after["current_debt"] == 20.0 and after["lifetime_spend"] >= 0 and stock == 98:
+            self.log_test("Remise plafonnée", True, "Remise de 100€ sur 10€ refusée, dette inchangée (20€)")
+        else:
+            self.log_test("Remise plafonnée", False,
+                        f"Status: {response.status_code}, dette: {after['current_debt']}, stock: {stock}", response.text)
+
+    def cleanup(self):
+        for product in self.created_products:
+            requests.delete(f"{self.base_url}/products/{product['id']}", headers=self.headers, timeout=10)
+        for client in self.created_clients:
+            requests.delete(f"{self.base_url}/clients/{client['id']}", headers=self.headers, timeout=10)
+
+    def run_all_tests(self):
+        """Exécuter tous les tests"""
+        print("🧊 TESTS GRAND LIVRE CRÉDIT - BOUTIQUE SURGELÉS 🧊")
+        print(f"URL de base: {self.base_url}")
+        print("=" * 60)
+
+        try:
+            self.test_credit_limit_refusal()
+            self.test_concurrent_charges()
+            self.test_payment_over_debt()
+            self.test_discount_over_subtotal()
+        finally:
+            self.cleanup()
+
+        total_tests = len(self.test_results)
+        passed_tests = sum(1 for result in self.test_results if result['success'])
+
+        print("\n" + "=" * 60)
+        print(f"Total: {total_tests} tests, ✅ Réussis: {passed_tests}, ❌ Échoués: {total_tests - passed_tests}")
+        return passed_tests == total_tests
+
+if __name__ == "__main__":
+    test_suite = CreditLedgerTestSuite()
+    success = test_suite.run_all_tests()
+    sys.exit(0 if success else 1)
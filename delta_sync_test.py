@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Test de la synchronisation incrémentale des caisses (?updated_since=)
+Une caisse ne recharge que ce qui a changé depuis son dernier point de synchronisation:
+produits modifiés, produits supprimés (tombstones), et renvoi des écritures proches du point
+"""
+
+import requests
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+# Configuration
+BASE_URL = "https://frostbite-sales.preview.emergentagent.com/api"
+HEADERS = {"Content-Type": "application/json"}
+# Must match sync.WATERMARK_GRACE on the server
+WATERMARK_GRACE = 5
+
+class DeltaSyncTestSuite:
+    def __init__(self):
+        self.base_url = BASE_URL
+        self.headers = HEADERS
+        self.test_results = []
+        self.created_products = []
+
+    def log_test(self, test_name, success, message, details=None):
+        """Log test results"""
+        result = {
+            "test": test_name,
+            "success": success,
+            "message": message,
+            "details": details,
+            "timestamp": datetime.now().isoformat()
+        }
+        self.test_results.append(result)
+        status = "✅ PASS" if success else "❌ FAIL"
+        print(f"{status} - {test_name}: {message}")
+        if details and not success:
+            print(f"   Details: {details}")
+
+    def create_product(self, name, price=10.0):
+        response = requests.post(f"{self.base_url}/products", json={
+            "name": name,
+            "category": "poisson",
+            "price": price,
+            "stock": 20,
+            "unit": "kg"
+        }, headers=self.headers, timeout=10)
+        response.raise_for_status()
+        product = response.json()
+        self.created_products.append(product)
+        return product
+
+    def current_watermark(self):
+        """Point de départ d'une caisse qui vient de charger la liste complète"""
+        response = requests.get(f"{self.base_url}/products", params={"limit": 1}, headers=self.headers, timeout=10)
+        return response.headers["X-Watermark"]
+
+    def sync(self, watermark, limit=None, after=None):
+        return requests.get(f"{self.base_url}/products", params={"updated_since": watermark, "limit": limit, "after": after},
+                            headers=self.headers, timeout=30)
+
+    def test_changes_and_tombstones(self):
+        """Test 1: un produit modifié revient dans items, un produit supprimé dans deleted"""
+        print("\n=== TEST MODIFICATIONS ET SUPPRESSIONS ===")
+        start = self.current_watermark()
+        kept = self.create_product("Lieu Noir Sync")
+        removed = self.create_product("Raie Sync")
+
+        first = self.sync(start).json()
+        first_ids = {item["id"] for item in first["items"]}
+        if {kept["id"], removed["id"]} <= first_ids:
+            self.log_test("Nouveaux produits", True, "Les deux produits créés sont dans items")
+        else:
+            self.log_test("Nouveaux produits", False, f"Ids reçus: {sorted(first_ids)}")
+
+        requests.put(f"{self.base_url}/products/{kept['id']}", json={"price": 12.5}, headers=self.headers, timeout=10)
+        requests.delete(f"{self.base_url}/products/{removed['id']}", headers=self.headers, timeout=10)
+        self.created_products.remove(removed)
+
+        second = self.sync(first["watermark"]).json()
+        updated = {item["id"]: item for item in second["items"]}
+        if updated.get(kept["id"], {}).get("price") == 12.5:
+            self.log_test("Produit modifié", True, "Nouveau prix reçu dans items")
+        else:
+            self.log_test("Produit modifié", False, f"Items: {list(updated.values())}")
+
+        if removed["id"] in second["deleted"] and removed["id"] not in updated:
+            self.log_test("Tombstone", True, "Produit supprimé listé dans deleted")
+        else:
+            self.log_test("Tombstone", False, f"deleted: {second['deleted']}")
+
+    def test_watermark_too_old(self):
+        """Test 2: un point de synchronisation plus ancien que les tombstones renvoie 410"""
+        print("\n=== TEST POINT DE SYNCHRONISATION TROP ANCIEN ===")
+        too_old = (datetime.now(timezone.utc) - timedelta(days=31)).isoformat()
+        response = self.sync(too_old)
+        if response.status_code == 410:
+            self.log_test("Point trop ancien", True, "410: la caisse doit recharger la liste complète")
+        else:
+            self.log_test("Point trop ancien", False, f"Status: {response.status_code}", response.text)
+
+    def test_grace_window(self):
+        """Test 3: les écritures juste avant le point renvoyé reviennent à la synchronisation suivante"""
+        print("\n=== TEST FENÊTRE DE GRÂCE ===")
+        start = self.current_watermark()
+        product = self.create_product("Congre Sync")
+
+        first = self.sync(start).json()
+        again = self.sync(first["watermark"]).json()
+        if product["id"] in {item["id"] for item in again["items"]}:
+            self.log_test("Renvoi dans la fenêtre", True,
+                        f"Produit écrit moins de {WATERMARK_GRACE} s avant le point renvoyé une deuxième fois")
+        else:
+            self.log_test("Renvoi dans la fenêtre", False, f"Point: {first['watermark']}")
+
+        # Once the grace window has passed, a later watermark no longer covers the write
+        time.sleep(WATERMARK_GRACE + 1)
+        later = self.sync(self.sync(start).json()["watermark"]).json()
+        if product["id"] not in {item["id"] for item in later["items"]}:
+            self.log_test("Fin de la fenêtre", True, "Produit plus renvoyé après la fenêtre de grâce")
+        else:
+            self.log_test("Fin de la fenêtre", False, "Produit toujours renvoyé après la fenêtre de grâce")
+
+    def test_paged_changes(self):
+        """Test 4: un gros delta arrive par pages, sans trou ni doublon, avec le même point sur chaque page"""
+        print("\n=== TEST DELTA PAR PAGES ===")
+        start = self.current_watermark()
+        created = [self.create_product(f"Merlan Sync {i}") for i in range(5)]
+
+        pages = []
+        after = None
+        while True:
+            page = self.sync(start, limit=2, after=after).json()
+            pages.append(page)
+            after = page.get("next_cursor")
+            if not after or len(pages) > 50:
+                break
+
+        ids = [item["id"] for page in pages for item in page["items"]]
+        if {product["id"] for product in created} <= set(ids) and len(ids) == len(set(ids)):
+            self.log_test("Pages complètes", True, f"{len(ids)} produits en {len(pages)} pages, sans doublon")
+        else:
+            self.log_test("Pages complètes", False, f"{len(ids)} ids reçus, {len(set(ids))} distincts")
+
+        watermarks = {page["watermark"] for page in pages}
+        if len(pages) >= 3 and len(watermarks) == 1:
+            self.log_test("Point de synchronisation", True, "Le même point sur toutes les pages")
+        else:
+            self.log_test("Point de synchronisation", False, f"Pages: {len(pages)}, points: {sorted(watermarks)}")
+
+        invalid = self.sync(start, limit=2, after="pas-un-curseur")
+        if invalid.status_code == 400:
+            self.log_test("Curseur invalide", True, "400")
+        else:
+            self.log_test("Curseur invalide", False, f"Status: {invalid.status_code}", invalid.text)
+
+    def cleanup(self):
+        for product in self.created_products:
+            requests.delete(f"{self.base_url}/products/{product['id']}", headers=self.headers, timeout=10)
+
+    def run_all_tests(self):
+        """Exécuter tous les tests"""
+        print("🧊 TESTS SYNCHRONISATION INCRÉMENTALE - BOUTIQUE SURGELÉS 🧊")
+        print(f"URL de base: {self.base_url}")
+        print("=" * 60)
+
+        try:
+            self.test_changes_and_tombstones()
+            self.test_watermark_too_old()
+            self.test_grace_window()
+            self.test_paged_changes()
+        finally:
+            self.cleanup()
+
+        total_tests = len(self.test_results)
+        passed_tests = sum(1 for result in self.test_results if result['success'])
+
+        print("\n" + "=" * 60)
+        print(f"Total: {total_tests} tests, ✅ Réussis: {passed_tests}, ❌ Échoués: {total_tests - passed_tests}")
+        return passed_tests == total_tests
+
+if __name__ == "__main__":
+    test_suite = DeltaSyncTestSuite()
+    success = test_suite.run_all_tests()
+    sys.exit(0 if success else 1)
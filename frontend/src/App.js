@@ -1,10 +1,41 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
 import './App.css';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+// Apply a delta sync response to a list already on screen: changed items are
+// replaced in place, new ones added (newest first when prepend), deleted ones dropped
+const mergeChanges = (list, { items, deleted }, prepend) => {
+  const removed = new Set(deleted);
+  const changed = new Map(items.map(item => [item.id, item]));
+  const known = new Set(list.map(item => item.id));
+  const merged = list
+    .filter(item => !removed.has(item.id))
+    .map(item => changed.get(item.id) || item);
+  const added = items.filter(item => !known.has(item.id));
+  return prepend ? [...added.reverse(), ...merged] : [...merged, ...added];
+};
+
+// crypto.randomUUID only exists in secure contexts (HTTPS or localhost):
+// a till served over plain HTTP on the shop network builds the UUID itself
+const newIdempotencyKey = () => {
+  if (window.crypto && window.crypto.randomUUID) {
+    return window.crypto.randomUUID();
+  }
+  const bytes = new Uint8Array(16);
+  if (window.crypto && window.crypto.getRandomValues) {
+    window.crypto.getRandomValues(bytes);
+  } else {
+    for (let i = 0; i < bytes.length; i++) bytes[i] = Math.floor(Math.random() * 256);
+  }
+  bytes[6] = (bytes[6] & 0x0f) | 0x40;  // version 4
+  bytes[8] = (bytes[8] & 0x3f) | 0x80;  // RFC 4122 variant
+  const hex = Array.from(bytes, byte => byte.toString(16).padStart(2, '0')).join('');
+  return `${hex.slice(0, 8)}-${hex.slice(8, 12)}-${hex.slice(12, 16)}-${hex.slice(16, 20)}-${hex.slice(20)}`;
+};
+
 function App() {
   const [currentView, setCurrentView] = useState('dashboard');
   const [products, setProducts] = useState([]);
@@ -12,6 +43,14 @@ function App() {
   const [sales, setSales] = useState([]);
   const [dashboardStats, setDashboardStats] = useState({});
   const [loading, setLoading] = useState(false);
+  // Watermark of the last sync, per collection (see syncCollection)
+  const watermarks = useRef({});
+  // Idempotency-Key of the sale being entered: kept across retries of the
+  // same sale so a request that timed out is never recorded twice
+  const saleKey = useRef(null);
+  if (saleKey.current === null) {
+    saleKey.current = newIdempotencyKey();
+  }
 
   // Product form state
   const [productForm, setProductForm] = useState({
@@ -45,19 +84,65 @@ function App() {
     loadDashboardData();
   }, []);
 
+  // Low-stock crossings are pushed by the server: refresh the dashboard
+  // figures when one arrives instead of polling
+  useEffect(() => {
+    const events = new EventSource(`${API}/inventory/events`);
+    const refresh = async () => {
+      try {
+        const response = await axios.get(`${API}/dashboard/stats`);
+        setDashboardStats(response.data);
+      } catch (error) {
+        console.error('Erreur lors du rafraîchissement du tableau de bord:', error);
+      }
+    };
+    events.addEventListener('low_stock', refresh);
+    events.addEventListener('restocked', refresh);
+    return () => events.close();
+  }, []);
+
+  // First call loads the whole list; later calls only fetch what changed
+  // since the previous one
+  const syncCollection = async (name, setList, prepend = false) => {
+    const since = watermarks.current[name];
+    if (!since) {
+      const response = await axios.get(`${API}/${name}`);
+      watermarks.current[name] = response.headers['x-watermark'];
+      setList(response.data);
+      return;
+    }
+    try {
+      // Large deltas come in pages: the watermark only moves once the last
+      // one is in, so a sync cut short starts over from the same point
+      let after;
+      let response;
+      do {
+        response = await axios.get(`${API}/${name}`, { params: { updated_since: since, after } });
+        const page = response.data;
+        setList(current => mergeChanges(current, page, prepend));
+        after = page.next_cursor;
+      } while (after);
+      watermarks.current[name] = response.data.watermark;
+    } catch (error) {
+      if (error.response && error.response.status === 410) {
+        // Too long since the last sync: start over with the full list
+        delete watermarks.current[name];
+        return syncCollection(name, setList, prepend);
+      }
+      throw error;
+    }
+  };
+
   const loadDashboardData = async () => {
     setLoading(true);
     try {
-      const [productsRes, clientsRes, salesRes, statsRes] = await Promise.all([
-        axios.get(`${API}/products`),
-        axios.get(`${API}/clients`),
-        axios.get(`${API}/sales`),
-        axios.get(`${API}/dashboard/stats`)
+      const [statsRes] = await Promise.all([
+        axios.get(`${API}/dashboard/stats`),
+        syncCollection('products', setProducts),
+        syncCollection('clients', setClients),
+        syncCollection('sales', setSales, true)
       ]);
       
-      setProducts(productsRes.data);
-      setClients(clientsRes.data);
-      setSales(salesRes.data);
       setDashboardStats(statsRes.data);
     } catch (error) {
       console.error('Erreur lors du chargement des données:', error);
@@ -117,6 +202,20 @@ function App() {
     }
   };
 
+  const handleClientPayment = async (client) => {
+    const amount = parseFloat(window.prompt(`Montant remboursé par ${client.name} (dette: ${client.current_debt.toFixed(2)}€)`));
+    if (!amount || amount <= 0) {
+      return;
+    }
+    try {
+      await axios.post(`${API}/clients/${client.id}/payments`, { amount });
+      loadDashboardData();
+    } catch (error) {
+      console.error('Erreur lors de l\'enregistrement du paiement:', error);
+      alert('Erreur: ' + (error.response?.data?.detail || 'Erreur inconnue'));
+    }
+  };
+
   const handleEditProduct = (product) => {
     setEditingProduct(product);
     setProductForm({
@@ -208,22 +307,9 @@ function App() {
   const handleSaleSubmit = async (e) => {
     e.preventDefault();
     try {
-      let clientId = saleForm.client_id;
-      let clientName = saleForm.client_name;
-
-      // Si un nouveau client est saisi, le créer automatiquement
-      if (!clientId && clientName && clientName !== 'Client Anonyme') {
-        const newClient = {
-          name: clientName,
-          phone: '',
-          email: '',
-          address: '',
-          credit_limit: 0
-        };
-        const clientResponse = await axios.post(`${API}/clients`, newClient);
-        clientId = clientResponse.data.id;
-        clientName = clientResponse.data.name;
-      }
+      // Un nouveau nom de client est créé (ou retrouvé) par le serveur avec la vente
+      const clientId = saleForm.client_id;
+      const clientName = saleForm.client_name;
 
       const saleData = {
         client_id: clientId || null,
@@ -236,7 +322,10 @@ function App() {
         payment_method: saleForm.payment_method
       };
       
-      await axios.post(`${API}/sales`, saleData);
+      await axios.post(`${API}/sales`, saleData, {
+        headers: { 'Idempotency-Key': saleKey.current }
+      });
+      saleKey.current = newIdempotencyKey();
       setSaleForm({
         client_id: '',
         client_name: '',
@@ -353,7 +442,7 @@ function App() {
                 <ul>
                   {dashboardStats.low_stock_products.map(product => (
                     <li key={product.id}>
-                      <strong>{product.name}</strong> - Stock: {product.stock} {product.unit}
+                      <strong>{product.name}</strong> - Stock: {product.stock} {product.unit} (seuil: {product.reorder_threshold} {product.unit})
                     </li>
                   ))}
                 </ul>
@@ -783,6 +872,15 @@ function App() {
                             >
                               ✏️
                             </button>
+                            {client.current_debt > 0 && (
+                              <button
+                                onClick={() => handleClientPayment(client)}
+                                className="btn btn-secondary btn-sm"
+                                title="Enregistrer un paiement"
+                              >
+                                💶
+                              </button>
+                            )}
                             <button
                               onClick={() => handleDeleteClient(client.id)}
                               className="btn btn-danger btn-sm"
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Test de l'import d'un catalogue fournisseur (POST /products/import)
+Les lignes invalides sont listées dans le rapport sans bloquer les autres;
+les produits existants sont mis à jour par référence (sku) ou, à défaut, par nom
+"""
+
+import json
+import requests
+import sys
+from datetime import datetime
+
+# Configuration
+BASE_URL = "https://frostbite-sales.preview.emergentagent.com/api"
+HEADERS = {"Content-Type": "application/json"}
+# Names and SKUs are keys of the import: suffix them so the suite can be re-run on the same database
+RUN_ID = datetime.now().strftime("%Y%m%d%H%M%S")
+
+class ImportTestSuite:
+    def __init__(self):
+        self.base_url = BASE_URL
+        self.headers = HEADERS
+        self.test_results = []
+        self.created_products = []
+
+    def log_test(self, test_name, success, message, details=None):
+        """Log test results"""
+        result = {
+            "test": test_name,
+            "success": success,
+            "message": message,
+            "details": details,
+            "timestamp": datetime.now().isoformat()
+        }
+        self.test_results.append(result)
+        status = "✅ PASS" if success else "❌ FAIL"
+        print(f"{status} - {test_name}: {message}")
+        if details and not success:
+            print(f"   Details: {details}")
+
+    def import_csv(self, text):
+        return requests.post(f"{self.base_url}/products/import", data=text.encode("utf-8"),
+                             headers={"Content-Type": "text/csv"}, timeout=60)
+
+    def import_json(self, rows):
+        return requests.post(f"{self.base_url}/products/import", data=json.dumps(rows).encode("utf-8"),
+                             headers=self.headers, timeout=60)
+
+    def find_product(self, name):
+        """Produit importé, retrouvé par son nom en parcourant la liste page par page"""
+        after = None
+        while True:
+            response = requests.get(f"{self.base_url}/products", params={"limit": 500, "after": after},
+                                    headers=self.headers, timeout=30)
+            for product in response.json():
+                if product["name"] == name:
+                    if product["id"] not in {p["id"] for p in self.created_products}:
+                        self.created_products.append(product)
+                    return product
+            after = response.headers.get("X-Next-Cursor")
+            if not after:
+                return None
+
+    def test_row_errors(self):
+        """Test 1: les lignes invalides sont rapportées avec leur numéro, les autres importées"""
+        print("\n=== TEST RAPPORT D'ERREURS ===")
+        response = self.import_csv(
+            "name;category;price;stock;sku\n"
+            f"Colin Import {RUN_ID};poisson;12,50;40;COL-{RUN_ID}\n"
+            f"Saumon Import {RUN_ID};poisson;douze;10;\n"
+            f"Lotte Import {RUN_ID};;25;5;\n"
+            f"Merlu Import {RUN_ID};poisson;9,90;30;\n"
+        )
+        if response.status_code != 200:
+            self.log_test("Import CSV", False, f"Status: {response.status_code}", response.text)
+            return
+        report = response.json()
+
+        if report["received"] == 4 and report["inserted"] == 2 and [e["row"] for e in report["errors"]] == [2, 3]:
+            self.log_test("Rapport d'erreurs", True, "4 lignes reçues, 2 importées, lignes 2 et 3 rejetées")
+        else:
+            self.log_test("Rapport d'erreurs", False, f"Rapport: {report}")
+
+        colin = self.find_product(f"Colin Import {RUN_ID}")
+        rejected = self.find_product(f"Saumon Import {RUN_ID}")
+        if colin and colin["price"] == 12.5 and colin["sku"] == f"COL-{RUN_ID}" and rejected is None:
+            self.log_test("Lignes valides importées", True, "Virgule décimale lue, ligne invalide non créée")
+        else:
+            self.log_test("Lignes valides importées", False, f"Colin: {colin}, Saumon: {rejected}")
+
+    def test_upsert_by_sku_and_name(self):
+        """Test 2: mise à jour par référence (renommage compris) puis par nom, sans doublon"""
+        print("\n=== TEST MISE À JOUR PAR RÉFÉRENCE ET PAR NOM ===")
+        colin = self.find_product(f"Colin Import {RUN_ID}")
+        merlu = self.find_product(f"Merlu Import {RUN_ID}")
+        if not colin or not merlu:
+            self.log_test("Produits du test 1", False, "Produits importés introuvables")
+            return
+
+        response = self.import_json([
+            {"name": f"Colin Lieu Import {RUN_ID}", "category": "poisson", "price": 13.0, "stock": 40, "sku": f"COL-{RUN_ID}"},
+            {"name": f"Merlu Import {RUN_ID}", "category": "poisson", "price": 9.9, "stock": 7},
+            {"name": f"Merlu Import {RUN_ID}", "category": "poisson", "price": 9.9, "stock": 8},
+        ])
+        report = response.json()
+        if response.status_code == 200 and report["inserted"] == 0 and report["updated"] == 2 and report["duplicates"] == 1:
+            self.log_test("Rapport de mise à jour", True, "2 produits mis à jour, 1 doublon, aucune création")
+        else:
+            self.log_test("Rapport de mise à jour", False, f"Status: {response.status_code}, rapport: {report}")
+
+        renamed = requests.get(f"{self.base_url}/products/{colin['id']}", headers=self.headers, timeout=10).json()
+        if renamed.get("name") == f"Colin Lieu Import {RUN_ID}" and renamed.get("price") == 13.0:
+            self.log_test("Mise à jour par référence", True, "Même produit renommé et réévalué via son sku")
+        else:
+            self.log_test("Mise à jour par référence", False, f"Produit: {renamed}")
+
+        restocked = requests.get(f"{self.base_url}/products/{merlu['id']}", headers=self.headers, timeout=10).json()
+        if restocked.get("stock") == 8:
+            self.log_test("Mise à jour par nom", True, "Stock de la dernière ligne retenu (8)")
+        else:
+            self.log_test("Mise à jour par nom", False, f"Produit: {restocked}")
+
+    def test_unreadable_file(self):
+        """Test 3: un fichier illisible est refusé en entier"""
+        print("\n=== TEST FICHIER ILLISIBLE ===")
+        response = requests.post(f"{self.base_url}/products/import", data=b'{"name": "pas un tableau"}',
+                                 headers=self.headers, timeout=10)
+        if response.status_code == 400:
+            self.log_test("Fichier illisible", True, "400: un tableau JSON est attendu")
+        else:
+            self.log_test("Fichier illisible", False, f"Status: {response.status_code}", response.text)
+
+    def cleanup(self):
+        for product in self.created_products:
+            requests.delete(f"{self.base_url}/products/{product['id']}", headers=self.headers, timeout=10)
+
+    def run_all_tests(self):
+        """Exécuter tous les tests"""
+        print("🧊 TESTS IMPORT CATALOGUE FOURNISSEUR - BOUTIQUE SURGELÉS 🧊")
+        print(f"URL de base: {self.base_url}")
+        print("=" * 60)
+
+        try:
+            self.test_row_errors()
+            self.test_upsert_by_sku_and_name()
+            self.test_unreadable_file()
+        finally:
+            self.cleanup()
+
+        total_tests = len(self.test_results)
+        passed_tests = sum(1 for result in self.test_results if result['success'])
+
+        print("\n" + "=" * 60)
+        print(f"Total: {total_tests} tests, ✅ Réussis: {passed_tests}, ❌ Échoués: {total_tests - passed_tests}")
+        return passed_tests == total_tests
+
+if __name__ == "__main__":
+    test_suite = ImportTestSuite()
+    success = test_suite.run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Test des numéros de facture lors de ventes simultanées
+Plusieurs caisses encaissent en même temps: chaque vente doit recevoir un numéro qui n'appartient qu'à elle
+"""
+
+import re
+import requests
+import sys
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Configuration
+BASE_URL = "https://frostbite-sales.preview.emergentagent.com/api"
+HEADERS = {"Content-Type": "application/json"}
+# PREFIX[-STORE][-YYYYMMDD]-NNNNNN (see invoices.InvoiceNumberAllocator)
+INVOICE_PATTERN = re.compile(r"^[A-Z0-9]+(-[A-Z0-9]+)*-\d{6}$")
+
+class InvoiceNumberTestSuite:
+    def __init__(self):
+        self.base_url = BASE_URL
+        self.headers = HEADERS
+        self.test_results = []
+        self.created_products = []
+
+    def log_test(self, test_name, success, message, details=None):
+        """Log test results"""
+        result = {
+            "test": test_name,
+            "success": success,
+            "message": message,
+            "details": details,
+            "timestamp": datetime.now().isoformat()
+        }
+        self.test_results.append(result)
+        status = "✅ PASS" if success else "❌ FAIL"
+        print(f"{status} - {test_name}: {message}")
+        if details and not success:
+            print(f"   Details: {details}")
+
+    def create_product(self, name, stock):
+        response = requests.post(f"{self.base_url}/products", json={
+            "name": name,
+            "category": "poisson",
+            "price": 10.0,
+            "stock": stock,
+            "unit": "kg"
+        }, headers=self.headers, timeout=10)
+        response.raise_for_status()
+        product = response.json()
+        self.created_products.append(product)
+        return product
+
+    def sell(self, product_id, key=None):
+        headers = {**self.headers, "Idempotency-Key": key} if key else self.headers
+        return requests.post(f"{self.base_url}/sales", json={
+            "client_name": "Client Anonyme",
+            "items": [{"product_id": product_id, "quantity": 1}],
+            "discount": 0.0,
+            "payment_method": "espèces"
+        }, headers=headers, timeout=30)
+
+    def test_unique_numbers(self):
+        """Test 1: 120 ventes simultanées, plus que plusieurs blocs de numéros réservés"""
+        print("\n=== TEST NUMÉROS UNIQUES ===")
+        product = self.create_product("Plie Facture", 200)
+
+        with ThreadPoolExecutor(max_workers=30) as pool:
+            responses = list(pool.map(lambda _: self.sell(product["id"]), range(120)))
+
+        sales = [r.json() for r in responses if r.status_code == 200]
+        numbers = [sale["invoice_number"] for sale in sales]
+        if len(sales) == 120 and len(set(numbers)) == 120:
+            self.log_test("Numéros uniques", True, "120 ventes, 120 numéros distincts")
+        else:
+            self.log_test("Numéros uniques", False,
+                        f"Ventes acceptées: {len(sales)}, numéros distincts: {len(set(numbers))}")
+
+        malformed = [number for number in numbers if not INVOICE_PATTERN.match(number)]
+        if not malformed:
+            self.log_test("Format des numéros", True, f"Par exemple {min(numbers, default='-')}")
+        else:
+            self.log_test("Format des numéros", False, f"Numéros mal formés: {malformed[:5]}")
+
+        # The number printed on the receipt is the one stored with the sale
+        stored = requests.get(f"{self.base_url}/sales/{sales[0]['id']}", headers=self.headers, timeout=10).json() if sales else {}
+        if sales and stored.get("invoice_number") == sales[0]["invoice_number"]:
+            self.log_test("Numéro enregistré", True, "La vente relue porte le même numéro")
+        else:
+            self.log_test("Numéro enregistré", False, f"Vente relue: {stored}")
+
+    def test_retry_keeps_number(self):
+        """Test 2: une vente renvoyée avec la même Idempotency-Key garde son numéro"""
+        print("\n=== TEST RENVOI D'UNE VENTE ===")
+        product = self.create_product("Limande Facture", 10)
+        key = str(uuid.uuid4())
+
+        first = self.sell(product["id"], key)
+        retry = self.sell(product["id"], key)
+        if first.status_code == 200 and retry.status_code == 200 and \
+                first.json()["invoice_number"] == retry.json()["invoice_number"]:
+            self.log_test("Renvoi sans nouveau numéro", True, f"Numéro {first.json()['invoice_number']} renvoyé tel quel")
+        else:
+            self.log_test("Renvoi sans nouveau numéro", False,
+                        f"Statuts: {first.status_code}/{retry.status_code}", retry.text)
+
+    def cleanup(self):
+        for product in self.created_products:
+            requests.delete(f"{self.base_url}/products/{product['id']}", headers=self.headers, timeout=10)
+
+    def run_all_tests(self):
+        """Exécuter tous les tests"""
+        print("🧊 TESTS NUMÉROS DE FACTURE - BOUTIQUE SURGELÉS 🧊")
+        print(f"URL de base: {self.base_url}")
+        print("=" * 60)
+
+        try:
+            self.test_unique_numbers()
+            self.test_retry_keeps_number()
+        finally:
+            self.cleanup()
+
+        total_tests = len(self.test_results)
+        passed_tests = sum(1 for result in self.test_results if result['success'])
+
+        print("\n" + "=" * 60)
+        print(f"Total: {total_tests} tests, ✅ Réussis: {passed_tests}, ❌ Échoués: {total_tests - passed_tests}")
+        return passed_tests == total_tests
+
+if __name__ == "__main__":
+    test_suite = InvoiceNumberTestSuite()
+    success = test_suite.run_all_tests()
+    sys.exit(0 if success else 1)
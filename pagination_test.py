@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Test de la pagination par curseur sur les listes produits, clients et ventes
+Vérifie limit, after (en-tête X-Next-Cursor), tri et rejet des curseurs invalides
+"""
+
+import requests
+import sys
+from datetime import datetime
+
+# Configuration
+BASE_URL = "https://frostbite-sales.preview.emergentagent.com/api"
+HEADERS = {"Content-Type": "application/json"}
+
+class PaginationTestSuite:
+    def __init__(self):
+        self.base_url = BASE_URL
+        self.headers = HEADERS
+        self.test_results = []
+        self.created_products = []
+
+    def log_test(self, test_name, success, message, details=None):
+        """Log test results"""
+        result = {
+            "test": test_name,
+            "success": success,
+            "message": message,
+            "details": details,
+            "timestamp": datetime.now().isoformat()
+        }
+        self.test_results.append(result)
+        status = "✅ PASS" if success else "❌ FAIL"
+        print(f"{status} - {test_name}: {message}")
+        if details and not success:
+            print(f"   Details: {details}")
+
+    def fetch_all(self, path, page_size, sort=None):
+        """Parcourir toutes les pages d'une liste en suivant X-Next-Cursor"""
+        items, pages, cursor = [], 0, None
+        while True:
+            params = {"limit": page_size}
+            if sort:
+                params["sort"] = sort
+            if cursor:
+                params["after"] = cursor
+            response = requests.get(f"{self.base_url}/{path}", params=params, headers=self.headers, timeout=10)
+            response.raise_for_status()
+            page = response.json()
+            if len(page) > page_size:
+                raise AssertionError(f"Page de {len(page)} éléments pour limit={page_size}")
+            items.extend(page)
+            pages += 1
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                return items, pages
+
+    def setup_test_data(self):
+        for i in range(7):
+            response = requests.post(f"{self.base_url}/products", json={
+                "name": f"Pagination Sole {i}",
+                "category": "poisson",
+                "price": 15.0,
+                "stock": 10,
+                "unit": "kg"
+            }, headers=self.headers, timeout=10)
+            if response.status_code == 200:
+                self.created_products.append(response.json())
+
+    def test_products_pages(self):
+        """Test 1: parcourir les produits page par page"""
+        print("\n=== TEST PAGINATION PRODUITS ===")
+        try:
+            full = requests.get(f"{self.base_url}/products", headers=self.headers, timeout=10).json()
+            paged, pages = self.fetch_all("products", 3)
+            if [p["id"] for p in paged] == [p["id"] for p in full] and pages >= 3:
+                self.log_test("Pagination produits", True, f"{len(paged)} produits sur {pages} pages, même ordre que la liste complète")
+            else:
+                self.log_test("Pagination produits", False, f"{len(paged)} produits paginés contre {len(full)} au total")
+        except Exception as e:
+            self.log_test("Pagination produits", False, str(e))
+
+    def test_pages_after_catalog_load(self):
+        """Test 1b: produits créés après le chargement du catalogue, sans doublon d'une page à l'autre"""
+        print("\n=== TEST PAGINATION APRÈS CHARGEMENT DU CATALOGUE ===")
+        try:
+            requests.get(f"{self.base_url}/products", headers=self.headers, timeout=10)
+            for i in range(5):
+                response = requests.post(f"{self.base_url}/products", json={
+                    "name": f"Pagination Bar {i}",
+                    "category": "poisson",
+                    "price": 12.0,
+                    "stock": 10,
+                    "unit": "kg"
+                }, headers=self.headers, timeout=10)
+                if response.status_code == 200:
+                    self.created_products.append(response.json())
+            full = requests.get(f"{self.base_url}/products", headers=self.headers, timeout=10).json()
+            paged, pages = self.fetch_all("products", 2)
+            ids = [p["id"] for p in paged]
+            if ids == [p["id"] for p in full] and len(ids) == len(set(ids)):
+                self.log_test("Pagination après chargement", True, f"{len(ids)} produits sur {pages} pages, aucun doublon")
+            else:
+                self.log_test("Pagination après chargement", False,
+                            f"{len(ids)} produits paginés contre {len(full)} au total", [p["name"] for p in paged])
+        except Exception as e:
+            self.log_test("Pagination après chargement", False, str(e))
+
+    def test_sorted_pages(self):
+        """Test 2: tri par nom décroissant sans doublon ni trou"""
+        print("\n=== TEST TRI PAGINÉ ===")
+        try:
+            paged, _ = self.fetch_all("products", 2, sort="-name")
+            names = [p["name"] for p in paged]
+            ids = [p["id"] for p in paged]
+            if names == sorted(names, reverse=True) and len(ids) == len(set(ids)):
+                self.log_test("Tri par nom décroissant", True, f"{len(names)} produits triés, aucun doublon")
+            else:
+                self.log_test("Tri par nom décroissant", False, "Ordre incorrect ou doublons", names)
+        except Exception as e:
+            self.log_test("Tri par nom décroissant", False, str(e))
+
+    def test_sales_and_clients_pages(self):
+        """Test 3: les ventes et les clients acceptent aussi limit/after"""
+        print("\n=== TEST PAGINATION VENTES ET CLIENTS ===")
+        for path in ("sales", "clients"):
+            try:
+                paged, pages = self.fetch_all(path, 5)
+                ids = [item["id"] for item in paged]
+                if len(ids) == len(set(ids)):
+                    self.log_test(f"Pagination {path}", True, f"{len(ids)} éléments sur {pages} pages")
+                else:
+                    self.log_test(f"Pagination {path}", False, "Doublons entre les pages")
+            except Exception as e:
+                self.log_test(f"Pagination {path}", False, str(e))
+
+    def test_invalid_parameters(self):
+        """Test 4: curseur ou tri invalides refusés avec 400"""
+        print("\n=== TEST PARAMÈTRES INVALIDES ===")
+        for name, params in (("Curseur invalide", {"after": "pas-un-curseur"}), ("Tri non indexé", {"sort": "stock"})):
+            response = requests.get(f"{self.base_url}/products", params=params, headers=self.headers, timeout=10)
+            if response.status_code == 400:
+                self.log_test(name, True, "Correctement refusé (400)")
+            else:
+                self.log_test(name, False, f"Devrait retourner 400 mais status: {response.status_code}")
+
+    def cleanup(self):
+        for product in self.created_products:
+            requests.delete(f"{self.base_url}/products/{product['id']}", headers=self.headers, timeout=10)
+
+    def run_all_tests(self):
+        """Exécuter tous les tests"""
+        print("🧊 TESTS PAGINATION - BOUTIQUE SURGELÉS 🧊")
+        print(f"URL de base: {self.base_url}")
+        print("=" * 60)
+
+        self.setup_test_data()
+        try:
+            self.test_products_pages()
+            self.test_pages_after_catalog_load()
+            self.test_sorted_pages()
+            self.test_sales_and_clients_pages()
+            self.test_invalid_parameters()
+        finally:
+            self.cleanup()
+
+        total_tests = len(self.test_results)
+        passed_tests = sum(1 for result in self.test_results if result['success'])
+
+        print("\n" + "=" * 60)
+        print(f"Total: {total_tests} tests, ✅ Réussis: {passed_tests}, ❌ Échoués: {total_tests - passed_tests}")
+        return passed_tests == total_tests
+
+if __name__ == "__main__":
+    test_suite = PaginationTestSuite()
+    success = test_suite.run_all_tests()
+    sys.exit(0 if success else 1)
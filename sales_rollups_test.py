@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Test des agrégats journaliers des ventes (sales_daily)
+Les agrégats tenus vente par vente doivent être ceux qu'un recalcul complet retrouve à partir des ventes
+"""
+
+import requests
+import sys
+from datetime import datetime, timedelta, timezone
+
+# Configuration
+BASE_URL = "https://frostbite-sales.preview.emergentagent.com/api"
+HEADERS = {"Content-Type": "application/json"}
+LEVELS = ("day", "category", "product")
+
+class SalesRollupsTestSuite:
+    def __init__(self):
+        self.base_url = BASE_URL
+        self.headers = HEADERS
+        self.test_results = []
+        self.created_products = []
+        today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        self.day = {"start": today.isoformat(), "end": (today + timedelta(days=1)).isoformat()}
+
+    def log_test(self, test_name, success, message, details=None):
+        """Log test results"""
+        result = {
+            "test": test_name,
+            "success": success,
+            "message": message,
+            "details": details,
+            "timestamp": datetime.now().isoformat()
+        }
+        self.test_results.append(result)
+        status = "✅ PASS" if success else "❌ FAIL"
+        print(f"{status} - {test_name}: {message}")
+        if details and not success:
+            print(f"   Details: {details}")
+
+    def create_product(self, name, category, price):
+        response = requests.post(f"{self.base_url}/products", json={
+            "name": name,
+            "category": category,
+            "price": price,
+            "stock": 100,
+            "unit": "kg"
+        }, headers=self.headers, timeout=10)
+        response.raise_for_status()
+        product = response.json()
+        self.created_products.append(product)
+        return product
+
+    def sell(self, items, discount=0.0):
+        response = requests.post(f"{self.base_url}/sales", json={
+            "client_name": "Client Anonyme",
+            "items": items,
+            "discount": discount,
+            "payment_method": "espèces"
+        }, headers=self.headers, timeout=30)
+        response.raise_for_status()
+        return response.json()
+
+    def report(self, by):
+        """Rapport du jour, indexé par ligne et arrondi au centime"""
+        response = requests.get(f"{self.base_url}/reports/sales", params={"period": "day", "by": by, **self.day},
+                                headers=self.headers, timeout=30)
+        response.raise_for_status()
+        rows = {}
+        for row in response.json():
+            key = row.get("product_id") or row.get("category") or row["period"]
+            rows[key] = {field: round(row[field], 2) for field in ("quantity", "revenue", "discount", "sales_count")}
+        return rows
+
+    def test_incremental_matches_rebuild(self):
+        """Test 1: rapports du jour identiques avant et après recalcul des agrégats"""
+        print("\n=== TEST AGRÉGATS INCRÉMENTAUX CONTRE RECALCUL ===")
+        bar = self.create_product("Bar Agrégats", "poisson", 18.0)
+        sole = self.create_product("Sole Agrégats", "poisson", 24.5)
+        steak = self.create_product("Steak Agrégats", "viande", 15.0)
+        self.sell([{"product_id": bar["id"], "quantity": 1.5}, {"product_id": steak["id"], "quantity": 2}], discount=5.0)
+        self.sell([{"product_id": sole["id"], "quantity": 0.75}])
+        self.sell([{"product_id": bar["id"], "quantity": 2}, {"product_id": sole["id"], "quantity": 1},
+                   {"product_id": steak["id"], "quantity": 0.5}], discount=3.3)
+
+        incremental = {by: self.report(by) for by in LEVELS}
+        response = requests.post(f"{self.base_url}/admin/rollups/rebuild", params=self.day, headers=self.headers, timeout=120)
+        if response.status_code != 200:
+            self.log_test("Recalcul des agrégats", False, f"Status: {response.status_code}", response.text)
+            return
+        rebuilt = {by: self.report(by) for by in LEVELS}
+
+        for by in LEVELS:
+            if incremental[by] == rebuilt[by]:
+                self.log_test(f"Rapport par {by}", True, f"{len(rebuilt[by])} lignes identiques après recalcul")
+            else:
+                differences = {key: (incremental[by].get(key), rebuilt[by].get(key))
+                               for key in set(incremental[by]) | set(rebuilt[by])
+                               if incremental[by].get(key) != rebuilt[by].get(key)}
+                self.log_test(f"Rapport par {by}", False, f"{len(differences)} lignes différentes", differences)
+
+        # Discounts are spread over the lines of the sale pro rata: 5€ over 27 + 30€, 3.3€ over 36 + 24.5 + 7.5€
+        expected = {
+            bar["id"]: {"quantity": 3.5, "revenue": 63.0, "discount": round(5 * 27 / 57 + 3.3 * 36 / 68, 2), "sales_count": 2},
+            steak["id"]: {"quantity": 2.5, "revenue": 37.5, "discount": round(5 * 30 / 57 + 3.3 * 7.5 / 68, 2), "sales_count": 2},
+        }
+        actual = {product_id: rebuilt["product"].get(product_id) for product_id in expected}
+        if actual == expected:
+            self.log_test("Montants par produit", True, "Quantités, chiffre d'affaires et remises réparties attendus")
+        else:
+            self.log_test("Montants par produit", False, f"Attendu: {expected}, obtenu: {actual}")
+
+    def cleanup(self):
+        for product in self.created_products:
+            requests.delete(f"{self.base_url}/products/{product['id']}", headers=self.headers, timeout=10)
+
+    def run_all_tests(self):
+        """Exécuter tous les tests"""
+        print("🧊 TESTS AGRÉGATS DES VENTES - BOUTIQUE SURGELÉS 🧊")
+        print(f"URL de base: {self.base_url}")
+        print("=" * 60)
+
+        try:
+            self.test_incremental_matches_rebuild()
+        finally:
+            self.cleanup()
+
+        total_tests = len(self.test_results)
+        passed_tests = sum(1 for result in self.test_results if result['success'])
+
+        print("\n" + "=" * 60)
+        print(f"Total: {total_tests} tests, ✅ Réussis: {passed_tests}, ❌ Échoués: {total_tests - passed_tests}")
+        return passed_tests == total_tests
+
+if __name__ == "__main__":
+    test_suite = SalesRollupsTestSuite()
+    success = test_suite.run_all_tests()
+    sys.exit(0 if success else 1)
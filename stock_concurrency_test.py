@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Test de la réservation atomique du stock lors de ventes simultanées
+Plusieurs caisses vendent le même produit en même temps: le stock ne doit jamais être survendu
+"""
+
+import requests
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Configuration
+BASE_URL = "https://frostbite-sales.preview.emergentagent.com/api"
+HEADERS = {"Content-Type": "application/json"}
+
+class StockConcurrencyTestSuite:
+    def __init__(self):
+        self.base_url = BASE_URL
+        self.headers = HEADERS
+        self.test_results = []
+        self.created_products = []
+
+    def log_test(self, test_name, success, message, details=None):
+        """Log test results"""
+        result = {
+            "test": test_name,
+            "success": success,
+            "message": message,
+            "details": details,
+            "timestamp": datetime.now().isoformat()
+        }
+        self.test_results.append(result)
+        status = "✅ PASS" if success else "❌ FAIL"
+        print(f"{status} - {test_name}: {message}")
+        if details and not success:
+            print(f"   Details: {details}")
+
+    def create_product(self, name, stock):
+        response = requests.post(f"{self.base_url}/products", json={
+            "name": name,
+            "category": "poisson",
+            "price": 10.0,
+            "stock": stock,
+            "unit": "kg"
+        }, headers=self.headers, timeout=10)
+        response.raise_for_status()
+        product = response.json()
+        self.created_products.append(product)
+        return product
+
+    def get_stock(self, product_id):
+        response = requests.get(f"{self.base_url}/products/{product_id}", headers=self.headers, timeout=10)
+        return response.json()["stock"]
+
+    def sell(self, items):
+        return requests.post(f"{self.base_url}/sales", json={
+            "client_name": "Client Anonyme",
+            "items": items,
+            "discount": 0.0,
+            "payment_method": "espèces"
+        }, headers=self.headers, timeout=30)
+
+    def test_no_oversell(self):
+        """Test 1: 30 ventes simultanées de 1 kg sur un stock de 10 kg"""
+        print("\n=== TEST VENTES SIMULTANÉES ===")
+        product = self.create_product("Cabillaud Concurrence", 10)
+
+        with ThreadPoolExecutor(max_workers=30) as pool:
+            responses = list(pool.map(lambda _: self.sell([{"product_id": product["id"], "quantity": 1}]), range(30)))
+
+        accepted = sum(1 for r in responses if r.status_code == 200)
+        refused = sum(1 for r in responses if r.status_code == 400)
+        final_stock = self.get_stock(product["id"])
+
+        if accepted == 10 and refused == 20 and final_stock == 0:
+            self.log_test("Pas de survente", True, "10 ventes acceptées, 20 refusées, stock final 0")
+        else:
+            self.log_test("Pas de survente", False,
+                        f"Acceptées: {accepted}, refusées: {refused}, stock final: {final_stock}")
+
+    def test_multi_line_rollback(self):
+        """Test 2: une ligne en rupture annule les lignes déjà réservées"""
+        print("\n=== TEST ANNULATION MULTI-LIGNES ===")
+        available = self.create_product("Merlu Disponible", 20)
+        scarce = self.create_product("Turbot Rare", 1)
+
+        # Both baskets want the single turbot; the loser must give back its merlu
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            responses = list(pool.map(lambda _: self.sell([
+                {"product_id": available["id"], "quantity": 3},
+                {"product_id": scarce["id"], "quantity": 1}
+            ]), range(2)))
+
+        accepted = sum(1 for r in responses if r.status_code == 200)
+        available_stock = self.get_stock(available["id"])
+        scarce_stock = self.get_stock(scarce["id"])
+
+        if accepted == 1 and available_stock == 17 and scarce_stock == 0:
+            self.log_test("Annulation des lignes réservées", True,
+                        "Une seule vente acceptée, stock du merlu restitué pour l'autre")
+        else:
+            self.log_test("Annulation des lignes réservées", False,
+                        f"Acceptées: {accepted}, merlu: {available_stock}, turbot: {scarce_stock}")
+
+    def cleanup(self):
+        for product in self.created_products:
+            requests.delete(f"{self.base_url}/products/{product['id']}", headers=self.headers, timeout=10)
+
+    def run_all_tests(self):
+        """Exécuter tous les tests"""
+        print("🧊 TESTS CONCURRENCE STOCK - BOUTIQUE SURGELÉS 🧊")
+        print(f"URL de base: {self.base_url}")
+        print("=" * 60)
+
+        try:
+            self.test_no_oversell()
+            self.test_multi_line_rollback()
+        finally:
+            self.cleanup()
+
+        total_tests = len(self.test_results)
+        passed_tests = sum(1 for result in self.test_results if result['success'])
+
+        print("\n" + "=" * 60)
+        print(f"Total: {total_tests} tests, ✅ Réussis: {passed_tests}, ❌ Échoués: {total_tests - passed_tests}")
+        return passed_tests == total_tests
+
+if __name__ == "__main__":
+    test_suite = StockConcurrencyTestSuite()
+    success = test_suite.run_all_tests()
+    sys.exit(0 if success else 1)
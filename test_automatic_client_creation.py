@@ -7,11 +7,14 @@ Couvre tous les scénarios demandés dans la review request
 import requests
 import json
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 # Configuration
 BASE_URL = "https://frostbite-sales.preview.emergentagent.com/api"
 HEADERS = {"Content-Type": "application/json"}
+# Client names are unique: suffix them so the suite can be re-run on the same database
+RUN_ID = datetime.now().strftime("%Y%m%d%H%M%S")
 
 class AutoClientCreationTestSuite:
     def __init__(self):
@@ -83,7 +86,7 @@ class AutoClientCreationTestSuite:
         # Créer vente avec nouveau client
         sale_data = {
             "client_id": "",  # Vide
-            "client_name": "Restaurant La Marine",  # Nouveau nom
+            "client_name": f"Restaurant La Marine {RUN_ID}",  # Nouveau nom
             "items": [
                 {
                     "product_id": self.created_products[0]['id'],
@@ -110,7 +113,7 @@ class AutoClientCreationTestSuite:
                     # Chercher le nouveau client
                     new_client = None
                     for client in current_clients:
-                        if client['name'] == "Restaurant La Marine":
+                        if client['name'] == f"Restaurant La Marine {RUN_ID}":
                             new_client = client
                             break
                     
@@ -147,7 +150,7 @@ class AutoClientCreationTestSuite:
         
         # Créer un client explicitement
         client_data = {
-            "name": "Boulangerie Dupont",
+            "name": f"Boulangerie Dupont {RUN_ID}",
             "phone": "01.23.45.67.89",
             "email": "contact@boulangerie-dupont.fr",
             "address": "12 rue du Pain, 75003 Paris",
@@ -161,7 +164,7 @@ class AutoClientCreationTestSuite:
                 existing_client = response.json()
                 self.created_clients.append(existing_client)
                 self.log_test("Création client existant", True, 
-                            f"Client Boulangerie Dupont créé: {existing_client['id']}")
+                            f"Client {existing_client['name']} créé: {existing_client['id']}")
                 
                 # Compter les clients avant la vente
                 clients_response = requests.get(f"{self.base_url}/clients", headers=self.headers, timeout=10)
@@ -170,7 +173,7 @@ class AutoClientCreationTestSuite:
                 # Créer vente avec le même nom de client
                 sale_data = {
                     "client_id": "",  # Vide
-                    "client_name": "Boulangerie Dupont",  # Même nom
+                    "client_name": f"Boulangerie Dupont {RUN_ID}",  # Même nom
                     "items": [
                         {
                             "product_id": self.created_products[0]['id'],
@@ -194,7 +197,7 @@ class AutoClientCreationTestSuite:
                         final_count = len(final_clients)
                         
                         # Compter les clients "Boulangerie Dupont"
-                        dupont_clients = [c for c in final_clients if c['name'] == "Boulangerie Dupont"]
+                        dupont_clients = [c for c in final_clients if c['name'] == f"Boulangerie Dupont {RUN_ID}"]
                         
                         if final_count == initial_count and len(dupont_clients) == 1:
                             self.log_test("Pas de doublon client", True, 
@@ -303,7 +306,8 @@ class AutoClientCreationTestSuite:
                 "client_name": "Nom Différent",  # Nom différent mais ID fourni
                 "items": [{"product_id": self.created_products[0]['id'], "quantity": 1.0}],
                 "discount": 0.0,
-                "payment_method": "crédit"
+                # Client créé automatiquement: limite de crédit à 0, vente au comptant
+                "payment_method": "espèces"
             }
             
             try:
@@ -349,7 +353,7 @@ class AutoClientCreationTestSuite:
         # Créer vente complète avec nouveau client automatique
         complete_sale = {
             "client_id": "",
-            "client_name": "Supermarché Frais Plus",
+            "client_name": f"Supermarché Frais Plus {RUN_ID}",
             "items": [
                 {
                     "product_id": self.created_products[0]['id'],
@@ -373,7 +377,7 @@ class AutoClientCreationTestSuite:
                     clients = clients_response.json()
                     new_client = None
                     for client in clients:
-                        if client['name'] == "Supermarché Frais Plus":
+                        if client['name'] == f"Supermarché Frais Plus {RUN_ID}":
                             new_client = client
                             break
                     
@@ -418,6 +422,49 @@ class AutoClientCreationTestSuite:
         except Exception as e:
             self.log_test("Intégration complète", False, str(e))
     
+    def test_scenario_5_name_variants_and_concurrency(self):
+        """Scénario 5: variantes de casse / accents / espaces et ventes simultanées"""
+        print("\n=== SCÉNARIO 5: VARIANTES DE NOM ET VENTES SIMULTANÉES ===")
+        
+        if not self.created_products:
+            self.log_test("Scénario 5", False, "Pas de produits disponibles")
+            return
+        
+        variants = [f"Poissonnerie Hélène {RUN_ID}", f"poissonnerie helene {RUN_ID}",
+                    f"  POISSONNERIE HÉLÈNE {RUN_ID} ", f"Poissonnerie  Helene  {RUN_ID}"]
+        
+        def sell(name):
+            return requests.post(f"{self.base_url}/sales", json={
+                "client_id": "",
+                "client_name": name,
+                "items": [{"product_id": self.created_products[0]['id'], "quantity": 0.5}],
+                "discount": 0.0,
+                "payment_method": "espèces"
+            }, headers=self.headers, timeout=10)
+        
+        try:
+            # Toutes les caisses envoient leur vente en même temps
+            with ThreadPoolExecutor(max_workers=len(variants)) as pool:
+                responses = list(pool.map(sell, variants))
+            
+            sales = [response.json() for response in responses if response.status_code == 200]
+            self.created_sales.extend(sales)
+            if len(sales) != len(variants):
+                self.log_test("Ventes simultanées", False, 
+                            f"Statuts: {[response.status_code for response in responses]}")
+                return
+            
+            client_ids = {sale['client_id'] for sale in sales}
+            if len(client_ids) == 1:
+                self.log_test("Variantes de nom - un seul client", True, 
+                            f"{len(variants)} ventes simultanées liées au même client")
+                self.created_clients.append({"id": client_ids.pop(), "name": variants[0]})
+            else:
+                self.log_test("Variantes de nom - un seul client", False, 
+                            f"{len(client_ids)} clients créés pour le même nom")
+        except Exception as e:
+            self.log_test("Scénario 5", False, str(e))
+    
     def run_all_tests(self):
         """Exécuter tous les tests spécifiques"""
         print("🧊 TESTS SPÉCIFIQUES - CRÉATION AUTOMATIQUE CLIENT 🧊")
@@ -434,6 +481,7 @@ class AutoClientCreationTestSuite:
         self.test_scenario_2_existing_client_reuse()
         self.test_scenario_3_edge_cases()
         self.test_scenario_4_complete_integration()
+        self.test_scenario_5_name_variants_and_concurrency()
         
         # Résumé
         print("\n" + "=" * 70)